@@ -1,83 +1,70 @@
 import os
-import zipfile
-import pandas as pd
-import sqlite3
-import glob
+import sys
+import argparse
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(PROJECT_DIR / "src"))
+
+from datasets import INSTACART_TABLES, INSTACART_DTYPES, INSTACART_SCHEMA, INSTACART_INDEXES, INSTACART_QUERIES
+from ingest import CHUNK_ROWS
+from optimize import optimize_database, print_optimize_report
+from refresh import refresh_dataset
+from sources import find_sources
 
 # Configuration
-DATA_DIR = os.path.join("..", "..", "data", "instacart")
-DB_PATH = os.path.join("..", "..", "data", "instacart.db")
+DB_PATH = PROJECT_DIR / "data" / "instacart.db"
 ZIP_FILE = "instacart-market-basket-analysis.zip"
 
-def setup_instacart():
+def setup_instacart(rebuild=False, chunk_rows=CHUNK_ROWS, workers=1, optimize=True):
     print("Starting Instacart Dataset Setup...")
 
     # 1. Check if Zip exists (User needs to download it first)
-    zip_path = os.path.join("..", "..", ZIP_FILE)
-    if not os.path.exists(zip_path):
+    zip_path = PROJECT_DIR / ZIP_FILE
+    if not zip_path.exists():
         # Checks if it was downloaded into the current folder by mistake
         if os.path.exists(ZIP_FILE):
-             zip_path = ZIP_FILE
+             zip_path = Path(ZIP_FILE)
         else:
             print(f"Error: {ZIP_FILE} not found!")
             print("   Please run: kaggle datasets download -d psparks/instacart-market-basket-analysis")
             return
 
-    # 2. Extract Data
-    if not os.path.exists(DATA_DIR):
-        print(f"Extracting {zip_path} to {DATA_DIR}...")
-        os.makedirs(DATA_DIR, exist_ok=True)
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(DATA_DIR)
-    else:
-        print(f"Data directory found at {DATA_DIR}")
+    # 2. Locate the CSVs inside the zip (read in place, nothing is extracted)
+    sources = find_sources(zip_path, INSTACART_TABLES)
+    print(f"Found {len(sources)} CSV files in {zip_path}")
 
-    # 3. Create SQLite Database
-    print(f"Creating SQLite database at {DB_PATH}...")
-    conn = sqlite3.connect(DB_PATH)
-    
-    # 4. Load CSVs into SQLite
-    csv_files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-    
-    for csv_file in csv_files:
-        table_name = os.path.basename(csv_file).replace(".csv", "")
-        print(f"   PLEASE WAIT: Loading {table_name}...")
-        
-        # Iterative loading for large files (like order_products)
-        chunksize = 100000
-        for i, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunksize)):
-            chunk.to_sql(table_name, conn, if_exists="append" if i > 0 else "replace", index=False)
-            if i == 0:
-                print(f"     -> Created table {table_name}")
-        print(f"     -> Finished loading {table_name}")
+    # 3. Create (or refresh) SQLite Database
+    print(f"Updating SQLite database at {DB_PATH}...")
+    if rebuild:
+        for path in (DB_PATH, Path(f"{DB_PATH}-wal"), Path(f"{DB_PATH}-shm")):
+            path.unlink(missing_ok=True)
 
-    # 5. Create Indexes (Crucial for performance)
-    print("Optimizing database with indexes...")
-    indexes = [
-        ("orders", "order_id"),
-        ("orders", "user_id"),
-        ("order_products__prior", "order_id"),
-        ("order_products__prior", "product_id"),
-        ("order_products__train", "order_id"),
-        ("order_products__train", "product_id"),
-        ("products", "product_id"),
-        ("products", "aisle_id"),
-        ("products", "department_id")
-    ]
-    
-    cursor = conn.cursor()
-    for table, col in indexes:
-        try:
-            print(f"   -> Indexing {table}.{col}...")
-            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{col} ON {table}({col})")
-        except Exception as e:
-            print(f"   Could not index {table}: {e}")
-            
-    conn.commit()
-    conn.close()
+    # 4. Stream changed CSVs out of the zip into SQLite (constant memory, even
+    #    for order_products__prior); unchanged members are skipped
+    # 5. Indexes are built with each swapped-in table (crucial for performance)
+    # workers > 1: parser processes (one per zip member) feed a single SQLite writer
+    loader = refresh_dataset(DB_PATH, sources, INSTACART_DTYPES, INSTACART_INDEXES, chunk_rows=chunk_rows,
+                             workers=workers, schema=INSTACART_SCHEMA)
+    for entry in loader.stats:
+        if entry["table"] in sources:
+            print(f"     -> {entry['table']}: {entry['total_rows']:,} rows ({entry['action']})")
+
+    # 6. Planner statistics (ANALYZE) and an integrity check; the standard
+    #    queries run once each, full-size aggregates take seconds
+    if optimize:
+        print_optimize_report(optimize_database(DB_PATH, INSTACART_QUERIES, repeat=1))
 
     print("\nSUCCESS! Database ready at data/instacart.db")
     print("   You can now run the SQL Agent on this database.")
 
 if __name__ == "__main__":
-    setup_instacart()
+    parser = argparse.ArgumentParser(description="Load the Instacart dataset into SQLite")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the database and load everything again")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="Parser processes (1 = sequential streaming)")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip ANALYZE, integrity check and query timings")
+    args = parser.parse_args()
+
+    setup_instacart(rebuild=args.rebuild, chunk_rows=args.chunk_rows, workers=args.workers,
+                    optimize=not args.no_optimize)
@@ -2,6 +2,10 @@
 const CONFIG = {
     // Update this with your backend URL (Streamlit Cloud or FastAPI)
     API_URL: 'http://localhost:8000/api/query', // Change this to your deployed backend
+    STREAM_URL: 'http://localhost:8000/api/query/stream', // Server-sent events variant
+    RESULTS_URL: 'http://localhost:8000/api/results', // Paged, sortable result tables
+    USE_MOCK: false, // true to demo the UI without a backend (python src/api_server.py)
+    USE_STREAMING: true, // render tokens, SQL results and charts as they arrive
     SESSION_ID: generateSessionId(),
 };
 
@@ -22,6 +26,9 @@ const closeVizBtn = document.getElementById('closeViz');
 // Chart instance
 let currentChart = null;
 
+// Server-side paging state of the data table ({ id, page, pageSize, sort, desc, ... })
+let tableState = null;
+
 // Event Listeners
 document.addEventListener('DOMContentLoaded', () => {
     // Sample query buttons
@@ -86,6 +93,11 @@ async function sendMessage() {
     const loadingId = addLoadingMessage();
 
     try {
+        if (CONFIG.USE_STREAMING && !CONFIG.USE_MOCK) {
+            await streamBackend(query, loadingId);
+            return;
+        }
+
         // Call API
         const response = await queryBackend(query);
 
@@ -114,11 +126,10 @@ async function sendMessage() {
 
 // Query Backend Function
 async function queryBackend(query) {
-    // For demo purposes, return mock data
-    // In production, replace this with actual API call
-    return getMockResponse(query);
+    if (CONFIG.USE_MOCK) {
+        return getMockResponse(query);
+    }
 
-    /* Production API Call (uncomment when backend is ready):
     const response = await fetch(CONFIG.API_URL, {
         method: 'POST',
         headers: {
@@ -131,11 +142,133 @@ async function queryBackend(query) {
     });
 
     if (!response.ok) {
-        throw new Error('API request failed');
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.error || 'API request failed');
     }
 
-    return await response.json();
-    */
+    const result = await response.json();
+    return { ...result, data: columnarToRows(result.data) };
+}
+
+// Stream Backend Function (server-sent events over a POST response)
+async function streamBackend(query, loadingId) {
+    const response = await fetch(CONFIG.STREAM_URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            query: query,
+            session_id: CONFIG.SESSION_ID
+        })
+    });
+
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.error || 'API request failed');
+    }
+
+    let messageId = null;
+    let text = '';
+    let rows = [];
+    let chartRows = [];
+    let visualization = null;
+
+    // Replace the loading bubble with the answer on the first token
+    const setText = (content) => {
+        if (!messageId) {
+            removeMessage(loadingId);
+            messageId = addMessage('assistant', '');
+        }
+        document.querySelector(`#${messageId} .message-content p`).textContent = content;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    };
+
+    const handlers = {
+        token: (data) => {
+            text += data.text;
+            setText(text);
+        },
+        page: (data) => {
+            // First rows while the query is still running; the cursor takes over when done
+            rows = rows.concat(columnarToRows(data.data));
+            tableState = null;
+            visualizationArea.style.display = 'block';
+            displayDataTable(rows);
+        },
+        reset: () => {
+            rows = [];
+        },
+        visualization: (data) => {
+            chartRows = columnarToRows(data.data);
+            visualization = data.visualization;
+        },
+        done: (data) => {
+            setText(data.response);
+            if (chartRows.length > 0) {
+                displayVisualization({ data: chartRows, visualization, cursor: data.cursor });
+            }
+        },
+        error: (data) => {
+            throw new Error(data.error);
+        },
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = parseSSEFrame(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (frame && handlers[frame.event]) {
+                handlers[frame.event](frame.data);
+            }
+        }
+    }
+
+    if (!messageId) {
+        removeMessage(loadingId);
+    }
+}
+
+// Parse one "event: ...\ndata: ..." frame (comment-only heartbeats return null)
+function parseSSEFrame(frame) {
+    let event = 'message';
+    const data = [];
+
+    frame.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trim());
+        }
+    });
+
+    return data.length ? { event, data: JSON.parse(data.join('\n')) } : null;
+}
+
+// The API sends results column-wise: { columns, values: [[...col0], [...col1]], rows }
+function columnarToRows(data) {
+    if (!data || !data.columns) {
+        return data || [];
+    }
+
+    const rows = new Array(data.rows);
+    for (let i = 0; i < data.rows; i++) {
+        const row = {};
+        data.columns.forEach((column, j) => {
+            row[column] = data.values[j][i];
+        });
+        rows[i] = row;
+    }
+    return rows;
 }
 
 // Mock Response for Demo (Remove in production)
@@ -289,8 +422,14 @@ function displayVisualization(response) {
         createPieChart(data, visualization);
     }
 
-    // Display data table
-    displayDataTable(data);
+    // Display data table (paged from the server when the result has a cursor)
+    if (response.cursor) {
+        tableState = { id: response.cursor.id, page: 0, pageSize: response.cursor.page_size, sort: null, desc: false };
+        loadResultPage();
+    } else {
+        tableState = null;
+        displayDataTable(data);
+    }
 
     // Scroll to visualization
     visualizationArea.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
@@ -403,19 +542,29 @@ function createPieChart(data, config) {
     });
 }
 
+// Escape text for insertion into HTML markup
+function escapeHtml(value) {
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
 // Display Data Table
-function displayDataTable(data) {
-    if (!data || data.length === 0) {
+function displayDataTable(data, columns = null) {
+    if (!columns && (!data || data.length === 0)) {
         dataTableContainer.innerHTML = '';
         return;
     }
 
-    const headers = Object.keys(data[0]);
+    const headers = columns || Object.keys(data[0]);
 
     let tableHTML = '<table class="data-table"><thead><tr>';
 
     headers.forEach(header => {
-        tableHTML += `<th>${header}</th>`;
+        tableHTML += `<th>${escapeHtml(header)}</th>`;
     });
 
     tableHTML += '</tr></thead><tbody>';
@@ -425,7 +574,7 @@ function displayDataTable(data) {
         headers.forEach(header => {
             const value = row[header];
             const formatted = typeof value === 'number' ? formatNumber(value) : value;
-            tableHTML += `<td>${formatted}</td>`;
+            tableHTML += `<td>${escapeHtml(formatted)}</td>`;
         });
         tableHTML += '</tr>';
     });
@@ -435,6 +584,85 @@ function displayDataTable(data) {
     dataTableContainer.innerHTML = tableHTML;
 }
 
+// Fetch one sorted/filtered page of the current result and render it
+async function loadResultPage(changes = {}) {
+    tableState = { ...tableState, ...changes };
+    const state = tableState;
+
+    const params = new URLSearchParams({ page: state.page, page_size: state.pageSize });
+    if (state.sort) {
+        params.set('sort', state.sort);
+        params.set('desc', state.desc ? '1' : '0');
+    }
+    if (state.filterColumn && state.filter) {
+        params.set(`filter.${state.filterColumn}`, state.filter);
+    }
+
+    const response = await fetch(`${CONFIG.RESULTS_URL}/${encodeURIComponent(state.id)}?${params}`);
+    if (tableState !== state) return; // a newer request superseded this one
+
+    if (!response.ok) {
+        dataTableContainer.innerHTML = '<p>This result is no longer available.</p>';
+        return;
+    }
+
+    const page = await response.json();
+    state.pages = page.pages;
+    state.totalRows = page.total_rows;
+    state.columns = page.data.columns;
+
+    displayDataTable(columnarToRows(page.data), page.data.columns);
+    renderTableControls();
+}
+
+// Pager and filter under a cursor-backed table; header clicks sort
+function renderTableControls() {
+    const state = tableState;
+
+    dataTableContainer.querySelectorAll('th').forEach(th => {
+        const column = th.textContent;
+        th.style.cursor = 'pointer';
+        if (column === state.sort) {
+            th.textContent = `${column} ${state.desc ? '▼' : '▲'}`;
+        }
+        th.addEventListener('click', () => {
+            const desc = column === state.sort ? !state.desc : false;
+            loadResultPage({ sort: column, desc, page: 0 });
+        });
+    });
+
+    const controls = document.createElement('div');
+    controls.className = 'table-controls';
+    controls.innerHTML = `
+        <button class="pager-btn" data-page="${state.page - 1}" ${state.page === 0 ? 'disabled' : ''}>‹ Prev</button>
+        <span>Page ${state.page + 1} of ${state.pages} · ${state.totalRows.toLocaleString()} rows</span>
+        <button class="pager-btn" data-page="${state.page + 1}" ${state.page + 1 >= state.pages ? 'disabled' : ''}>Next ›</button>
+        <select class="filter-column"></select>
+        <input class="filter-text" placeholder="Filter (contains)">
+    `;
+
+    // Column names (SQL aliases) and the filter text go in through the DOM, never as markup
+    const filterColumn = controls.querySelector('.filter-column');
+    state.columns.forEach(c => {
+        const option = document.createElement('option');
+        option.textContent = c;
+        option.selected = c === state.filterColumn;
+        filterColumn.appendChild(option);
+    });
+    controls.querySelector('.filter-text').value = state.filter || '';
+
+    controls.querySelectorAll('.pager-btn').forEach(btn => {
+        btn.addEventListener('click', () => loadResultPage({ page: Number(btn.dataset.page) }));
+    });
+    controls.querySelector('.filter-text').addEventListener('keypress', (e) => {
+        if (e.key === 'Enter') {
+            loadResultPage({ filterColumn: filterColumn.value, filter: e.target.value.trim(), page: 0 });
+        }
+    });
+
+    dataTableContainer.appendChild(controls);
+}
+
 // Format Number
 function formatNumber(num) {
     if (num >= 1000000) {
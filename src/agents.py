@@ -5,112 +5,229 @@ Implements the architecture from the video:
 2. SQL Generator Agent - specialized in SQL query generation
 """
 import os
+import re
 import json
-from typing import Dict, List, Any, Optional, Tuple
+import time
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
 from database import DatabaseManager
 from schema import SchemaExtractor
-from dotenv import load_dotenv
+from history import ChatHistoryManager
+from repair import SQLRepairer
+from fewshot import ExampleStore, format_examples
+from routing import ModelRouter
+from summarizer import summarize_result
+from streaming import JSONFieldStreamer
+from providers import load_env, check_provider, create_llm
 
-# Load environment variables
-load_dotenv()
 
-# Try to import AI libraries
-try:
-    from langchain_openai import ChatOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+class _PageEmitter:
+    """Forwards result pages to an event callback and tracks how many rows were sent"""
 
-try:
-    from langchain_anthropic import ChatAnthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+    def __init__(self, emit: Callable[[str, Dict[str, Any]], None], page_size: int):
+        self.emit = emit
+        self.page_size = page_size
+        self.rows = 0
 
-try:
-    from langchain_groq import ChatGroq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
+    def __call__(self, page):
+        self.emit("page", {"data": page, "offset": self.rows})
+        self.rows += len(page)
+
+    def replay(self, data):
+        """Send a complete result, superseding any pages already sent"""
+
+        if self.rows:
+            self.emit("reset", {})
+            self.rows = 0
+        for start in range(0, max(len(data), 1), self.page_size):
+            self(data.iloc[start:start + self.page_size])
 
 
 class SQLAgentSystem:
     """
     Multi-agent system for natural language to SQL conversion
     Mimics the n8n workflow architecture from the video
+
+    Schema extraction, prompt construction and the LLM client are built
+    lazily on first use (or in the background via warm_up()), so creating
+    the system is cheap and only the selected provider SDK is imported.
     """
 
-    def __init__(self, db_path: str, model: str = None):
+    def __init__(
+        self,
+        db_path: str,
+        model: str = None,
+        warm_up: bool = False,
+        speculative: Optional[bool] = None,
+        models: Optional[List[str]] = None
+    ):
+        load_env()
+
+        self.db_path = db_path
         self.db_manager = DatabaseManager(db_path)
         self.schema_extractor = SchemaExtractor(db_path)
+        self.history_manager = ChatHistoryManager(
+            self.db_manager,
+            token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+        )
 
-        # Extract schema and generate context
-        self.schema_extractor.extract_schema()
-        self.ai_context = self.schema_extractor.generate_ai_context()
-
-        # Initialize AI model
+        # Resolve the model and fail fast on missing packages / API keys,
+        # without importing the provider SDK yet
         self.model = model or os.getenv("AI_MODEL", "gpt-4o")
-        self.llm = self._init_llm()
-
-        # Agent prompts
-        self.main_agent_prompt = self._build_main_agent_prompt()
-        self.sql_agent_prompt = self._build_sql_agent_prompt()
-
-    def _init_llm(self):
-        """Initialize the language model"""
-
-        if self.model.startswith("gpt"):
-            if not OPENAI_AVAILABLE:
-                raise ImportError("OpenAI not available. Run: pip install langchain-openai")
-
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY not found in environment")
-
-            return ChatOpenAI(
-                model=self.model,
-                temperature=0,
-                api_key=api_key
+        self.router = None
+
+        if models is None and not model and os.getenv("AI_MODELS"):
+            models = [m.strip() for m in os.getenv("AI_MODELS").split(",") if m.strip()]
+
+        if models and len(models) > 1:
+            # Route across every configured model whose backend is usable
+            usable, errors = [], []
+            for name in models:
+                try:
+                    check_provider(name)
+                    usable.append(name)
+                except (ImportError, ValueError) as e:
+                    errors.append(e)
+            if not usable:
+                raise errors[0]
+
+            self.model = usable[0]
+            self.router = ModelRouter(
+                usable,
+                hedge=os.getenv("ROUTER_HEDGE", "0").lower() in ("1", "true", "yes"),
+                hedge_percentile=float(os.getenv("ROUTER_HEDGE_PERCENTILE", "95"))
             )
-
-        elif self.model.startswith("claude"):
-            if not ANTHROPIC_AVAILABLE:
-                raise ImportError("Anthropic not available. Run: pip install langchain-anthropic")
-
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            if not api_key:
-                raise ValueError("ANTHROPIC_API_KEY not found in environment")
-
-            return ChatAnthropic(
-                model=self.model,
-                temperature=0,
-                api_key=api_key
+        else:
+            self.model = (models or [self.model])[0]
+            check_provider(self.model)
+
+        self._init_lock = threading.RLock()
+        self._ai_context = None
+        self._main_agent_prompt = None
+        self._sql_agent_prompt = None
+        self._llm = None
+        self._repairer = None
+        self._example_store = None
+        self._sql_agent_ms = None  # rolling average SQL-agent latency
+        self._warm_up_thread = None
+
+        # Speculative SQL: generate and pre-execute SQL while the main agent runs
+        if speculative is None:
+            speculative = os.getenv("SPECULATIVE_SQL", "0").lower() in ("1", "true", "yes")
+        self.speculative = speculative
+        self._executor = None
+        self._sql_cache = OrderedDict()  # user question -> SQL that succeeded
+        self._stats_lock = threading.Lock()
+        self.speculation_stats = {"started": 0, "committed": 0, "wasted": 0, "latency_saved_ms": 0.0}
+
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """Build schema context, prompts and LLM client ahead of the first query"""
+
+        def _run():
+            self._ensure_context()
+            if self.router is None:
+                _ = self.llm
+
+        if not background:
+            _run()
+            return None
+
+        self._warm_up_thread = threading.Thread(target=_run, name="agent-warm-up", daemon=True)
+        self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _ensure_context(self):
+        """Extract schema and build prompts once (thread-safe)"""
+
+        if self._sql_agent_prompt is not None:
+            return
+
+        with self._init_lock:
+            if self._sql_agent_prompt is not None:
+                return
+
+            # Extract schema and generate context
+            self.schema_extractor.extract_schema()
+            self._ai_context = self.schema_extractor.generate_ai_context()
+
+            # Agent prompts
+            self._main_agent_prompt = self._build_main_agent_prompt()
+            self._sql_agent_prompt = self._build_sql_agent_prompt()
+
+            # Local SQL repair works from the same schema snapshot
+            self._repairer = SQLRepairer(self.schema_extractor.schema_info)
+
+            # Few-shot examples are retrieved per request from successful queries
+            self._example_store = ExampleStore(
+                self.db_manager,
+                self.schema_extractor.dataset_type,
+                self.schema_extractor.schema_info
             )
 
-        elif "llama" in self.model or "mixtral" in self.model or "gemma" in self.model:
-            if not GROQ_AVAILABLE:
-                raise ImportError("Groq not available. Run: pip install langchain-groq")
+    @property
+    def ai_context(self) -> str:
+        self._ensure_context()
+        return self._ai_context
+
+    @property
+    def main_agent_prompt(self) -> str:
+        self._ensure_context()
+        return self._main_agent_prompt
+
+    @property
+    def sql_agent_prompt(self) -> str:
+        self._ensure_context()
+        return self._sql_agent_prompt
+
+    @property
+    def repairer(self) -> SQLRepairer:
+        self._ensure_context()
+        return self._repairer
+
+    @property
+    def example_store(self) -> ExampleStore:
+        self._ensure_context()
+        return self._example_store
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._init_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-worker")
+        return self._executor
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._init_lock:
+                if self._llm is None:
+                    self._llm = self._init_llm()
+        return self._llm
 
-            api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
-                raise ValueError("GROQ_API_KEY not found in environment")
+    def _init_llm(self):
+        """Initialize the language model (imports only the selected backend)"""
+        return create_llm(self.model, temperature=0)
 
-            return ChatGroq(
-                model_name=self.model,
-                temperature=0,
-                api_key=api_key
-            )
+    def _invoke(self, messages: List[Dict[str, str]], role: str):
+        """Call the LLM for an agent role ('chat' or 'sql'), via the router if configured"""
 
-        else:
-            raise ValueError(f"Unsupported model: {self.model}")
+        if self.router is not None:
+            return self.router.invoke(messages, role=role)
+        return self.llm.invoke(messages)
 
     def _build_main_agent_prompt(self) -> str:
         """Build prompt for main conversational agent"""
 
         return f"""You are a helpful data analyst assistant with access to an e-commerce database.
 
-{self.ai_context}
+{self._ai_context}
 
 Your role is to help users understand their data by:
 1. Answering questions about the database
@@ -156,7 +273,7 @@ Response: {{"response": "I'll calculate the monthly revenue trends.", "needs_que
 
         return f"""You are a SQL expert specialized in SQLite query generation.
 
-{self.ai_context}
+{self._ai_context}
 
 Your ONLY job is to generate a single, valid SQLite SELECT query based on the user's request.
 
@@ -170,56 +287,24 @@ CRITICAL RULES:
 7. Include LIMIT clause (default 10 for lists, 100 for aggregations)
 8. Handle NULL values appropriately
 9. Use table aliases for readability
-10. For dates, use strftime() function
+10. For dates, use precomputed date columns when the schema lists them, otherwise strftime()
 
 QUERY OPTIMIZATION:
 - Only join tables that are needed for the query
 - Use indexes when available (primary keys, foreign keys)
 - Limit result sets to reasonable sizes
 
-EXAMPLES:
-
-Request: "Get top 10 products by total quantity sold"
-Query:
-SELECT
-    p.product_id,
-    COUNT(oi.order_id) as total_orders,
-    SUM(oi.order_item_id) as total_quantity
-FROM order_items oi
-JOIN products p ON oi.product_id = p.product_id
-GROUP BY p.product_id
-ORDER BY total_quantity DESC
-LIMIT 10
-
-Request: "Calculate monthly revenue for 2017"
-Query:
-SELECT
-    strftime('%Y-%m', o.order_purchase_timestamp) as month,
-    ROUND(SUM(oi.price + oi.freight_value), 2) as revenue
-FROM orders o
-JOIN order_items oi ON o.order_id = oi.order_id
-WHERE strftime('%Y', o.order_purchase_timestamp) = '2017'
-GROUP BY month
-ORDER BY month
-
-Request: "Show payment method distribution"
-Query:
-SELECT
-    payment_type,
-    COUNT(*) as count,
-    ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM order_payments), 2) as percentage
-FROM order_payments
-GROUP BY payment_type
-ORDER BY count DESC
-
-Now generate the SQL query for the following request:
 """
 
     def process_user_query(
         self,
         user_message: str,
         session_id: str = "default",
-        chat_history: Optional[List[Dict]] = None
+        chat_history: Optional[List[Dict]] = None,
+        on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        page_size: int = 500,
+        progress_handler: Optional[Callable[[], int]] = None,
+        progress_interval: int = 10000
     ) -> Dict[str, Any]:
         """
         Process user query through the multi-agent system
@@ -227,56 +312,80 @@ Now generate the SQL query for the following request:
         Args:
             user_message: User's natural language question
             session_id: Session identifier for chat history
-            chat_history: Optional chat history (will load from DB if not provided)
+            chat_history: Optional chat history (will load from DB if not provided).
+                May contain UI fields such as DataFrames; only text reaches the LLM.
+            on_event: Optional callback for progressive output, called with
+                ("token", {"text"}), ("status", {"stage"}), ("sql", {"sql"}), ("page", {"data", "offset"})
+                and ("reset", {}) if already-sent pages are superseded by a repair
+            page_size: Rows per "page" event
+            progress_handler: SQLite progress handler for the query execution
+                (returning non-zero interrupts it; interrupted queries aren't repaired)
+            progress_interval: SQLite VM instructions between progress handler calls
 
         Returns:
             Dictionary with response, data, and metadata
         """
 
-        result = {
-            "response": "",
-            "data": None,
-            "visualization": {"type": "none"},
-            "metadata": {
-                "needs_query": False,
-                "sql_query": None,
-                "query_success": False,
-                "error": None
-            }
-        }
+        result = self._new_result()
+        emit = on_event or (lambda event, data: None)
+        pages = _PageEmitter(emit, page_size)
 
         try:
+            if chat_history is None:
+                chat_history = self.db_manager.get_chat_history(session_id, limit=50)
+
+            # Step 0: Optionally start SQL generation + execution speculatively
+            speculation = self._start_speculation(user_message) if self.speculative else None
+
             # Step 1: Main agent determines if we need to query database
-            main_response = self._call_main_agent(user_message, chat_history)
+            main_response = self._call_main_agent(
+                user_message, chat_history, session_id,
+                on_token=(lambda text: emit("token", {"text": text})) if on_event else None
+            )
+            main_done = time.perf_counter()
 
-            result["response"] = main_response["response"]
-            result["visualization"] = main_response["visualization"]
-            result["metadata"]["needs_query"] = main_response["needs_query"]
+            self._apply_main_response(result, main_response)
 
             # Save user message to history
             self.db_manager.save_chat_message(session_id, "user", user_message)
 
-            # Step 2: If query needed, call SQL generator
+            # Step 2: If query needed, call SQL generator (or commit the speculative result)
             if main_response["needs_query"] and main_response["enhanced_query"]:
-                sql_query = self._call_sql_agent(main_response["enhanced_query"])
-
-                result["metadata"]["sql_query"] = sql_query
+                emit("status", {"stage": "generating_sql"})
+                committed = self._commit_speculation(speculation, main_response["enhanced_query"], main_done)
+
+                if committed:
+                    sql_query = committed["sql"]
+                    emit("sql", {"sql": sql_query})
+                    success, data, query_metadata = True, committed["data"], committed["metadata"]
+                    self.db_manager.log_execution(query_metadata)
+                    result["metadata"]["speculative"] = {
+                        "source": committed["source"],
+                        "latency_saved_ms": committed["latency_saved_ms"]
+                    }
+                else:
+                    sql_query = self._call_sql_agent(main_response["enhanced_query"])
+                    emit("sql", {"sql": sql_query})
 
-                # Step 3: Execute query
-                success, data, query_metadata = self.db_manager.execute_query(sql_query)
+                    # Step 3: Execute query (streaming pages as they are fetched)
+                    success, data, query_metadata = self.db_manager.execute_query(
+                        sql_query, on_page=pages if on_event else None, page_size=page_size,
+                        progress_handler=progress_handler, progress_interval=progress_interval
+                    )
 
-                result["metadata"]["query_success"] = success
-                result["metadata"]["query_metadata"] = query_metadata
+                self._apply_query_outcome(
+                    result, user_message, main_response["enhanced_query"],
+                    sql_query, success, data, query_metadata
+                )
 
-                if success:
-                    result["data"] = data
+                # Speculative and repaired results weren't streamed while executing
+                if on_event and result["data"] is not None and result["metadata"]["sql_query"] != sql_query:
+                    emit("sql", {"sql": result["metadata"]["sql_query"], "repaired": True})
+                if on_event and result["data"] is not None and pages.rows != len(result["data"]):
+                    pages.replay(result["data"])
 
-                    # Update response with results summary
-                    result["response"] += f"\n\nFound {len(data)} results."
-                else:
-                    error_msg = query_metadata.get("execution", {}).get("error", "Unknown error")
-                    result["response"] = f"I encountered an error: {error_msg}"
-                    result["metadata"]["error"] = error_msg
+            elif speculation is not None:
+                self._record_speculation("wasted")
 
             # Save assistant response to history
             self.db_manager.save_chat_message(session_id, "assistant", result["response"])
@@ -287,7 +396,279 @@ Now generate the SQL query for the following request:
 
         return result
 
-    def _call_main_agent(self, user_message: str, chat_history: Optional[List[Dict]] = None) -> Dict:
+    def process_batch(
+        self,
+        questions: List[str],
+        session_id: str = "default",
+        chat_history: Optional[List[Dict]] = None,
+        pack_size: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Process several questions for one session
+
+        Duplicate questions are answered once. Main-agent calls run
+        concurrently, SQL generation for up to `pack_size` requests is packed
+        into a single LLM call, and the queries execute concurrently on the
+        connection pool.
+
+        Returns:
+            One result per input question, in input order (same shape as
+            process_user_query; failures are reported per item)
+        """
+
+        if chat_history is None:
+            chat_history = self.db_manager.get_chat_history(session_id, limit=50)
+
+        # Dedupe on normalized text, remembering where each input maps
+        unique, positions, seen = [], [], {}
+        for question in questions:
+            key = " ".join(question.split()).lower()
+            if key not in seen:
+                seen[key] = len(unique)
+                unique.append(question)
+            positions.append(seen[key])
+
+        results = [self._new_result() for _ in unique]
+        enhanced = {}
+
+        # Step 1: Main agent for every question, concurrently
+        main_futures = [
+            self.executor.submit(self._call_main_agent, question, chat_history, session_id)
+            for question in unique
+        ]
+        for i, future in enumerate(main_futures):
+            try:
+                main_response = future.result()
+            except Exception as e:
+                results[i]["response"] = f"I encountered an unexpected error: {str(e)}"
+                results[i]["metadata"]["error"] = str(e)
+                continue
+
+            self._apply_main_response(results[i], main_response)
+            if main_response["needs_query"] and main_response["enhanced_query"]:
+                enhanced[i] = main_response["enhanced_query"]
+
+        # Step 2: SQL from the cache where possible, the rest in packed LLM calls
+        sql_by_index = {}
+        to_generate = []
+        for i in enhanced:
+            cached = self._cached_sql(unique[i])
+            if cached:
+                sql_by_index[i] = cached
+            else:
+                to_generate.append(i)
+
+        for start in range(0, len(to_generate), pack_size):
+            chunk = to_generate[start:start + pack_size]
+            try:
+                queries = self._call_sql_agent_batch([enhanced[i] for i in chunk])
+            except Exception:
+                queries = None
+
+            if queries is None:
+                # Packing failed: fall back to one SQL-agent call per request
+                futures = {i: self.executor.submit(self._call_sql_agent, enhanced[i]) for i in chunk}
+                queries = []
+                for i in chunk:
+                    try:
+                        queries.append(futures[i].result())
+                    except Exception as e:
+                        results[i]["response"] = f"I encountered an unexpected error: {str(e)}"
+                        results[i]["metadata"]["error"] = str(e)
+                        queries.append(None)
+
+            for i, sql_query in zip(chunk, queries):
+                if sql_query:
+                    sql_by_index[i] = sql_query
+
+        # Step 3: Execute concurrently on the connection pool
+        exec_futures = {
+            i: self.executor.submit(self.db_manager.execute_query, sql_query)
+            for i, sql_query in sql_by_index.items()
+        }
+        for i, future in exec_futures.items():
+            try:
+                success, data, query_metadata = future.result()
+                self._apply_query_outcome(
+                    results[i], unique[i], enhanced[i], sql_by_index[i], success, data, query_metadata
+                )
+            except Exception as e:
+                results[i]["response"] = f"I encountered an unexpected error: {str(e)}"
+                results[i]["metadata"]["error"] = str(e)
+
+        # Save the exchange to history in question order
+        for question, result in zip(unique, results):
+            self.db_manager.save_chat_message(session_id, "user", question)
+            self.db_manager.save_chat_message(session_id, "assistant", result["response"])
+
+        return [dict(results[p]) for p in positions]
+
+    @staticmethod
+    def _new_result() -> Dict[str, Any]:
+        return {
+            "response": "",
+            "data": None,
+            "summary": None,
+            "visualization": {"type": "none"},
+            "metadata": {
+                "needs_query": False,
+                "sql_query": None,
+                "query_success": False,
+                "error": None
+            }
+        }
+
+    @staticmethod
+    def _apply_main_response(result: Dict[str, Any], main_response: Dict):
+        result["response"] = main_response["response"]
+        result["visualization"] = main_response["visualization"]
+        result["metadata"]["needs_query"] = main_response["needs_query"]
+
+    def _apply_query_outcome(
+        self,
+        result: Dict[str, Any],
+        user_message: str,
+        enhanced_query: str,
+        sql_query: str,
+        success: bool,
+        data: Any,
+        query_metadata: Dict
+    ):
+        """Repair failures, then fill the result with data or the error"""
+
+        result["metadata"]["sql_query"] = sql_query
+
+        # On execution errors, repair locally before re-asking the LLM
+        # (an interrupted query was cancelled, not broken)
+        error = query_metadata.get("execution", {}).get("error")
+        if not success and query_metadata["validation"]["is_valid"] and error != "interrupted":
+            sql_query, success, data, query_metadata, repair_info = self._repair_query(
+                enhanced_query, sql_query, query_metadata
+            )
+            result["metadata"]["sql_query"] = sql_query
+            result["metadata"]["repair"] = repair_info
+
+        result["metadata"]["query_success"] = success
+        result["metadata"]["query_metadata"] = query_metadata
+
+        if success:
+            result["data"] = data
+
+            # Successful queries become few-shot examples for similar requests
+            self.example_store.add(enhanced_query, sql_query)
+            self._remember_sql(user_message, sql_query)
+
+            # Summarize the result locally (no extra LLM call)
+            result["summary"] = summarize_result(data, result["visualization"])
+            result["response"] += f"\n\nFound {len(data)} results."
+            if result["summary"]["highlights"]:
+                result["response"] += f" {result['summary']['narrative']}"
+        else:
+            error_msg = query_metadata.get("execution", {}).get("error", "Unknown error")
+            result["response"] = f"I encountered an error: {error_msg}"
+            result["metadata"]["error"] = error_msg
+
+    def _start_speculation(self, user_message: str) -> Future:
+        """Start SQL generation (or a cached candidate) and read-only execution in the background"""
+
+        with self._stats_lock:
+            self.speculation_stats["started"] += 1
+
+        return self.executor.submit(self._speculate, user_message)
+
+    def _cached_sql(self, user_message: str) -> Optional[str]:
+        """SQL that already answered this exact question, if any"""
+
+        with self._stats_lock:
+            sql_query = self._sql_cache.get(user_message.strip().lower())
+        return sql_query or self.example_store.find_exact(user_message)
+
+    def _speculate(self, user_message: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+
+        sql_query = self._cached_sql(user_message)
+        source = "cache" if sql_query else "llm"
+
+        if sql_query is None:
+            sql_query = self._call_sql_agent(user_message)
+
+        # Nothing is logged until the result is committed
+        success, data, metadata = self.db_manager.execute_query(sql_query, read_only=True, log=False)
+        finished = time.perf_counter()
+
+        return {
+            "sql": sql_query,
+            "source": source,
+            "success": success,
+            "data": data,
+            "metadata": metadata,
+            "duration_ms": (finished - start) * 1000,
+            "finished": finished,
+        }
+
+    def _commit_speculation(self, speculation: Optional[Future], enhanced_query: str, main_done: float) -> Optional[Dict]:
+        """
+        Return the speculative result if it succeeded and is compatible with
+        the main agent's intent, else None (and count it as wasted work)
+        """
+
+        if speculation is None:
+            return None
+
+        try:
+            outcome = speculation.result()
+        except Exception:
+            outcome = None
+
+        if not outcome or not outcome["success"] or not self._intent_compatible(enhanced_query, outcome["sql"]):
+            self._record_speculation("wasted")
+            return None
+
+        # Only the part that overlapped the main-agent call is saved
+        overrun_ms = max(0.0, (outcome["finished"] - main_done) * 1000)
+        outcome["latency_saved_ms"] = max(0.0, outcome["duration_ms"] - overrun_ms)
+        self._record_speculation("committed", outcome["latency_saved_ms"])
+        return outcome
+
+    def _intent_compatible(self, enhanced_query: str, sql_query: str) -> bool:
+        """Every table/column the enhanced request names must appear in the SQL"""
+
+        known = set(self.repairer.tables) | set(self.repairer.all_columns)
+        mentioned = {w for w in re.findall(r"[a-z_][a-z0-9_]*", enhanced_query.lower()) if w in known}
+        used = set(re.findall(r"[a-z_][a-z0-9_]*", sql_query.lower()))
+        return mentioned <= used
+
+    def _record_speculation(self, outcome: str, saved_ms: float = 0.0):
+        with self._stats_lock:
+            self.speculation_stats[outcome] += 1
+            self.speculation_stats["latency_saved_ms"] += saved_ms
+
+    def _remember_sql(self, user_message: str, sql_query: str, max_entries: int = 256):
+        """Cache the SQL that answered a question, for speculative reuse"""
+
+        with self._stats_lock:
+            self._sql_cache[user_message.strip().lower()] = sql_query
+            self._sql_cache.move_to_end(user_message.strip().lower())
+            while len(self._sql_cache) > max_entries:
+                self._sql_cache.popitem(last=False)
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Speculation outcomes, wasted-work ratio and latency saved"""
+
+        with self._stats_lock:
+            stats = dict(self.speculation_stats)
+
+        resolved = stats["committed"] + stats["wasted"]
+        stats["wasted_work_ratio"] = stats["wasted"] / resolved if resolved else 0.0
+        return stats
+
+    def _call_main_agent(
+        self,
+        user_message: str,
+        chat_history: Optional[List[Dict]] = None,
+        session_id: str = "default",
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict:
         """Call the main conversational agent"""
 
         messages = []
@@ -298,9 +679,9 @@ Now generate the SQL query for the following request:
             "content": self.main_agent_prompt
         })
 
-        # Add chat history if available
+        # Add chat history that fits the token budget (older turns are summarized)
         if chat_history:
-            messages.extend(chat_history[-5:])  # Last 5 messages for context
+            messages.extend(self.history_manager.build_context(session_id, chat_history))
 
         # Add current user message
         messages.append({
@@ -308,32 +689,185 @@ Now generate the SQL query for the following request:
             "content": user_message
         })
 
-        # Call LLM
-        response = self.llm.invoke(messages)
+        # Call LLM (streaming the "response" text out of the JSON when asked)
+        if on_token is not None and self.router is None and hasattr(self.llm, "stream"):
+            streamer = JSONFieldStreamer("response")
+            parts = []
+            for chunk in self.llm.stream(messages):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                parts.append(text)
+                delta = streamer.feed(text)
+                if delta:
+                    on_token(delta)
+            content = "".join(parts)
+        else:
+            content = self._invoke(messages, role="chat").content
 
         # Parse JSON response
         try:
-            return json.loads(response.content)
+            return json.loads(content)
         except json.JSONDecodeError:
             # Fallback if JSON parsing fails
             return {
-                "response": response.content,
+                "response": content,
                 "needs_query": False,
                 "enhanced_query": None,
                 "visualization": {"type": "none"}
             }
 
-    def _call_sql_agent(self, enhanced_query: str) -> str:
-        """Call the SQL generator agent"""
+    def _repair_query(
+        self,
+        enhanced_query: str,
+        sql_query: str,
+        query_metadata: Dict,
+        max_local_attempts: int = 3
+    ) -> Tuple[str, bool, Any, Dict, Dict]:
+        """
+        Repair a failed query: up to `max_local_attempts` local rewrites
+        (dialect fixes, fuzzy identifier matching), then one bounded LLM retry
+        with the error attached.
 
-        prompt = self.sql_agent_prompt + "\n\n" + enhanced_query
+        Returns:
+            Tuple of (sql_query, success, data, query_metadata, repair_info)
+        """
+
+        repair_info = {"strategy": None, "fixes": [], "original_query": sql_query}
+        error = query_metadata["execution"].get("error", "")
+        start = time.perf_counter()
+
+        candidate = sql_query
+        for _ in range(max_local_attempts):
+            repaired, fixes = self.repairer.repair(candidate, error)
+            if not repaired:
+                break
+
+            candidate = repaired
+            repair_info["fixes"].extend(fixes)
+            success, data, metadata = self.db_manager.execute_query(candidate)
+
+            if success:
+                local_ms = (time.perf_counter() - start) * 1000
+                # A local fix avoids one SQL-agent round trip
+                saved_ms = max(0.0, (self._sql_agent_ms or 0.0) - local_ms)
+                self.repairer.record("local", local_ms, saved_ms)
+                repair_info.update(strategy="local", local_ms=local_ms, latency_saved_ms=saved_ms)
+                return candidate, True, data, metadata, repair_info
+
+            if not metadata["validation"]["is_valid"]:
+                break
+            error = metadata["execution"].get("error", "")
+
+        local_ms = (time.perf_counter() - start) * 1000
+
+        # One LLM retry with the failing query and error attached
+        retry_sql = self._call_sql_agent(enhanced_query, failed_query=sql_query, error=error)
+        success, data, metadata = self.db_manager.execute_query(retry_sql)
+
+        self.repairer.record("llm" if success else "failed", local_ms)
+        repair_info.update(strategy="llm" if success else "failed", local_ms=local_ms)
+
+        if success:
+            return retry_sql, True, data, metadata, repair_info
+
+        return sql_query, False, None, query_metadata, repair_info
+
+    def get_repair_stats(self) -> Dict[str, Any]:
+        """Repair hit rate and latency saved by local repair"""
+        # Read on every sidebar render: don't force the schema context (and
+        # wait on warm-up) just to report that nothing was repaired yet
+        if self._repairer is None:
+            return SQLRepairer({}).get_stats()
+        return self._repairer.get_stats()
+
+    def _call_sql_agent_batch(self, enhanced_queries: List[str]) -> Optional[List[str]]:
+        """
+        Generate SQL for several requests in one LLM call
+
+        Returns:
+            One query per request in order, or None if the reply is unusable
+        """
+
+        if len(enhanced_queries) == 1:
+            return [self._call_sql_agent(enhanced_queries[0])]
+
+        # Share one example budget across the packed requests
+        k = int(os.getenv("FEWSHOT_K", "3"))
+        budget = int(os.getenv("FEWSHOT_TOKEN_BUDGET", "600"))
+        examples, seen = [], set()
+        for query in enhanced_queries:
+            for example in self.example_store.retrieve(query, k=1, token_budget=budget // len(enhanced_queries)):
+                if example["question"] not in seen and len(examples) < max(k, len(enhanced_queries)):
+                    seen.add(example["question"])
+                    examples.append(example)
+
+        prompt = self.sql_agent_prompt
+        if examples:
+            prompt += "EXAMPLES:\n\n" + format_examples(examples) + "\n\n"
+
+        prompt += (
+            "Generate one SQLite query for EACH numbered request below. Return ONLY a JSON array "
+            "of strings, one query per request, in the same order.\n\n"
+            + "\n".join(f"{n}. {query}" for n, query in enumerate(enhanced_queries, 1))
+        )
+
+        messages = [
+            {"role": "system", "content": "You are a SQL expert. Generate only valid SQL queries."},
+            {"role": "user", "content": prompt}
+        ]
+
+        content = self._invoke(messages, role="sql").content.strip()
+        if content.startswith("```"):
+            content = content.split("```")[1]
+            if content.startswith("json"):
+                content = content[4:]
+
+        try:
+            queries = json.loads(content)
+        except json.JSONDecodeError:
+            return None
+
+        if not isinstance(queries, list) or len(queries) != len(enhanced_queries):
+            return None
+        if not all(isinstance(q, str) and q.strip() for q in queries):
+            return None
+
+        return [q.strip() for q in queries]
+
+    def _call_sql_agent(
+        self,
+        enhanced_query: str,
+        failed_query: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> str:
+        """Call the SQL generator agent (optionally with a failed attempt to fix)"""
+
+        prompt = self.sql_agent_prompt
+
+        examples = self.example_store.retrieve(
+            enhanced_query,
+            k=int(os.getenv("FEWSHOT_K", "3")),
+            token_budget=int(os.getenv("FEWSHOT_TOKEN_BUDGET", "600"))
+        )
+        if examples:
+            prompt += "EXAMPLES:\n\n" + format_examples(examples) + "\n\n"
+
+        prompt += "Now generate the SQL query for the following request:\n\n" + enhanced_query
+
+        if failed_query:
+            prompt += (
+                f"\n\nYour previous query failed on SQLite:\n{failed_query}\n"
+                f"Error: {error}\nReturn a corrected query."
+            )
 
         messages = [
             {"role": "system", "content": "You are a SQL expert. Generate only valid SQL queries."},
             {"role": "user", "content": prompt}
         ]
 
-        response = self.llm.invoke(messages)
+        start = time.perf_counter()
+        response = self._invoke(messages, role="sql")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._sql_agent_ms = elapsed_ms if self._sql_agent_ms is None else 0.8 * self._sql_agent_ms + 0.2 * elapsed_ms
 
         # Extract SQL query (remove markdown if present)
         sql_query = response.content.strip()
@@ -0,0 +1,596 @@
+"""
+HTTP API for the web frontend
+Serves the `POST /api/query {query, session_id}` contract used by
+frontend/app.js on top of SQLAgentSystem, using only the standard library:
+
+    python src/api_server.py --db data/ecommerce.db --port 8000
+
+- Bounded worker pool for agent work; excess requests get 503 + Retry-After
+- HTTP/1.1 keep-alive with an idle timeout
+- gzip responses when the client accepts them
+- DataFrames serialized column-wise: {"columns", "dtypes", "values", "rows", "truncated"};
+  responses carry chart-ready rows plus a cursor, and the table pages through
+  GET /api/results/<id>?page=&page_size=&sort=&desc=&filter.<column>=
+- Request size, question length and result row limits
+- GET /health (liveness) and GET /ready (schema and LLM client warmed up)
+- POST /api/query/stream: the same request answered as server-sent events
+  (status, token, sql, page, reset, visualization, done)
+- POST /api/jobs {query | sql}: background job; poll GET /api/jobs/<id>,
+  cancel with DELETE /api/jobs/<id>
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from agents import SQLAgentSystem
+from streaming import sse_event
+from cursors import CursorManager, DEFAULT_PAGE_SIZE
+from jobs import JobManager
+from downsample import reduce_for_chart
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_QUERY_CHARS = 2000
+MAX_RESULT_ROWS = int(os.getenv("API_MAX_RESULT_ROWS", "5000"))
+GZIP_MIN_BYTES = 1024
+KEEPALIVE_TIMEOUT = 15
+SSE_HEARTBEAT = 10
+
+
+class ServerBusy(Exception):
+    """All workers and backlog slots are taken"""
+
+
+def frame_to_columnar(df: Optional[pd.DataFrame], max_rows: int = MAX_RESULT_ROWS) -> Optional[Dict[str, Any]]:
+    """Compact column-wise JSON form of a DataFrame (no repeated keys per row)"""
+
+    if df is None:
+        return None
+
+    truncated = len(df) > max_rows
+    if truncated:
+        df = df.head(max_rows)
+
+    values = []
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = series.dt.strftime("%Y-%m-%dT%H:%M:%S")
+        elif pd.api.types.is_float_dtype(series):
+            # Round-trip floats exactly, but map NaN/inf to null
+            series = series.where(np.isfinite(series.to_numpy(dtype="float64")))
+        values.append(series.astype(object).where(series.notna(), None).tolist())
+
+    return {
+        "columns": [str(col) for col in df.columns],
+        "dtypes": [str(dtype) for dtype in df.dtypes],
+        "values": values,
+        "rows": len(df),
+        "truncated": truncated,
+    }
+
+
+def chart_frame(df: Optional[pd.DataFrame], visualization: Dict[str, Any]) -> Optional[pd.DataFrame]:
+    """Rows the client needs to draw the chart (the table pages through a cursor)"""
+
+    if df is None:
+        return None
+    viz_type = (visualization or {}).get("type", "none")
+    if viz_type in ("line", "bar", "pie"):
+        return reduce_for_chart(df, viz_type)[0]
+    return df.head(DEFAULT_PAGE_SIZE)
+
+
+def serialize_result(result: Dict[str, Any], elapsed_ms: float, cursor_id: Optional[str] = None) -> Dict[str, Any]:
+    """JSON-ready API payload for a process_user_query result"""
+
+    metadata = result.get("metadata", {})
+    visualization = result.get("visualization") or {"type": "none"}
+    data = result.get("data")
+    return {
+        "response": result.get("response", ""),
+        "data": frame_to_columnar(chart_frame(data, visualization)),
+        "rows": 0 if data is None else len(data),
+        "cursor": {"id": cursor_id, "page_size": DEFAULT_PAGE_SIZE} if cursor_id else None,
+        "visualization": visualization,
+        "summary": result.get("summary"),
+        "sql_query": metadata.get("sql_query"),
+        "success": metadata.get("error") is None,
+        "error": metadata.get("error"),
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """Routes for the query API; the agent is shared via the server"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    timeout = KEEPALIVE_TIMEOUT    # idle keep-alive connections release their thread
+    server_version = "SQLAgentAPI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+        encoding = None
+        if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            encoding = "gzip"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self._send_cors_headers()
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_cors_headers(self):
+        self.send_header("Access-Control-Allow-Origin", self.server.cors_origin)
+        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, DELETE, OPTIONS")
+
+    def _read_json(self) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[int, str]]]:
+        """Parse the request body, or return (None, (status, error))"""
+
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            return None, (400, "Invalid Content-Length")
+
+        if length > MAX_BODY_BYTES:
+            # Don't read an oversized body; close so it isn't parsed as the next request
+            self.close_connection = True
+            return None, (413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
+
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None, (400, "Body must be JSON")
+
+        if not isinstance(payload, dict):
+            return None, (400, "Body must be a JSON object")
+        return payload, None
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._send_cors_headers()
+        self.send_header("Access-Control-Max-Age", "600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok", **self.server.get_stats()})
+        elif url.path == "/ready":
+            ready = self.server.is_ready()
+            self._send_json(200 if ready else 503, {"ready": ready})
+        elif url.path.startswith("/api/jobs/"):
+            self._job_status(url.path[len("/api/jobs/"):])
+        elif url.path.startswith("/api/results/"):
+            self._result_page(url.path[len("/api/results/"):], parse_qs(url.query))
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def _result_page(self, cursor_id: str, params: Dict[str, List[str]]):
+        """
+        GET /api/results/<id>?page=0&page_size=100&sort=col&desc=1&filter.<col>=text
+        One sorted/filtered page of a previous result
+        """
+
+        first = lambda name, default=None: params.get(name, [default])[0]
+        filters = {name[len("filter."):]: values[0] for name, values in params.items() if name.startswith("filter.")}
+
+        try:
+            page = self.server.run(
+                self.server.cursors.page, cursor_id,
+                page=int(first("page", "0")),
+                page_size=int(first("page_size", str(DEFAULT_PAGE_SIZE))),
+                sort=first("sort") or None,
+                descending=first("desc", "0") in ("1", "true"),
+                filters=filters
+            )
+        except ServerBusy:
+            self._send_json(503, {"error": "Server busy"}, {"Retry-After": "1"})
+            return
+        except KeyError:
+            self._send_json(404, {"error": "Unknown or expired result"})
+            return
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        page["data"] = frame_to_columnar(page["data"])
+        self._send_json(200, {"cursor": cursor_id, **page})
+
+    def _parse_query_request(self) -> Optional[Tuple[str, str]]:
+        """Validated (query, session_id), or None after sending an error response"""
+
+        payload, error = self._read_json()
+        if error:
+            self._send_json(error[0], {"error": error[1]})
+            return None
+
+        query = payload.get("query")
+        if not isinstance(query, str) or not query.strip():
+            self._send_json(400, {"error": "'query' must be a non-empty string"})
+            return None
+        if len(query) > MAX_QUERY_CHARS:
+            self._send_json(413, {"error": f"'query' exceeds {MAX_QUERY_CHARS} characters"})
+            return None
+
+        return query.strip(), str(payload.get("session_id") or "api")[:128]
+
+    def do_POST(self):
+        if self.path == "/api/query/stream":
+            self._stream_query()
+            return
+        if self.path == "/api/jobs":
+            self._submit_job()
+            return
+        if self.path != "/api/query":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        request = self._parse_query_request()
+        if request is None:
+            return
+        query, session_id = request
+
+        start = time.perf_counter()
+        try:
+            result = self.server.run(self.server.agent.process_user_query, query, session_id=session_id)
+        except ServerBusy:
+            self._send_json(503, {"error": "Server busy"}, {"Retry-After": "1"})
+            return
+        except Exception as e:
+            self.server.record(False)
+            self._send_json(500, {"error": str(e)})
+            return
+
+        response = serialize_result(result, (time.perf_counter() - start) * 1000, self.server.open_cursor(result))
+        self.server.record(True)
+        self._send_json(200, response)
+
+    def do_DELETE(self):
+        if not self.path.startswith("/api/jobs/"):
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        job_id = self.path[len("/api/jobs/"):]
+        if self.server.jobs.status(job_id) is None:
+            self._send_json(404, {"error": "Unknown job"})
+            return
+        self._send_json(200, {"id": job_id, "cancelled": self.server.jobs.cancel(job_id)})
+
+    def _submit_job(self):
+        """POST /api/jobs {query, session_id} or {sql}: run in the background, return a job id"""
+
+        payload, error = self._read_json()
+        if error:
+            self._send_json(error[0], {"error": error[1]})
+            return
+
+        text = payload.get("sql") or payload.get("query")
+        if not isinstance(text, str) or not text.strip():
+            self._send_json(400, {"error": "'query' or 'sql' must be a non-empty string"})
+            return
+        if len(text) > MAX_QUERY_CHARS:
+            self._send_json(413, {"error": f"Request exceeds {MAX_QUERY_CHARS} characters"})
+            return
+
+        if payload.get("sql"):
+            job_id = self.server.jobs.submit_sql(text.strip())
+        else:
+            job_id = self.server.jobs.submit_question(text.strip(), str(payload.get("session_id") or "api")[:128])
+        self._send_json(202, {"id": job_id, "status_url": f"/api/jobs/{job_id}"})
+
+    def _job_status(self, job_id: str):
+        """GET /api/jobs/<id>: progress while running, the serialized result once done"""
+
+        status = self.server.jobs.status(job_id)
+        if status is None:
+            self._send_json(404, {"error": "Unknown job"})
+            return
+
+        if status["status"] in ("done", "failed"):
+            result = self.server.jobs.result(job_id)
+            if result is not None:
+                status["result"] = serialize_result(
+                    result, status["progress"]["elapsed_ms"], self.server.job_cursor(job_id, result)
+                )
+        self._send_json(200, status)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream_query(self):
+        """
+        Server-sent events over chunked HTTP/1.1: status → token* → sql →
+        page* → visualization → done. Headers and the first event go out
+        before the LLM is called.
+        """
+
+        request = self._parse_query_request()
+        if request is None:
+            return
+        query, session_id = request
+
+        events: "queue.Queue" = queue.Queue()
+        start = time.perf_counter()
+        try:
+            future = self.server.submit(
+                self.server.agent.process_user_query, query, session_id=session_id,
+                on_event=lambda event, data: events.put((event, data)), page_size=DEFAULT_PAGE_SIZE
+            )
+        except ServerBusy:
+            self._send_json(503, {"error": "Server busy"}, {"Retry-After": "1"})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("X-Accel-Buffering", "no")
+        self._send_cors_headers()
+        self.end_headers()
+
+        # Wake the writer loop as soon as the agent finishes
+        future.add_done_callback(lambda _: events.put(None))
+
+        sent_rows = 0
+        try:
+            self._write_chunk(sse_event("status", {"stage": "thinking"}))
+
+            while True:
+                try:
+                    item = events.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    self._write_chunk(b": keep-alive\n\n")
+                    continue
+                if item is None:
+                    break
+                event, data = item
+
+                if event == "page":
+                    # Only the first page is pushed; the rest is fetched through the cursor
+                    if sent_rows >= DEFAULT_PAGE_SIZE:
+                        continue
+                    page = frame_to_columnar(data["data"], max_rows=DEFAULT_PAGE_SIZE - sent_rows)
+                    sent_rows += page["rows"]
+                    data = {"offset": data["offset"], "data": page}
+                elif event == "reset":
+                    sent_rows = 0
+                elif event == "sql":
+                    self._write_chunk(sse_event("status", {"stage": "executing"}))
+
+                self._write_chunk(sse_event(event, data))
+
+            try:
+                result = future.result()
+            except Exception as e:
+                self.server.record(False)
+                self._write_chunk(sse_event("error", {"error": str(e)}))
+            else:
+                self.server.record(True)
+                final = serialize_result(result, (time.perf_counter() - start) * 1000, self.server.open_cursor(result))
+                self._write_chunk(sse_event("visualization", {
+                    "visualization": final["visualization"], "data": final.pop("data")
+                }))
+                self._write_chunk(sse_event("done", final))
+
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; the agent finishes in the background
+            self.close_connection = True
+
+
+class APIServer(ThreadingMixIn, HTTPServer):
+    """
+    Keep-alive connections are handled on lightweight I/O threads; agent work
+    runs on a bounded worker pool. Requests beyond workers + backlog get 503,
+    as do connections beyond max_connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        agent: SQLAgentSystem,
+        workers: int = 8,
+        backlog: int = 32,
+        max_connections: int = 256,
+        job_workers: int = 2,
+        cors_origin: str = "*",
+        verbose: bool = False
+    ):
+        super().__init__(address, APIRequestHandler)
+        self.agent = agent
+        self.cors_origin = cors_origin
+        self.verbose = verbose
+        self.started = time.time()
+
+        self.cursors = CursorManager(agent.db_manager)
+        self.jobs = JobManager(agent, workers=job_workers)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+        self._work_slots = threading.BoundedSemaphore(workers + backlog)
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rejected": 0, "in_flight": 0, "connections": 0}
+
+    def process_request(self, request, client_address):
+        if not self._connection_slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.stats["rejected"] += 1
+            self._reject(request)
+            return
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        with self._stats_lock:
+            self.stats["connections"] += 1
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._stats_lock:
+                self.stats["connections"] -= 1
+            self._connection_slots.release()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue agent work on the worker pool.
+        Raises ServerBusy when workers and backlog are all taken.
+        """
+
+        if not self._work_slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.stats["rejected"] += 1
+            raise ServerBusy()
+
+        with self._stats_lock:
+            self.stats["in_flight"] += 1
+
+        def _release(_):
+            with self._stats_lock:
+                self.stats["in_flight"] -= 1
+            self._work_slots.release()
+
+        future = self.pool.submit(fn, *args, **kwargs)
+        future.add_done_callback(_release)
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run agent work on the worker pool and wait for it"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _reject(self, request):
+        body = b'{"error":"Server busy"}'
+        try:
+            request.sendall(
+                b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                b"Retry-After: 1\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def open_cursor(self, result: Dict[str, Any]) -> Optional[str]:
+        """Register a successful result for paging through /api/results/<id>"""
+
+        if result.get("data") is None or not result["metadata"].get("sql_query"):
+            return None
+        return self.cursors.open(result["metadata"]["sql_query"], result["data"])
+
+    def job_cursor(self, job_id: str, result: Dict[str, Any]) -> Optional[str]:
+        """Cursor over a finished job's data, opened on first poll and reused after"""
+
+        if job_id in self.cursors:
+            return job_id
+        if result.get("data") is None or not result["metadata"].get("sql_query"):
+            return None
+        return self.cursors.open(result["metadata"]["sql_query"], result["data"], result_id=job_id)
+
+    def record(self, ok: bool):
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            if not ok:
+                self.stats["errors"] += 1
+
+    def is_ready(self) -> bool:
+        thread = self.agent._warm_up_thread
+        return self.agent._sql_agent_prompt is not None and (thread is None or not thread.is_alive())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {**self.stats, "uptime_s": round(time.time() - self.started, 1)}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def create_server(
+    db_path: str,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    model: Optional[str] = None,
+    workers: int = 8,
+    backlog: int = 32,
+    max_connections: int = 256,
+    job_workers: int = 2,
+    cors_origin: str = "*",
+    verbose: bool = False
+) -> APIServer:
+    """Build the agent (warming up in the background) and bind the server"""
+
+    agent = SQLAgentSystem(db_path, model=model, warm_up=True)
+    return APIServer(
+        (host, port), agent, workers=workers, backlog=backlog, max_connections=max_connections,
+        job_workers=job_workers, cors_origin=cors_origin, verbose=verbose
+    )
+
+
+def main(argv=None):
+    project_dir = Path(__file__).parent.parent
+
+    parser = argparse.ArgumentParser(description="HTTP API for the SQL AI Agent")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", str(project_dir / "data" / "ecommerce.db")))
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--model", help="LLM model (defaults to AI_MODEL)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "8")))
+    parser.add_argument("--backlog", type=int, default=32, help="Requests queued beyond the workers before 503")
+    parser.add_argument("--max-connections", type=int, default=256, help="Open keep-alive connections before 503")
+    parser.add_argument("--job-workers", type=int, default=int(os.getenv("API_JOB_WORKERS", "2")),
+                        help="Background jobs running at once")
+    parser.add_argument("--cors-origin", default=os.getenv("API_CORS_ORIGIN", "*"))
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    if not Path(args.db).exists():
+        print(f"❌ Database not found: {args.db}")
+        return 1
+
+    server = create_server(
+        args.db, args.host, args.port, args.model, args.workers, args.backlog,
+        args.max_connections, args.job_workers, args.cors_origin, args.verbose
+    )
+    print(f"🚀 SQL AI Agent API on http://{args.host}:{args.port} ({args.workers} workers)")
+    print("   POST /api/query · POST /api/query/stream · POST /api/jobs · GET /health · GET /ready")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Shutting down")
+    finally:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
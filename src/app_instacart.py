@@ -9,9 +9,13 @@ from pathlib import Path
 import pandas as pd
 from datetime import datetime
 import uuid
+import time
 
 from agents import SQLAgentSystem
-from database import DatabaseManager
+from downsample import reduce_for_chart
+from result_store import ResultStore
+from cursors import CursorManager, DEFAULT_PAGE_SIZE
+from jobs import JobManager
 
 # Page configuration
 st.set_page_config(
@@ -53,8 +57,25 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def init_session_state():
-    """Initialize Streamlit session state"""
+@st.cache_resource(show_spinner="Loading database schema...")
+def get_agent_system(db_path: str) -> SQLAgentSystem:
+    """
+    Process-wide agent system shared by every browser session
+
+    Schema extraction, prompts, the LLM client and the connection pool are
+    built once per process instead of once per visitor.
+    """
+    return SQLAgentSystem(db_path, warm_up=True)
+
+
+@st.cache_resource
+def get_job_manager(db_path: str) -> JobManager:
+    """Process-wide background job runner, so jobs survive reruns and reconnects"""
+    return JobManager(get_agent_system(db_path))
+
+
+def init_session_state() -> SQLAgentSystem:
+    """Initialize per-session Streamlit state and return the shared agent"""
 
     if "session_id" not in st.session_state:
         st.session_state.session_id = str(uuid.uuid4())
@@ -62,27 +83,34 @@ def init_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    if "agent" not in st.session_state:
-        # Initialize agent system
-        project_dir = Path(__file__).parent.parent
-        db_path = project_dir / "data" / "instacart.db"
-        
-        # Fallback to ecommerce if instacart missing (safe default)
-        if not db_path.exists():
-            st.warning("⚠️ Instacart DB not found. Falling back to default.")
-            db_path = project_dir / "data" / "ecommerce.db"
-
-        if not db_path.exists():
-            st.error(f"❌ Database not found at {db_path}! Please run setup script.")
-            st.stop()
-
-        try:
-            st.session_state.agent = SQLAgentSystem(str(db_path))
-            st.session_state.db_manager = DatabaseManager(str(db_path))
-        except Exception as e:
-            st.error(f"❌ Failed to initialize agent: {e}")
-            st.error("Make sure you have set up your API keys in the .env file")
-            st.stop()
+    if "result_store" not in st.session_state:
+        # Recent results stay in memory; older ones spill to compressed files
+        st.session_state.result_store = ResultStore()
+
+    project_dir = Path(__file__).parent.parent
+    db_path = project_dir / "data" / "instacart.db"
+    
+    # Fallback to ecommerce if instacart missing (safe default)
+    if not db_path.exists():
+        st.warning("⚠️ Instacart DB not found. Falling back to default.")
+        db_path = project_dir / "data" / "ecommerce.db"
+
+    if not db_path.exists():
+        st.error(f"❌ Database not found at {db_path}! Please run setup script.")
+        st.stop()
+
+    try:
+        agent = get_agent_system(str(db_path))
+    except Exception as e:
+        st.error(f"❌ Failed to initialize agent: {e}")
+        st.error("Make sure you have set up your API keys in the .env file")
+        st.stop()
+
+    if "cursors" not in st.session_state:
+        # Paged, sorted and filtered views over the stored results
+        st.session_state.cursors = CursorManager(agent.db_manager, st.session_state.result_store)
+
+    return agent
 
 
 def create_visualization(df: pd.DataFrame, viz_config: dict):
@@ -150,6 +178,149 @@ def create_visualization(df: pd.DataFrame, viz_config: dict):
         return None
 
 
+def prepare_chart(df: pd.DataFrame, viz_config: dict) -> dict:
+    """Downsample a result once to the small frame its chart needs"""
+
+    chart_df, reduction = reduce_for_chart(df, viz_config.get("type", "table"))
+    if chart_df is not None:
+        chart_df = chart_df.iloc[:, :2].copy()
+    return {"df": chart_df, "reduction": reduction}
+
+
+def show_visualization(chart: dict, viz_config: dict):
+    """Render a prepared chart and report payload size and render time"""
+
+    start = time.perf_counter()
+    fig = create_visualization(chart["df"], viz_config)
+    if not fig:
+        return
+
+    # Serializing the figure costs as much as sending it: measure it on the
+    # first render only and keep it with the message for later reruns
+    if "payload_kb" not in chart:
+        chart["payload_kb"] = len(fig.to_json()) / 1024
+    st.plotly_chart(fig, use_container_width=True)
+
+    reduction = chart["reduction"]
+    render_ms = reduction["elapsed_ms"] + (time.perf_counter() - start) * 1000
+    points = f"{reduction['rows']:,} points"
+    if reduction["method"]:
+        points = f"{reduction['rows']:,} of {reduction['original_rows']:,} points ({reduction['method']})"
+    st.caption(f"📉 {points} · {chart['payload_kb']:,.0f} KB payload · {render_ms:.0f} ms render")
+
+
+def show_result_table(result_id: str):
+    """One sorted/filtered page of a stored result at a time"""
+
+    cursors = st.session_state.cursors
+    info = cursors.info(result_id)
+    if info is None:
+        st.info("This result is no longer available.")
+        return
+
+    sort_col, desc_col, filter_col, text_col, page_col = st.columns([2, 1, 2, 2, 1])
+    sort = sort_col.selectbox("Sort by", ["(none)"] + info["columns"], key=f"sort_{result_id}")
+    descending = desc_col.toggle("Desc", key=f"desc_{result_id}")
+    filter_column = filter_col.selectbox("Filter column", info["columns"], key=f"filter_col_{result_id}")
+    filter_text = text_col.text_input("Contains", key=f"filter_{result_id}")
+    page_number = page_col.number_input("Page", min_value=1, value=1, step=1, key=f"page_{result_id}")
+
+    try:
+        page = cursors.page(
+            result_id,
+            page=page_number - 1,
+            page_size=DEFAULT_PAGE_SIZE,
+            sort=None if sort == "(none)" else sort,
+            descending=descending,
+            filters={filter_column: filter_text} if filter_text else None
+        )
+    except (KeyError, ValueError) as e:
+        st.info(f"Can't show this result: {e}")
+        return
+
+    st.dataframe(page["data"], use_container_width=True)
+    st.caption(f"Page {page['page'] + 1} of {page['pages']} · {page['total_rows']:,} rows")
+
+
+def display_result(message: dict):
+    """Chart, lazily loaded data table and SQL for an assistant message"""
+
+    result_id = message.get("result_id")
+    if result_id:
+        if message.get("chart") and message["visualization"]["type"] != "none":
+            show_visualization(message["chart"], message["visualization"])
+
+        # Only load the result (possibly from disk) when the user asks for it
+        if st.toggle(f"📊 View Data ({message['rows']:,} rows)", key=f"view_{result_id}"):
+            show_result_table(result_id)
+
+    if message.get("sql_query"):
+        with st.expander("🔍 SQL Query", expanded=False):
+            st.code(message["sql_query"], language="sql")
+
+
+def build_assistant_message(result: dict) -> dict:
+    """Session message for an agent result, with its data moved into the result store"""
+
+    message = {
+        "role": "assistant",
+        "content": result["response"],
+        "visualization": result["visualization"],
+        "sql_query": result["metadata"].get("sql_query")
+    }
+
+    # Keep the DataFrame in the bounded result store, not in session messages
+    if result["data"] is not None and len(result["data"]) > 0:
+        message["result_id"] = st.session_state.cursors.open(
+            result["metadata"]["sql_query"], result["data"]
+        )
+        message["rows"] = len(result["data"])
+        message["chart"] = prepare_chart(result["data"], result["visualization"])
+
+    return message
+
+
+def show_job_progress(message: dict, jobs: JobManager):
+    """Progress and cancel controls for a background job; replaces the message when it finishes"""
+
+    status = jobs.status(message["job_id"])
+    if status is None:
+        message.pop("job_id")
+        message["content"] = "⚠️ This background job is no longer available."
+        st.rerun()
+
+    if status["status"] in ("queued", "running"):
+        progress = status["progress"]
+        st.markdown(f"⏳ **{status['stage'].replace('_', ' ').capitalize()}** · "
+                    f"{progress['elapsed_ms'] / 1000:.1f}s · {progress['vm_steps']:,} VM steps · "
+                    f"{progress['rows_fetched']:,} rows fetched")
+        if status["sql"]:
+            st.code(status["sql"], language="sql")
+        if st.button("✖️ Cancel", key=f"cancel_{message['job_id']}"):
+            jobs.cancel(message["job_id"])
+        return
+
+    result = jobs.result(message["job_id"])
+    if status["status"] == "cancelled" or result is None:
+        message.clear()
+        message.update({"role": "assistant", "content": "🛑 Query cancelled.", "sql_query": status["sql"]})
+    else:
+        message.clear()
+        message.update(build_assistant_message(result))
+    st.rerun()
+
+
+def display_job(message: dict, jobs: JobManager):
+    """Poll a running job once a second where Streamlit supports fragments"""
+
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is not None:
+        fragment(run_every=1)(show_job_progress)(message, jobs)
+    else:
+        show_job_progress(message, jobs)
+        st.button("🔄 Refresh", key=f"refresh_{message['job_id']}")
+
+
 def display_sample_queries():
     """Display Instacart sample query buttons"""
 
@@ -176,7 +347,8 @@ def display_sample_queries():
 def main():
     """Main application"""
 
-    init_session_state()
+    agent = init_session_state()
+    jobs = get_job_manager(str(agent.db_path))
 
     # Sidebar
     with st.sidebar:
@@ -196,11 +368,12 @@ def main():
         # Session management
         st.markdown("### 💬 Sessions")
 
-        sessions = st.session_state.db_manager.get_all_sessions()
+        sessions = agent.db_manager.get_all_sessions()
 
         if st.button("➕ New Session", use_container_width=True):
             st.session_state.session_id = str(uuid.uuid4())
             st.session_state.messages = []
+            st.session_state.cursors.clear()
             st.rerun()
 
         if sessions and len(sessions) > 1:
@@ -213,25 +386,36 @@ def main():
             if selected_session != "Current" and selected_session != st.session_state.session_id:
                 st.session_state.session_id = selected_session
                 # Load messages
-                history = st.session_state.db_manager.get_chat_history(selected_session, limit=50)
+                history = agent.db_manager.get_chat_history(selected_session, limit=50)
                 st.session_state.messages = history
+                st.session_state.cursors.clear()
                 st.rerun()
 
         st.markdown("---")
 
         # Stats
         st.markdown("### 📈 Statistics")
-        query_stats = st.session_state.db_manager.get_query_stats()
+        query_stats = agent.db_manager.get_query_stats()
 
         col1, col2 = st.columns(2)
         col1.metric("Total Queries", query_stats.get("total", 0))
         col2.metric("Success Rate", query_stats.get("success_rate", "0%"))
 
+        repair_stats = agent.get_repair_stats()
+        col3, col4 = st.columns(2)
+        col3.metric("Local Repairs", repair_stats["local_hit_rate"])
+        col4.metric("Latency Saved", f"{repair_stats['latency_saved_ms'] / 1000:.1f}s")
+
+        st.markdown("---")
+
+        background = st.toggle("⏳ Run in background", help="Keep the chat responsive during long queries")
+
         st.markdown("---")
 
         if st.button("🗑️ Clear Chat", use_container_width=True):
-            st.session_state.db_manager.clear_chat_history(st.session_state.session_id)
+            agent.db_manager.clear_chat_history(st.session_state.session_id)
             st.session_state.messages = []
+            st.session_state.cursors.clear()
             st.rerun()
 
     # Main content
@@ -256,22 +440,10 @@ def main():
             st.markdown(message["content"])
 
             # Display data and visualization if available
-            if message["role"] == "assistant" and "data" in message:
-                if message["data"] is not None and len(message["data"]) > 0:
-                    # Show visualization
-                    if "visualization" in message and message["visualization"]["type"] != "none":
-                        fig = create_visualization(message["data"], message["visualization"])
-                        if fig:
-                            st.plotly_chart(fig, use_container_width=True)
-
-                    # Show data table in expander
-                    with st.expander("📊 View Data", expanded=False):
-                        st.dataframe(message["data"], use_container_width=True)
-
-                # Show SQL query in expander
-                if "sql_query" in message and message["sql_query"]:
-                    with st.expander("🔍 SQL Query", expanded=False):
-                        st.code(message["sql_query"], language="sql")
+            if message.get("job_id"):
+                display_job(message, jobs)
+            elif message["role"] == "assistant":
+                display_result(message)
 
     # Chat input
     if prompt := st.chat_input("Ask a question about your data..."):
@@ -282,43 +454,30 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
 
+        if background:
+            job_id = jobs.submit_question(
+                prompt,
+                session_id=st.session_state.session_id,
+                chat_history=st.session_state.messages[:-1]
+            )
+            st.session_state.messages.append({"role": "assistant", "content": "", "job_id": job_id})
+            st.rerun()
+
         # Get agent response
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 # Process query
-                result = st.session_state.agent.process_user_query(
+                result = agent.process_user_query(
                     prompt,
                     session_id=st.session_state.session_id,
-                    chat_history=st.session_state.messages[-5:]  # Last 5 messages for context
+                    chat_history=st.session_state.messages[:-1]  # Budgeted and summarized by the agent
                 )
 
                 # Display response
                 st.markdown(result["response"])
 
-                # Store full result in message
-                assistant_message = {
-                    "role": "assistant",
-                    "content": result["response"],
-                    "data": result["data"],
-                    "visualization": result["visualization"],
-                    "sql_query": result["metadata"].get("sql_query")
-                }
-
-                # Display visualization
-                if result["data"] is not None and len(result["data"]) > 0:
-                    if result["visualization"]["type"] != "none":
-                        fig = create_visualization(result["data"], result["visualization"])
-                        if fig:
-                            st.plotly_chart(fig, use_container_width=True)
-
-                    # Show data in expander
-                    with st.expander("📊 View Data", expanded=False):
-                        st.dataframe(result["data"], use_container_width=True)
-
-                # Show SQL query
-                if result["metadata"].get("sql_query"):
-                    with st.expander("🔍 SQL Query", expanded=False):
-                        st.code(result["metadata"]["sql_query"], language="sql")
+                assistant_message = build_assistant_message(result)
+                display_result(assistant_message)
 
                 # Add to messages
                 st.session_state.messages.append(assistant_message)
@@ -0,0 +1,735 @@
+"""
+Performance benchmarks for the SQL AI Agent
+Run from the project root, e.g.:
+
+    python src/benchmark.py importtime
+    python src/benchmark.py ttfa --model replay
+    python src/benchmark.py speculative --latency-ms 400
+    python src/benchmark.py batch --latency-ms 400
+    python src/benchmark.py load --orders 100000
+    python src/benchmark.py ingest --orders 500000 --workers 1,2,4,8
+    python src/benchmark.py schema --orders 100000
+    python src/benchmark.py geo --orders 100000
+    python src/benchmark.py dates --orders 100000
+
+Each benchmark prints a human-readable report and can write JSON (--json)
+so results can be compared across commits to catch regressions.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Any
+
+from datasets import OLIST_QUERIES
+
+SRC_DIR = Path(__file__).parent
+PROJECT_DIR = SRC_DIR.parent
+DEFAULT_DB = PROJECT_DIR / "data" / "ecommerce.db"
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `python -X importtime` output into {module, self_us, cumulative_us, depth}"""
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": raw_name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(raw_name) - len(raw_name.lstrip())) // 2,
+        })
+
+    return entries
+
+
+def bench_importtime(module: str = "agents", repeat: int = 5, top: int = 10) -> Dict[str, Any]:
+    """Measure the cold import cost of a module with `python -X importtime`"""
+
+    runs = []
+    heaviest = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+        entries = parse_importtime(proc.stderr)
+        target = next((e for e in reversed(entries) if e["module"] == module), None)
+        runs.append({
+            "wall_ms": wall_ms,
+            "import_ms": target["cumulative_us"] / 1000 if target else None,
+        })
+        heaviest = sorted(
+            (e for e in entries if e["depth"] == 1),
+            key=lambda e: e["cumulative_us"],
+            reverse=True
+        )[:top]
+
+    import_times = sorted(r["import_ms"] for r in runs if r["import_ms"] is not None)
+
+    return {
+        "benchmark": "importtime",
+        "module": module,
+        "runs": repeat,
+        "import_ms_median": import_times[len(import_times) // 2] if import_times else None,
+        "import_ms_min": import_times[0] if import_times else None,
+        "wall_ms_median": sorted(r["wall_ms"] for r in runs)[len(runs) // 2],
+        "heaviest_imports": [
+            {"module": e["module"], "cumulative_ms": e["cumulative_us"] / 1000}
+            for e in heaviest
+        ],
+    }
+
+
+def bench_ttfa(db_path: str, model: str, question: str) -> Dict[str, Any]:
+    """
+    Time-to-first-answer in a fresh interpreter: import, construct the agent
+    system and answer one question end to end.
+    """
+
+    script = f"""
+import json, time
+t0 = time.perf_counter()
+from agents import SQLAgentSystem
+t1 = time.perf_counter()
+agent = SQLAgentSystem({str(db_path)!r}, model={model!r})
+t2 = time.perf_counter()
+result = agent.process_user_query({question!r}, session_id="benchmark")
+t3 = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (t1 - t0) * 1000,
+    "construct_ms": (t2 - t1) * 1000,
+    "first_answer_ms": (t3 - t2) * 1000,
+    "ttfa_ms": (t3 - t0) * 1000,
+    "error": result["metadata"]["error"],
+}}))
+"""
+    proc = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"TTFA run failed:\n{proc.stderr[-2000:]}")
+
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return {"benchmark": "ttfa", "model": model, "question": question, **timings}
+
+
+def replay_model(rules: List[Dict[str, str]], workdir: str) -> str:
+    """Write replay rules to a file and return the matching model name"""
+
+    path = Path(workdir) / "replay_rules.json"
+    path.write_text(json.dumps(rules))
+    return f"replay:{path}"
+
+
+def fresh_db(db_path: str, workdir: str, name: str) -> str:
+    """Copy the database so each mode starts without cached SQL or examples from another"""
+
+    path = Path(workdir) / f"{name}.db"
+    shutil.copyfile(db_path, path)
+    return str(path)
+
+
+def bench_speculative(db_path: str, latency_ms: float, rounds: int) -> Dict[str, Any]:
+    """
+    Sequential vs speculative process_user_query on the replay backend.
+    One in four messages is conversational, so some speculation is wasted.
+    """
+
+    sys.path.insert(0, str(SRC_DIR))
+    from agents import SQLAgentSystem
+
+    chat_reply = json.dumps({
+        "response": "Hello! Ask me anything about the data.",
+        "needs_query": False,
+        "enhanced_query": None,
+        "visualization": {"type": "none"}
+    })
+    messages = ["How many orders are there?", "Count orders by status", "Hello!", "How many customers are there?"]
+    os.environ["REPLAY_LATENCY_MS"] = str(latency_ms)
+
+    report = {"benchmark": "speculative", "llm_latency_ms": latency_ms, "messages": rounds * len(messages)}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model = replay_model([
+            {"agent": "main", "match": "Hello", "response": chat_reply},
+            {"agent": "sql", "match": "How many orders", "response": "SELECT COUNT(*) AS orders FROM orders"},
+            {"agent": "sql", "match": "orders by status",
+             "response": "SELECT order_status, COUNT(*) AS orders FROM orders GROUP BY order_status"},
+            {"agent": "sql", "match": "How many customers", "response": "SELECT COUNT(*) AS customers FROM customers"},
+        ], workdir)
+
+        for mode in ("sequential", "speculative"):
+            agent = SQLAgentSystem(
+                fresh_db(db_path, workdir, mode), model=model, speculative=(mode == "speculative")
+            )
+            agent.warm_up(background=False)
+
+            latencies = []
+            for _ in range(rounds):
+                for message in messages:
+                    start = time.perf_counter()
+                    agent.process_user_query(message, session_id=f"benchmark-{mode}", chat_history=[])
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            latencies.sort()
+            report[f"{mode}_mean_ms"] = sum(latencies) / len(latencies)
+            report[f"{mode}_p95_ms"] = latencies[int(len(latencies) * 0.95) - 1]
+
+            if mode == "speculative":
+                stats = agent.get_speculation_stats()
+                report["wasted_work_ratio"] = stats["wasted_work_ratio"]
+                report["committed"] = stats["committed"]
+                report["wasted"] = stats["wasted"]
+
+    report["latency_improvement"] = 1 - report["speculative_mean_ms"] / report["sequential_mean_ms"]
+    return report
+
+
+def bench_batch(db_path: str, latency_ms: float, copies: int) -> Dict[str, Any]:
+    """Throughput of process_batch versus sequential process_user_query (replay backend)"""
+
+    sys.path.insert(0, str(SRC_DIR))
+    from agents import SQLAgentSystem
+
+    questions = [
+        "How many orders are there?",
+        "Count orders by status",
+        "How many customers are there?",
+        "Count customers by state",
+        "Total payment value by payment type",
+        "How many products are there?",
+    ]
+    # Repeated questions, as when sample buttons are clicked again
+    workload = (questions * copies)[:len(questions) + copies]
+    os.environ["REPLAY_LATENCY_MS"] = str(latency_ms)
+
+    rules = [
+        {"agent": "sql", "match": "How many orders", "response": "SELECT COUNT(*) AS orders FROM orders"},
+        {"agent": "sql", "match": "orders by status",
+         "response": "SELECT order_status, COUNT(*) AS orders FROM orders GROUP BY order_status"},
+        {"agent": "sql", "match": "How many customers", "response": "SELECT COUNT(*) AS customers FROM customers"},
+        {"agent": "sql", "match": "customers by state",
+         "response": "SELECT customer_state, COUNT(*) AS customers FROM customers GROUP BY customer_state"},
+        {"agent": "sql", "match": "payment value",
+         "response": "SELECT payment_type, SUM(payment_value) AS total FROM order_payments GROUP BY payment_type"},
+        {"agent": "sql", "match": "How many products", "response": "SELECT COUNT(*) AS products FROM products"},
+    ]
+
+    report = {"benchmark": "batch", "llm_latency_ms": latency_ms, "questions": len(workload)}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        model = replay_model(rules, workdir)
+
+        for mode in ("sequential", "batch"):
+            agent = SQLAgentSystem(fresh_db(db_path, workdir, mode), model=model)
+            agent.warm_up(background=False)
+
+            start = time.perf_counter()
+            if mode == "sequential":
+                results = [
+                    agent.process_user_query(q, session_id=f"benchmark-{mode}", chat_history=[])
+                    for q in workload
+                ]
+            else:
+                results = agent.process_batch(workload, session_id=f"benchmark-{mode}", chat_history=[])
+            elapsed = time.perf_counter() - start
+
+            report[f"{mode}_seconds"] = elapsed
+            report[f"{mode}_questions_per_sec"] = len(workload) / elapsed
+            report[f"{mode}_llm_calls"] = agent.llm.calls
+            report[f"{mode}_errors"] = sum(1 for r in results if r["metadata"]["error"])
+
+    report["speedup"] = report["sequential_seconds"] / report["batch_seconds"]
+    return report
+
+
+def bench_load(raw_dir: str = None, orders: int = 100_000, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Per-table load throughput: DataFrame.to_sql with default settings and
+    indexes created afterwards vs the BulkLoader. CSVs are parsed once up
+    front, so only the write path is timed; each table keeps its best of
+    `repeat` runs. Uses synthetic Olist CSVs when no raw directory is given.
+    """
+    import sqlite3
+    import pandas as pd
+    from bulk_load import BulkLoader
+    from sample_data import write_olist_csvs
+    from datasets import OLIST_TABLES, OLIST_INDEXES
+    from sources import find_sources
+
+    source = raw_dir or f"synthetic ({orders:,} orders)"
+    with tempfile.TemporaryDirectory() as workdir:
+        if raw_dir is None:
+            raw_dir = Path(workdir) / "raw"
+            write_olist_csvs(raw_dir, orders)
+        frames = {}
+        for table, csv in find_sources(raw_dir, OLIST_TABLES).items():
+            with csv.open() as f:
+                frames[table] = pd.read_csv(f)
+        # Indexes on generated columns need the typed schema, which to_sql can't create
+        indexes = [index for index in OLIST_INDEXES if set(index[2]) <= set(frames[index[1]].columns)]
+
+        baseline, bulk = {}, {}
+        for run in range(repeat):
+            db_path = Path(workdir) / f"baseline_{run}.db"
+            conn = sqlite3.connect(db_path)
+            for table, df in frames.items():
+                start = time.perf_counter()
+                df.to_sql(table, conn, if_exists="replace", index=False)
+                baseline[table] = min(baseline.get(table, float("inf")), time.perf_counter() - start)
+            start = time.perf_counter()
+            for name, table, columns in indexes:
+                conn.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+                conn.commit()
+            baseline["(indexes)"] = min(baseline.get("(indexes)", float("inf")), time.perf_counter() - start)
+            conn.close()
+            db_path.unlink()
+
+            db_path = Path(workdir) / f"bulk_{run}.db"
+            with BulkLoader(db_path) as loader:
+                for table, df in frames.items():
+                    loader.load_frame(table, df)
+                for index in indexes:
+                    loader.add_index(*index)
+            for entry in loader.stats:
+                bulk[entry["table"]] = min(bulk.get(entry["table"], float("inf")), entry["seconds"])
+            db_path.unlink()
+
+    tables = []
+    for table, seconds in baseline.items():
+        rows = len(frames[table]) if table in frames else 0
+        tables.append(
+            f"{table}: {rows:,} rows, to_sql {seconds:.2f}s"
+            + (f" ({rows / seconds:,.0f} rows/s)" if rows else "")
+            + f" → bulk {bulk[table]:.2f}s"
+            + (f" ({rows / max(bulk[table], 1e-6):,.0f} rows/s)" if rows else "")
+        )
+
+    total_rows = sum(len(df) for df in frames.values())
+    return {
+        "benchmark": "load",
+        "source": source,
+        "total_rows": total_rows,
+        "to_sql_seconds": sum(baseline.values()),
+        "bulk_seconds": sum(bulk.values()),
+        "to_sql_rows_per_sec": total_rows / sum(baseline.values()),
+        "bulk_rows_per_sec": total_rows / sum(bulk.values()),
+        "speedup": sum(baseline.values()) / sum(bulk.values()),
+        "tables": tables,
+    }
+
+
+def bench_ingest(zip_path: str = None, orders: int = 500_000, workers: List[int] = None) -> Dict[str, Any]:
+    """
+    Sequential streaming ingestion vs the parallel parse / single writer
+    pipeline on the Instacart files, for each worker count. Uses a
+    synthetic Instacart zip unless the Kaggle one is given.
+    """
+    import zipfile
+    from datasets import INSTACART_TABLES, INSTACART_DTYPES, INSTACART_INDEXES
+    from ingest import ingest_dataset
+    from parallel_ingest import parallel_ingest
+    from sample_data import write_instacart_zip
+
+    cores = os.cpu_count() or 1
+    workers = workers or sorted({1, 2, 4, cores})
+    source = zip_path or f"synthetic ({orders:,} orders)"
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if zip_path is None:
+            zip_path = Path(workdir) / "instacart.zip"
+            write_instacart_zip(zip_path, orders)
+        with zipfile.ZipFile(zip_path) as z:
+            z.extractall(workdir)
+        sources = {}
+        for name, table in INSTACART_TABLES.items():
+            matches = [p for p in Path(workdir).rglob(name) if "__MACOSX" not in p.parts]
+            if matches:
+                sources[table] = matches[0]
+
+        start = time.perf_counter()
+        loader = ingest_dataset(Path(workdir) / "sequential.db", sources, INSTACART_DTYPES, INSTACART_INDEXES,
+                                resume=False, on_progress=None)
+        sequential = time.perf_counter() - start
+        total_rows = sum(entry["rows"] for entry in loader.stats if entry["table"] in sources)
+        (Path(workdir) / "sequential.db").unlink()
+
+        runs = []
+        for count in workers:
+            db_path = Path(workdir) / f"parallel_{count}.db"
+            start = time.perf_counter()
+            parallel_ingest(db_path, sources, INSTACART_DTYPES, INSTACART_INDEXES, workers=count,
+                            resume=False, on_progress=None)
+            seconds = time.perf_counter() - start
+            runs.append(f"{count} workers: {seconds:.2f}s ({sequential / seconds:.2f}x, "
+                        f"{total_rows / seconds:,.0f} rows/s)")
+            db_path.unlink()
+
+    return {
+        "benchmark": "ingest",
+        "source": source,
+        "cores": cores,
+        "total_rows": total_rows,
+        "sequential_seconds": sequential,
+        "sequential_rows_per_sec": total_rows / sequential,
+        "parallel": runs,
+    }
+
+# Olist indexes before primary keys existed (one per join column)
+LEGACY_OLIST_INDEXES = [
+    ("idx_orders_customer", "orders", ["customer_id"]),
+    ("idx_order_items_order", "order_items", ["order_id"]),
+    ("idx_order_items_product", "order_items", ["product_id"]),
+    ("idx_order_items_seller", "order_items", ["seller_id"]),
+    ("idx_order_payments_order", "order_payments", ["order_id"]),
+    ("idx_order_reviews_order", "order_reviews", ["order_id"]),
+    ("idx_customers_state", "customers", ["customer_state"]),
+    ("idx_sellers_state", "sellers", ["seller_state"]),
+]
+
+SCHEMA_QUERIES = OLIST_QUERIES
+
+
+def bench_schema(raw_dir: str = None, orders: int = 100_000, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Olist database size and join latency: untyped tables with text hash ids
+    and an index per join column vs the typed schema (primary keys, WITHOUT
+    ROWID child tables, integer-encoded ids). Each query keeps its best of
+    `repeat` warm runs. Uses synthetic Olist CSVs when no raw directory is given.
+    """
+    import sqlite3
+    from datasets import OLIST_TABLES, OLIST_DTYPES, OLIST_SCHEMA, OLIST_ENCODED_IDS, OLIST_INDEXES, OLIST_DERIVED
+    from ingest import ingest_dataset
+    from optimize import time_queries
+    from sample_data import write_olist_csvs
+    from sources import find_sources
+
+    source = raw_dir or f"synthetic ({orders:,} orders)"
+    with tempfile.TemporaryDirectory() as workdir:
+        if raw_dir is None:
+            raw_dir = Path(workdir) / "raw"
+            write_olist_csvs(raw_dir, orders)
+        sources = find_sources(raw_dir, OLIST_TABLES)
+
+        variants = {
+            "legacy": dict(indexes=LEGACY_OLIST_INDEXES, derived=OLIST_DERIVED),
+            "typed": dict(indexes=OLIST_INDEXES, schema=OLIST_SCHEMA, encode=OLIST_ENCODED_IDS, derived=OLIST_DERIVED),
+        }
+        sizes, timings = {}, {}
+        for name, options in variants.items():
+            db_path = Path(workdir) / f"{name}.db"
+            ingest_dataset(db_path, sources, OLIST_DTYPES, resume=False, on_progress=None, **options)
+            conn = sqlite3.connect(db_path)
+            conn.execute("DROP TABLE _ingest_progress")
+            conn.commit()
+            conn.execute("VACUUM")
+            sizes[name] = db_path.stat().st_size
+            for label, ms in time_queries(conn, SCHEMA_QUERIES, repeat).items():
+                timings.setdefault(label, {})[name] = ms
+            conn.close()
+
+    # The legacy tables have no date-part columns; compare what both can answer
+    timings = {label: t for label, t in timings.items() if None not in t.values()}
+    queries = [
+        f"{label}: {t['legacy']:.1f} ms → {t['typed']:.1f} ms ({t['legacy'] / t['typed']:.2f}x)"
+        for label, t in timings.items()
+    ]
+    return {
+        "benchmark": "schema",
+        "source": source,
+        "legacy_mb": sizes["legacy"] / 1e6,
+        "typed_mb": sizes["typed"] / 1e6,
+        "size_reduction": 1 - sizes["typed"] / sizes["legacy"],
+        "legacy_query_ms": sum(t["legacy"] for t in timings.values()),
+        "typed_query_ms": sum(t["typed"] for t in timings.values()),
+        "queries": queries,
+    }
+
+
+# Geographic questions answered through the raw zip-prefix join and through
+# the centroid table, as (rows joined, answer) pairs
+GEO_QUERIES = {
+    "located customers": (
+        """SELECT COUNT(*), COUNT(DISTINCT c.customer_id)
+           FROM customers c JOIN geolocation g ON g.geolocation_zip_code_prefix = c.customer_zip_code_prefix""",
+        """SELECT COUNT(*), COUNT(DISTINCT c.customer_id)
+           FROM customers c JOIN geolocation_prefix g ON g.zip_code_prefix = c.customer_zip_code_prefix""",
+    ),
+    "seller revenue by city": (
+        """SELECT COUNT(*), SUM(i.price)
+           FROM order_items i JOIN sellers s ON s.seller_id = i.seller_id
+           JOIN geolocation g ON g.geolocation_zip_code_prefix = s.seller_zip_code_prefix""",
+        """SELECT COUNT(*), SUM(i.price)
+           FROM order_items i JOIN sellers s ON s.seller_id = i.seller_id
+           JOIN geolocation_prefix g ON g.zip_code_prefix = s.seller_zip_code_prefix""",
+    ),
+}
+
+
+def bench_geo(raw_dir: str = None, orders: int = 100_000, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Geographic joins through the raw geolocation table (many rows per zip
+    prefix) vs the one-row-per-prefix geolocation_prefix table: row counts
+    and sums the fan-out inflates, and best-of-`repeat` latency
+    """
+    import sqlite3
+    from datasets import OLIST_TABLES, OLIST_DTYPES, OLIST_SCHEMA, OLIST_ENCODED_IDS, OLIST_INDEXES, OLIST_DERIVED
+    from ingest import ingest_dataset
+    from sample_data import write_olist_csvs
+    from sources import find_sources
+
+    source = raw_dir or f"synthetic ({orders:,} orders)"
+    with tempfile.TemporaryDirectory() as workdir:
+        if raw_dir is None:
+            raw_dir = Path(workdir) / "raw"
+            write_olist_csvs(raw_dir, orders)
+        db_path = Path(workdir) / "olist.db"
+        loader = ingest_dataset(db_path, find_sources(raw_dir, OLIST_TABLES), OLIST_DTYPES, OLIST_INDEXES,
+                                resume=False, on_progress=None, schema=OLIST_SCHEMA, encode=OLIST_ENCODED_IDS,
+                                derived=OLIST_DERIVED)
+        build = next(entry for entry in loader.stats if entry["table"] == "geolocation_prefix")
+
+        conn = sqlite3.connect(db_path)
+        geolocation_rows = conn.execute("SELECT COUNT(*) FROM geolocation").fetchone()[0]
+        results = []
+        for label, (raw_sql, prefix_sql) in GEO_QUERIES.items():
+            timings, answers = [], []
+            for sql in (raw_sql, prefix_sql):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    answer = conn.execute(sql).fetchone()
+                    best = min(best, time.perf_counter() - start)
+                timings.append(best)
+                answers.append(answer)
+            results.append(f"{label}: {timings[0] * 1000:.1f} ms → {timings[1] * 1000:.1f} ms "
+                           f"({timings[0] / timings[1]:.1f}x), rows joined {answers[0][0]:,} → {answers[1][0]:,}, "
+                           f"answer {answers[0][1]:,.0f} → {answers[1][1]:,.0f}")
+        conn.close()
+
+    return {
+        "benchmark": "geo",
+        "source": source,
+        "geolocation_rows": geolocation_rows,
+        "prefix_rows": build["rows"],
+        "prefix_build_seconds": build["seconds"],
+        "queries": results,
+    }
+
+
+# Sample questions as the prompt used to phrase them (strftime/JULIANDAY over
+# raw timestamps) and with the indexed date-part columns of orders
+DATE_QUERIES = {
+    "monthly revenue for 2017": (
+        """SELECT strftime('%Y-%m', o.order_purchase_timestamp) AS month, ROUND(SUM(oi.price + oi.freight_value), 2)
+           FROM orders o JOIN order_items oi ON o.order_id = oi.order_id
+           WHERE strftime('%Y', o.order_purchase_timestamp) = '2017' GROUP BY month ORDER BY month""",
+        """SELECT o.purchase_month AS month, ROUND(SUM(oi.price + oi.freight_value), 2)
+           FROM orders o JOIN order_items oi ON o.order_id = oi.order_id
+           WHERE o.purchase_year = 2017 GROUP BY month ORDER BY month""",
+    ),
+    "monthly orders in 2018": (
+        """SELECT strftime('%Y-%m', order_purchase_timestamp) AS month, COUNT(*) FROM orders
+           WHERE strftime('%Y', order_purchase_timestamp) = '2018' GROUP BY month ORDER BY month""",
+        """SELECT purchase_month AS month, COUNT(*) FROM orders
+           WHERE purchase_year = 2018 GROUP BY month ORDER BY month""",
+    ),
+    "delivery days by state": (
+        """SELECT c.customer_state, ROUND(AVG(JULIANDAY(o.order_delivered_customer_date)
+                                             - JULIANDAY(o.order_purchase_timestamp)), 1) AS avg_days
+           FROM orders o JOIN customers c ON o.customer_id = c.customer_id
+           WHERE o.order_delivered_customer_date IS NOT NULL GROUP BY 1 ORDER BY avg_days DESC, 1""",
+        """SELECT c.customer_state, ROUND(AVG(o.delivery_days), 1) AS avg_days
+           FROM orders o JOIN customers c ON o.customer_id = c.customer_id
+           WHERE o.delivery_days IS NOT NULL GROUP BY 1 ORDER BY avg_days DESC, 1""",
+    ),
+    "orders delivered in over 20 days": (
+        """SELECT COUNT(*) FROM orders
+           WHERE JULIANDAY(order_delivered_customer_date) - JULIANDAY(order_purchase_timestamp) > 20""",
+        """SELECT COUNT(*) FROM orders WHERE delivery_days > 20""",
+    ),
+}
+
+
+def bench_dates(raw_dir: str = None, orders: int = 100_000, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time-series sample questions on one typed Olist database: strftime() and
+    JULIANDAY() over the raw timestamps vs the indexed purchase_year,
+    purchase_month and delivery_days columns (answers must match)
+    """
+    import sqlite3
+    from datasets import OLIST_TABLES, OLIST_DTYPES, OLIST_SCHEMA, OLIST_ENCODED_IDS, OLIST_INDEXES
+    from ingest import ingest_dataset
+    from sample_data import write_olist_csvs
+    from sources import find_sources
+
+    source = raw_dir or f"synthetic ({orders:,} orders)"
+    with tempfile.TemporaryDirectory() as workdir:
+        if raw_dir is None:
+            raw_dir = Path(workdir) / "raw"
+            write_olist_csvs(raw_dir, orders)
+        db_path = Path(workdir) / "olist.db"
+        loader = ingest_dataset(db_path, find_sources(raw_dir, OLIST_TABLES), OLIST_DTYPES, OLIST_INDEXES,
+                                resume=False, on_progress=None, schema=OLIST_SCHEMA, encode=OLIST_ENCODED_IDS)
+        index_seconds = next(entry["seconds"] for entry in loader.stats if entry["table"] == "(indexes)")
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("ANALYZE")
+        results = []
+        for label, (expression_sql, column_sql) in DATE_QUERIES.items():
+            timings, answers = [], []
+            for sql in (expression_sql, column_sql):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    answer = conn.execute(sql).fetchall()
+                    best = min(best, time.perf_counter() - start)
+                timings.append(best)
+                answers.append(answer)
+            if answers[0] != answers[1]:
+                raise AssertionError(f"{label}: precomputed columns changed the answer")
+            results.append(f"{label}: {timings[0] * 1000:.1f} ms → {timings[1] * 1000:.1f} ms "
+                           f"({timings[0] / timings[1]:.1f}x)")
+        conn.close()
+
+    return {
+        "benchmark": "dates",
+        "source": source,
+        "index_build_seconds": index_seconds,
+        "queries": results,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """Pretty-print a benchmark report"""
+
+    print(f"\n📊 {report['benchmark']}")
+    print("=" * 50)
+    for key, value in report.items():
+        if key == "benchmark":
+            continue
+        if isinstance(value, list):
+            print(f"{key}:")
+            for item in value:
+                print(f"  - {item}")
+        elif isinstance(value, float):
+            print(f"{key}: {value:.3f}" if abs(value) < 10 else f"{key}: {value:.1f}")
+        else:
+            print(f"{key}: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQL AI Agent performance benchmarks")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("importtime", help="Cold import time via python -X importtime")
+    p_import.add_argument("--module", default="agents")
+    p_import.add_argument("--repeat", type=int, default=5)
+    p_import.add_argument("--max-ms", type=float, help="Fail if median import time exceeds this")
+
+    p_ttfa = sub.add_parser("ttfa", help="Time to first answer in a fresh process")
+    p_ttfa.add_argument("--db", default=str(DEFAULT_DB))
+    p_ttfa.add_argument("--model", default=os.getenv("AI_MODEL", "replay"))
+    p_ttfa.add_argument("--question", default="How many orders are in the database?")
+    p_ttfa.add_argument("--max-ms", type=float, help="Fail if time to first answer exceeds this")
+
+    p_spec = sub.add_parser("speculative", help="Sequential vs speculative SQL pipeline (replay backend)")
+    p_spec.add_argument("--db", default=str(DEFAULT_DB))
+    p_spec.add_argument("--latency-ms", type=float, default=300, help="Simulated LLM latency per call")
+    p_spec.add_argument("--rounds", type=int, default=5)
+
+    p_batch = sub.add_parser("batch", help="Batch vs sequential question throughput (replay backend)")
+    p_batch.add_argument("--db", default=str(DEFAULT_DB))
+    p_batch.add_argument("--latency-ms", type=float, default=300, help="Simulated LLM latency per call")
+    p_batch.add_argument("--copies", type=int, default=4, help="Duplicate questions appended to the workload")
+
+    p_load = sub.add_parser("load", help="Per-table bulk load throughput vs DataFrame.to_sql")
+    p_load.add_argument("--raw-dir", help="Directory with the Olist CSVs (default: synthetic data)")
+    p_load.add_argument("--orders", type=int, default=100_000, help="Synthetic dataset size")
+    p_load.add_argument("--repeat", type=int, default=3)
+
+    p_ingest = sub.add_parser("ingest", help="Parallel vs sequential Instacart ingestion by worker count")
+    p_ingest.add_argument("--zip", help="Kaggle instacart-market-basket-analysis.zip (default: synthetic data)")
+    p_ingest.add_argument("--orders", type=int, default=500_000, help="Synthetic dataset size")
+    p_ingest.add_argument("--workers", help="Comma-separated worker counts (default: 1,2,4,cores)")
+
+    p_schema = sub.add_parser("schema", help="Olist DB size and join latency: text ids vs typed, encoded schema")
+    p_schema.add_argument("--raw-dir", help="Directory with the Olist CSVs (default: synthetic data)")
+    p_schema.add_argument("--orders", type=int, default=100_000, help="Synthetic dataset size")
+    p_schema.add_argument("--repeat", type=int, default=5)
+
+    p_geo = sub.add_parser("geo", help="Zip-prefix joins: raw geolocation vs geolocation_prefix centroids")
+    p_geo.add_argument("--raw-dir", help="Directory with the Olist CSVs (default: synthetic data)")
+    p_geo.add_argument("--orders", type=int, default=100_000, help="Synthetic dataset size")
+    p_geo.add_argument("--repeat", type=int, default=5)
+
+    p_dates = sub.add_parser("dates", help="Time-series questions: strftime/JULIANDAY vs indexed date-part columns")
+    p_dates.add_argument("--raw-dir", help="Directory with the Olist CSVs (default: synthetic data)")
+    p_dates.add_argument("--orders", type=int, default=100_000, help="Synthetic dataset size")
+    p_dates.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    measured = None
+
+    if args.command == "importtime":
+        report = bench_importtime(args.module, args.repeat)
+        measured = report["import_ms_median"]
+    elif args.command == "ttfa":
+        report = bench_ttfa(args.db, args.model, args.question)
+        measured = report["ttfa_ms"]
+    elif args.command == "speculative":
+        report = bench_speculative(args.db, args.latency_ms, args.rounds)
+    elif args.command == "batch":
+        report = bench_batch(args.db, args.latency_ms, args.copies)
+    elif args.command == "load":
+        report = bench_load(args.raw_dir, args.orders, args.repeat)
+    elif args.command == "ingest":
+        workers = [int(w) for w in args.workers.split(",")] if args.workers else None
+        report = bench_ingest(args.zip, args.orders, workers)
+    elif args.command == "schema":
+        report = bench_schema(args.raw_dir, args.orders, args.repeat)
+    elif args.command == "geo":
+        report = bench_geo(args.raw_dir, args.orders, args.repeat)
+    elif args.command == "dates":
+        report = bench_dates(args.raw_dir, args.orders, args.repeat)
+
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to: {args.json}")
+
+    if getattr(args, "max_ms", None) is not None and measured is not None and measured > args.max_ms:
+        print(f"\n❌ Regression: {measured:.1f} ms > {args.max_ms:.1f} ms budget")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Bulk loading into SQLite
+Loads run with durability switched off (no journal, no fsync, a large page
+cache, exclusive lock), insert through one prepared executemany per batch
+inside large transactions, and build indexes only once the data is in.
+Safe settings are restored when the loader closes, so the finished file is
+an ordinary rollback-journal database (or stays in WAL for databases that
+are refreshed while serving queries).
+"""
+import time
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Applied for the duration of a load
+LOAD_PRAGMAS = [
+    ("journal_mode", "OFF"),
+    ("synchronous", "OFF"),
+    ("cache_size", -65536),         # 64 MB (negative = KiB)
+    ("locking_mode", "EXCLUSIVE"),
+]
+# temp_store=MEMORY and bigger caches made index builds slower in
+# benchmark.py load: the sorter spills less efficiently than the OS cache
+
+# For loads that commit progress as they go: a process crash (or Ctrl+C)
+# leaves every committed batch intact, which journal_mode=OFF can't promise
+RESUMABLE_PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "OFF"),
+    ("cache_size", -65536),
+]
+
+# SQLite defaults, restored before the database is handed to readers
+SAFE_PRAGMAS = [
+    ("locking_mode", "NORMAL"),
+    ("journal_mode", "DELETE"),
+    ("synchronous", "FULL"),
+    ("cache_size", -2000),
+]
+
+# For databases that are refreshed while being queried: WAL stays on, so
+# readers keep their snapshot while a writer loads and commits
+SERVING_PRAGMAS = [
+    ("locking_mode", "NORMAL"),
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -2000),
+]
+
+BATCH_ROWS = 50_000           # rows per executemany call
+TRANSACTION_ROWS = 500_000    # rows per commit
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def sqlite_type(dtype) -> str:
+    """Column affinity for a pandas dtype (same mapping as DataFrame.to_sql)"""
+
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+
+def frame_rows(df: pd.DataFrame) -> Iterable[Tuple]:
+    """Rows of plain Python values (None for missing) ready for sqlite3"""
+
+    columns = []
+    for _, series in df.items():
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            series = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+        if series.hasnans:
+            columns.append(series.astype(object).where(series.notna(), None).tolist())
+        else:
+            # tolist() already yields Python scalars
+            columns.append(series.tolist())
+    return zip(*columns)
+
+
+class BulkLoader:
+    """
+    Fast, non-durable loader for building a database from scratch
+
+    Use as a context manager; a crash mid-load leaves a file that should be
+    rebuilt rather than repaired.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_rows: int = BATCH_ROWS,
+        transaction_rows: int = TRANSACTION_ROWS,
+        pragmas: Optional[List[Tuple[str, Any]]] = None,
+        restore: Optional[List[Tuple[str, Any]]] = None
+    ):
+        self.db_path = str(db_path)
+        self.batch_rows = batch_rows
+        self.transaction_rows = transaction_rows
+        self.pragmas = pragmas or LOAD_PRAGMAS
+        self.restore = restore or SAFE_PRAGMAS
+
+        self.conn: Optional[sqlite3.Connection] = None
+        self.stats: List[Dict[str, Any]] = []
+        self._indexes: List[Tuple[str, str, Sequence[str]]] = []
+        self._pending = 0
+
+    def __enter__(self) -> "BulkLoader":
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: transactions are opened and committed explicitly
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None)
+        for name, value in self.pragmas:
+            self.conn.execute(f"PRAGMA {name} = {value}")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+                self.build_indexes()
+            elif self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+        finally:
+            for name, value in self.restore:
+                self.conn.execute(f"PRAGMA {name} = {value}")
+            # Touch the file so the exclusive lock is actually released
+            self.conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            self.conn.close()
+            self.conn = None
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN")
+
+    def commit(self):
+        if self.conn.in_transaction:
+            self.conn.execute("COMMIT")
+        self._pending = 0
+
+    def maybe_commit(self):
+        """Commit once the open transaction holds `transaction_rows` rows"""
+        if self._pending >= self.transaction_rows:
+            self.commit()
+
+    def create_table(
+        self,
+        table: str,
+        columns: Sequence[Tuple[str, str]],
+        replace: bool = True,
+        primary_key: Optional[Sequence[str]] = None,
+        without_rowid: bool = False
+    ):
+        """
+        Create `table` from (name, type) pairs
+
+        A single INTEGER primary key becomes the rowid itself; composite keys
+        with without_rowid=True cluster the table on the key, so key lookups
+        and joins need no separate index.
+        """
+
+        if replace:
+            self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+        definition = [f"{_quote(name)} {col_type}" for name, col_type in columns]
+        if primary_key:
+            definition.append(f"PRIMARY KEY ({', '.join(_quote(c) for c in primary_key)})")
+        suffix = " WITHOUT ROWID" if primary_key and without_rowid else ""
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {_quote(table)} ({', '.join(definition)}){suffix}")
+
+    def insert_rows(self, table: str, columns: Sequence[str], rows: Iterable[Tuple], commit: bool = True) -> int:
+        """
+        Insert rows in prepared batches; returns the number inserted. With
+        commit=False the caller decides when to commit (maybe_commit), e.g.
+        to record progress in the same transaction as the rows.
+        """
+
+        sql = (f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        inserted = 0
+        batch = []
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                inserted += self._insert_batch(sql, batch)
+                batch = []
+        if batch:
+            inserted += self._insert_batch(sql, batch)
+        if commit:
+            self.maybe_commit()
+        return inserted
+
+    def _insert_batch(self, sql: str, batch: List[Tuple]) -> int:
+        self._begin()
+        self.conn.executemany(sql, batch)
+        self._pending += len(batch)
+        return len(batch)
+
+    def load_frame(self, table: str, df: pd.DataFrame, replace: bool = True) -> Dict[str, Any]:
+        """Create `table` from a DataFrame's dtypes and insert all its rows"""
+
+        start = time.perf_counter()
+        self.create_table(table, [(str(name), sqlite_type(dtype)) for name, dtype in df.dtypes.items()], replace)
+        rows = self.insert_rows(table, [str(c) for c in df.columns], frame_rows(df))
+        self.commit()
+        return self.record(table, rows, time.perf_counter() - start)
+
+    def record(self, table: str, rows: int, seconds: float) -> Dict[str, Any]:
+        entry = {
+            "table": table,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds) if seconds > 0 else 0,
+        }
+        self.stats.append(entry)
+        return entry
+
+    def add_index(self, name: str, table: str, columns: Sequence[str]):
+        """Queue an index; all queued indexes are built after the data is loaded"""
+        self._indexes.append((name, table, columns))
+
+    def build_indexes(self) -> float:
+        """Build queued indexes in one transaction; returns seconds taken"""
+
+        if not self._indexes:
+            return 0.0
+
+        start = time.perf_counter()
+        self._begin()
+        for name, table, columns in self._indexes:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} "
+                f"({', '.join(_quote(c) for c in columns)})"
+            )
+        self.commit()
+        self._indexes = []
+
+        seconds = time.perf_counter() - start
+        self.stats.append({"table": "(indexes)", "rows": 0, "seconds": round(seconds, 3), "rows_per_sec": 0})
+        return seconds
+
+
+if __name__ == "__main__":
+    import tempfile
+    import numpy as np
+
+    n = 500_000
+    df = pd.DataFrame({
+        "order_id": np.arange(n),
+        "price": np.random.default_rng(0).random(n) * 100,
+        "status": np.where(np.arange(n) % 7 == 0, "canceled", "delivered"),
+    })
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with BulkLoader(Path(workdir) / "bulk.db") as loader:
+            loader.load_frame("orders", df)
+            loader.add_index("idx_orders_status", "orders", ["status"])
+
+        print("🚚 Bulk load")
+        for entry in loader.stats:
+            print(f"  {entry['table']:12} {entry['rows']:>9,} rows  {entry['seconds']:.2f}s  "
+                  f"{entry['rows_per_sec']:,} rows/s")
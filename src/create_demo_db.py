@@ -3,121 +3,71 @@ Script to generate a small 'Demo' version of Instacart DB for GitHub Deployment
 (Full dataset is too large for GitHub free tier)
 """
 import sqlite3
-import pandas as pd
-import zipfile
 import os
 from pathlib import Path
 
-def create_demo_database():
+from datasets import (INSTACART_TABLES, INSTACART_DTYPES, INSTACART_SCHEMA, INSTACART_INDEXES, INSTACART_SAMPLING,
+                      INSTACART_QUERIES)
+from optimize import optimize_database, print_optimize_report
+from refresh import load_manifest, publish_database, record_manifest
+from sampling import SAMPLE_SEED, build_sample
+from sources import find_sources
+
+# Rows kept across orders and order items (about the size of the old
+# 15,000-order cut, which is well under GitHub's 100MB limit)
+DEMO_ROWS = 150_000
+
+def create_demo_database(zip_path=None, db_path=None, rows=DEMO_ROWS, size_mb=None, seed=SAMPLE_SEED,
+                         optimize=True, page_size=None):
     print("Creating Demo Database (Small version for Deployment)...")
     
     # Paths
     base_dir = Path(__file__).parent.parent
-    zip_path = base_dir / "instacart-market-basket-analysis.zip"
-    db_path = base_dir / "data" / "instacart.db"
+    zip_path = Path(zip_path or base_dir / "instacart-market-basket-analysis.zip")
+    db_path = Path(db_path or base_dir / "data" / "instacart.db")
     
     # Create data dir if not exists
     db_path.parent.mkdir(exist_ok=True)
-    
-    # Remove existing db to be safe
-    if db_path.exists():
-        os.remove(db_path)
-        
-    conn = sqlite3.connect(str(db_path))
-    
-    # Limit rows for demo (keep it under 50MB)
-    DEMO_LIMIT = 15000 
+
+    # CSV members are read straight from the zip (subdirectories and
+    # __MACOSX entries handled), nothing is extracted
+    sources = find_sources(zip_path, INSTACART_TABLES)
+    print(f"   Found files: {[source.name for source in sources.values()]}")
+
+    # Nothing to do if the demo was already built from these exact members
+    # with the same sample settings (fingerprints come from the zip
+    # directory, nothing is decompressed)
+    settings = f"sample:{size_mb}MB" if size_mb is not None else f"sample:{rows}rows"
+    fingerprints = {table: f"{source.fingerprint()[0]}|{settings}|seed:{seed}" for table, source in sources.items()}
+    manifest = load_manifest(db_path)
+    if manifest and {table: entry["content_hash"] for table, entry in manifest.items()} == fingerprints:
+        print(f"Demo DB is up to date with {zip_path.name}, nothing to rebuild.")
+        return
+
+    # Build next to the old file and publish it at the end, so the app keeps
+    # serving the previous demo until the new one is complete
+    build_path = db_path.with_name(db_path.name + ".building")
+    if build_path.exists():
+        os.remove(build_path)
     
     try:
-        with zipfile.ZipFile(zip_path, 'r') as z:
-            # Helper to load and save
-            def load_and_save(filename, table_name, limit=None):
-                print(f"   Processing {table_name}...")
-                # Extract to memory
-                with z.open(filename) as f:
-                    if filename.endswith('.zip'):
-                        # Nested zip support if needed, but likely flat in this specific file structure 
-                        # usually kaggle zips are flat or contain folder
-                        pass
-                
-                # Direct read from zip
-                # Note: The structure inside the zip might vary. Let's try reading directly.
-                # If specific files are inside a folder, we might need to adjust.
-                
-                # Check file list first
-                pass
+        # Whole users are sampled and their orders and order items follow,
+        # so every kept order has all of its items and no row is orphaned
+        target = f"{size_mb} MB" if size_mb is not None else f"{rows:,} rows"
+        print(f"Sampling users (target {target})...")
+        result = build_sample(build_path, sources, INSTACART_DTYPES, INSTACART_SAMPLING, INSTACART_INDEXES,
+                              rows=None if size_mb is not None else rows, size_mb=size_mb, seed=seed,
+                              schema=INSTACART_SCHEMA)
+        print(f"Sampled {result['fraction']:.2%} of users in {result['passes']} pass(es)")
 
-            # List files
-            files = z.namelist()
-            print(f"   Found files: {files}")
-            
-            # Map known files
-            file_map = {
-                'aisles.csv': 'aisles',
-                'departments.csv': 'departments',
-                'products.csv': 'products',
-                'orders.csv': 'orders',
-                'order_products__train.csv': 'order_products__train',
-                'order_products__prior.csv': 'order_products__prior'
-            }
-            
-            # Handle potential subdirectories in zip
-            actual_files = {}
-            for f in files:
-                for k in file_map.keys():
-                    if f.endswith(k) and '__MACOSX' not in f:
-                        actual_files[file_map[k]] = f
-                        
-            # Load tables
-            # 1. Dimensions (Small, load all)
-            for table in ['aisles', 'departments', 'products']:
-                if table in actual_files:
-                    print(f"Loading {table} (full)...")
-                    df = pd.read_csv(z.open(actual_files[table]))
-                    df.to_sql(table, conn, if_exists='replace', index=False)
-            
-            # 2. Orders (Limit)
-            if 'orders' in actual_files:
-                print(f"Loading orders (limit {DEMO_LIMIT})...")
-                df_orders = pd.read_csv(z.open(actual_files['orders']), nrows=DEMO_LIMIT)
-                df_orders.to_sql('orders', conn, if_exists='replace', index=False)
-                
-                # Get list of valid order_ids to filter items
-                valid_order_ids = set(df_orders['order_id'].unique())
-                valid_product_ids = set(pd.read_sql("SELECT product_id FROM products", conn)['product_id'].unique())
-             
-            # 3. Order Items (Filter by valid orders)
-            for table in ['order_products__train', 'order_products__prior']:
-                if table in actual_files:
-                    print(f"Loading {table} (filtered)...")
-                    # Read in chunks to find matching orders
-                    chunk_size = 50000
-                    chunks = []
-                    row_count = 0
-                    
-                    for chunk in pd.read_csv(z.open(actual_files[table]), chunksize=chunk_size):
-                        # Filter for orders we actually have
-                        filtered = chunk[chunk['order_id'].isin(valid_order_ids)]
-                        
-                        # Also filter for products we have (just in case)
-                        filtered = filtered[filtered['product_id'].isin(valid_product_ids)]
-                        
-                        chunks.append(filtered)
-                        row_count += len(filtered)
-                        if row_count >= DEMO_LIMIT * 5: # Avg 5 items per order
-                            break
-                    
-                    if chunks:
-                        df_items = pd.concat(chunks)
-                        df_items.to_sql(table, conn, if_exists='replace', index=False)
+        conn = sqlite3.connect(str(build_path))
+        with conn:
+            for table, count in result["rows"].items():
+                source = sources[table]
+                record_manifest(conn, table, source.name, fingerprints[table], source.size, count)
+        conn.close()
 
-        # Create Indexes
-        print("Creating indexes...")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_aisle ON products(aisle_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_products_dept ON products(department_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_ops_prior_order ON order_products__prior(order_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_ops_prior_prod ON order_products__prior(product_id)")
+        conn = sqlite3.connect(str(build_path))
         
         # Create Chat History
         print("Creating chat_history...")
@@ -132,11 +82,37 @@ def create_demo_database():
         """)
         
         conn.close()
-        
-        # Check size
-        size_mb = db_path.stat().st_size / (1024 * 1024)
+
+        if db_path.exists():
+            # Published into the live file in one transaction: a running app's
+            # connections stay valid and see the new demo after the commit
+            # (replacing the file would leave them on the old file and its WAL).
+            # Chat history is kept.
+            sample_bytes = build_path.stat().st_size
+            seconds = publish_database(build_path, db_path)
+            os.remove(build_path)
+            print(f"Published the new demo into {db_path.name} in {seconds:.2f}s")
+            if page_size:
+                print(f"   --page-size only applies to a new file; with the app stopped, run "
+                      f"python src/optimize.py {db_path} --page-size {page_size}")
+            if optimize:
+                print_optimize_report(optimize_database(db_path, INSTACART_QUERIES))
+        else:
+            # Nothing has the new file open yet, so it can also be rebuilt with another page size
+            if optimize:
+                print_optimize_report(optimize_database(build_path, INSTACART_QUERIES, page_size=page_size))
+            os.replace(build_path, db_path)
+            sample_bytes = db_path.stat().st_size
+
+        # Check size of the sample itself: a published demo leaves the old
+        # demo's pages free in the live file, which only a rebuild returns
+        size_mb = sample_bytes / (1024 * 1024)
         print(f"\nSUCCESS! Instacart Demo DB created.")
         print(f"Size: {size_mb:.2f} MB")
+        live_mb = db_path.stat().st_size / (1024 * 1024)
+        if live_mb > size_mb * 1.05:
+            print(f"   The live file is {live_mb:.2f} MB (free pages from the previous demo); with the app "
+                  f"stopped, compact it with: python src/optimize.py {db_path} --vacuum")
         
         if size_mb > 95:
             print("WARNING: DB is close to GitHub 100MB limit.")
@@ -149,4 +125,15 @@ def create_demo_database():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    create_demo_database()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the sampled Instacart demo database")
+    parser.add_argument("zip_path", nargs="?", help="Instacart zip (default: repo root)")
+    parser.add_argument("db_path", nargs="?", help="Output database (default: data/instacart.db)")
+    parser.add_argument("--rows", type=int, default=DEMO_ROWS, help="Rows to keep across orders and order items")
+    parser.add_argument("--size-mb", type=float, help="Target file size instead of a row budget")
+    parser.add_argument("--seed", type=int, default=SAMPLE_SEED, help="Sample seed (same seed, same users)")
+    parser.add_argument("--page-size", type=int, help="Rebuild the demo with this page size (VACUUM INTO)")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip ANALYZE, integrity check and query timings")
+    args = parser.parse_args()
+    create_demo_database(args.zip_path, args.db_path, args.rows, args.size_mb, args.seed,
+                         optimize=not args.no_optimize, page_size=args.page_size)
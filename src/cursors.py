@@ -0,0 +1,260 @@
+"""
+Server-side result cursors
+A cursor is a result id plus the SQL that produced it. Pages are cut with
+sort and filter applied either to the cached DataFrame (ResultStore, in
+memory or spilled) or, when the result isn't cached, pushed down into SQL as
+ORDER BY ... LIMIT/OFFSET over the original query. Clients only ever receive
+one page, so transfer size stays flat however many rows the query returned.
+"""
+import math
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from result_store import ResultStore
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Results above this many rows are served from SQL instead of being cached
+MAX_CACHED_ROWS = 200_000
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _escape_like(text: str) -> str:
+    """Escape LIKE wildcards (and the escape character) for ESCAPE '\\'"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class CursorManager:
+    """Opens cursors over query results and serves sorted/filtered pages"""
+
+    def __init__(
+        self,
+        db_manager,
+        store: Optional[ResultStore] = None,
+        max_cursors: int = 1000,
+        max_cached_rows: int = MAX_CACHED_ROWS
+    ):
+        self.db_manager = db_manager
+        self.store = store or ResultStore()
+        self.max_cursors = max_cursors
+        self.max_cached_rows = max_cached_rows
+
+        self._cursors: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Sorted/filtered row order per view, so paging a view doesn't re-sort
+        self._views: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._counts: "OrderedDict[Tuple, int]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def open(self, sql: str, data: Optional[pd.DataFrame] = None, result_id: Optional[str] = None) -> str:
+        """
+        Register a result and return its cursor id. `data` is cached when
+        given and small enough; otherwise pages are read with SQL.
+        """
+
+        sql = sql.strip().rstrip(";").strip()
+        cached = data is not None and len(data) <= self.max_cached_rows
+
+        if cached:
+            result_id = self.store.put(data, result_id)
+        elif result_id is None:
+            result_id = uuid.uuid4().hex
+
+        with self._lock:
+            self._cursors[result_id] = {
+                "sql": sql,
+                "columns": [str(c) for c in data.columns] if data is not None else None,
+                "total_rows": len(data) if data is not None else None,
+                "cached": cached,
+            }
+            self._cursors.move_to_end(result_id)
+
+            while len(self._cursors) > self.max_cursors:
+                old_id, old = self._cursors.popitem(last=False)
+                if old["cached"]:
+                    self.store.discard(old_id)
+                self._drop_views(old_id)
+
+        return result_id
+
+    def _drop_views(self, cursor_id: str):
+        for cache in (self._views, self._counts):
+            for key in [k for k in cache if k[0] == cursor_id]:
+                del cache[key]
+
+    def close(self, cursor_id: str):
+        with self._lock:
+            cursor = self._cursors.pop(cursor_id, None)
+            if cursor and cursor["cached"]:
+                self.store.discard(cursor_id)
+            self._drop_views(cursor_id)
+
+    def clear(self):
+        with self._lock:
+            for cursor_id in list(self._cursors):
+                self.close(cursor_id)
+
+    def __contains__(self, cursor_id: str) -> bool:
+        return cursor_id in self._cursors
+
+    def info(self, cursor_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            return dict(cursor, id=cursor_id) if cursor else None
+
+    def page(
+        self,
+        cursor_id: str,
+        page: int = 0,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        sort: Optional[str] = None,
+        descending: bool = False,
+        filters: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        One page of a result
+
+        Args:
+            page: Zero-based page number
+            sort: Column to sort by
+            filters: {column: text} — rows whose value contains the text (case-insensitive)
+
+        Returns:
+            {"data": DataFrame, "page", "page_size", "total_rows", "pages", "source"}
+        """
+
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None:
+                raise KeyError(f"Unknown cursor: {cursor_id}")
+            self._cursors.move_to_end(cursor_id)
+
+        page = max(0, int(page))
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+        filters = {k: str(v) for k, v in (filters or {}).items() if str(v) != ""}
+
+        data = self.store.get(cursor_id) if cursor["cached"] else None
+        if data is not None:
+            rows, total = self._page_from_frame(cursor_id, data, page, page_size, sort, descending, filters)
+            source = "cache"
+        else:
+            rows, total = self._page_from_sql(cursor_id, cursor, page, page_size, sort, descending, filters)
+            source = "sql"
+
+        return {
+            "data": rows,
+            "page": page,
+            "page_size": page_size,
+            "total_rows": total,
+            "pages": max(1, math.ceil(total / page_size)),
+            "sort": sort,
+            "descending": descending,
+            "filters": filters,
+            "source": source,
+        }
+
+    def _check_columns(self, columns: List[str], sort: Optional[str], filters: Dict[str, str]):
+        for column in ([sort] if sort else []) + list(filters):
+            if column not in columns:
+                raise ValueError(f"Unknown column: {column}")
+
+    def _page_from_frame(self, cursor_id, data, page, page_size, sort, descending, filters) -> Tuple[pd.DataFrame, int]:
+        self._check_columns([str(c) for c in data.columns], sort, filters)
+        columns = {str(c): c for c in data.columns}
+
+        if not sort and not filters:
+            start = page * page_size
+            return data.iloc[start:start + page_size], len(data)
+
+        key = (cursor_id, sort, descending, tuple(sorted(filters.items())))
+        with self._lock:
+            order = self._views.get(key)
+            if order is not None:
+                self._views.move_to_end(key)
+
+        if order is None:
+            mask = np.ones(len(data), dtype=bool)
+            for column, text in filters.items():
+                values = data[columns[column]].astype(str)
+                mask &= values.str.contains(text, case=False, regex=False, na=False).to_numpy()
+
+            order = np.flatnonzero(mask)
+            if sort:
+                subset = data[columns[sort]].iloc[order]
+                order = order[np.argsort(
+                    subset.rank(method="first", ascending=not descending, na_option="bottom").to_numpy(),
+                    kind="stable"
+                )]
+
+            with self._lock:
+                self._views[key] = order
+                while len(self._views) > 32:
+                    self._views.popitem(last=False)
+
+        start = page * page_size
+        return data.iloc[order[start:start + page_size]], len(order)
+
+    def _page_from_sql(self, cursor_id, cursor, page, page_size, sort, descending, filters) -> Tuple[pd.DataFrame, int]:
+        if cursor["columns"] is None:
+            with self.db_manager.read_only_pool.connection() as conn:
+                described = conn.execute(f"SELECT * FROM ({cursor['sql']}) LIMIT 0")
+                cursor["columns"] = [d[0] for d in described.description]
+        self._check_columns(cursor["columns"], sort, filters)
+
+        where, params = "", []
+        if filters:
+            # A literal "contains", like the cached-frame path: % and _ in the text aren't wildcards
+            where = " WHERE " + " AND ".join(f"CAST({_quote(c)} AS TEXT) LIKE ? ESCAPE '\\'" for c in filters)
+            params = [f"%{_escape_like(text)}%" for text in filters.values()]
+
+        order = ""
+        if sort:
+            order = f" ORDER BY {_quote(sort)} IS NULL, {_quote(sort)} {'DESC' if descending else 'ASC'}"
+
+        base = f"SELECT * FROM ({cursor['sql']}) AS _result{where}"
+        key = (cursor_id, None, None, tuple(sorted(filters.items())))
+
+        with self.db_manager.read_only_pool.connection() as conn:
+            rows = pd.read_sql_query(f"{base}{order} LIMIT ? OFFSET ?", conn, params=params + [page_size, page * page_size])
+
+            with self._lock:
+                total = self._counts.get(key)
+            if total is None:
+                total = conn.execute(f"SELECT COUNT(*) FROM ({base})", params).fetchone()[0]
+                with self._lock:
+                    self._counts[key] = total
+                    while len(self._counts) > 256:
+                        self._counts.popitem(last=False)
+
+        if not filters:
+            cursor["total_rows"] = total
+        return rows, total
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from database import DatabaseManager
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "data/ecommerce.db"
+    manager = CursorManager(DatabaseManager(db_path))
+    sql = "SELECT order_id, customer_id, order_status, order_purchase_timestamp FROM orders"
+
+    print("📑 Testing result cursors\n")
+    success, data, _ = manager.db_manager.execute_query(sql)
+    cached = manager.open(sql, data)
+    uncached = manager.open(sql)
+
+    for cursor_id in (cached, uncached):
+        for kwargs in ({}, {"sort": "order_purchase_timestamp", "descending": True}, {"filters": {"order_status": "cancel"}}):
+            start = time.perf_counter()
+            result = manager.page(cursor_id, page=1, page_size=50, **kwargs)
+            print(f"{result['source']:5} {str(kwargs):65} → {len(result['data'])} of {result['total_rows']:,} rows "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
@@ -1,44 +1,187 @@
 """
 Database operations and query execution
 """
+import os
+import queue
 import sqlite3
+import threading
 import pandas as pd
 from pathlib import Path
-from typing import Tuple, List, Dict, Any, Optional
+from contextlib import contextmanager
+from typing import Tuple, List, Dict, Any, Optional, Callable
 from validator import SQLValidator
 
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of SQLite connections
+
+    Connections are opened lazily up to `size` and shared across threads
+    (one thread at a time per connection), so concurrent sessions reuse
+    connections instead of opening one per query. When the database file is
+    replaced (a rebuilt demo or a VACUUM INTO swap), connections to the old
+    file are closed and new ones open the new file.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 30.0, read_only: bool = False):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._identity = self._file_identity()
+        self._opened_on = {}    # connection -> file identity it was opened on
+
+    def _file_identity(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _retire(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._opened_on.pop(conn, None)
+            self._created -= 1
+        conn.close()
+
+    def _check_file(self):
+        """Drop idle connections to a database file that has been replaced"""
+
+        identity = self._file_identity()
+        if identity == self._identity or identity is None:
+            return
+        with self._lock:
+            if identity == self._identity:
+                return
+            self._identity = identity
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.read_only:
+            uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+            return sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        return sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+
+    def acquire(self) -> sqlite3.Connection:
+        self._check_file()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                conn = self._connect()
+                if self._identity is None:
+                    # Connecting created the file
+                    self._identity = self._file_identity()
+                self._opened_on[conn] = self._identity
+                return conn
+
+        return self._idle.get(timeout=self.timeout)
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._opened_on.get(conn) != self._identity:
+            # Checked out while the file was replaced: hand waiters a
+            # connection to the new file instead
+            self._opened_on.pop(conn, None)
+            conn.close()
+            conn = self._connect()
+            self._opened_on[conn] = self._identity
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._retire(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+
 class DatabaseManager:
-    """Manages database connections and query execution"""
+    """Manages database connections and query execution (safe to share across threads)"""
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, pool_size: int = 4):
         self.db_path = db_path
         self.validator = SQLValidator()
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        # Read-only connections for speculative / untrusted execution
+        self.read_only_pool = ConnectionPool(db_path, size=pool_size, read_only=True)
         self.query_log = []
+        self._log_lock = threading.Lock()
         self._init_db()
 
+    def _log_query(self, entry: Dict[str, Any]):
+        with self._log_lock:
+            self.query_log.append(entry)
+
+    def log_execution(self, metadata: Dict):
+        """Log an execution that ran with log=False (e.g. a committed speculative query)"""
+
+        execution = metadata.get("execution", {})
+        if execution.get("success"):
+            self._log_query({"query": metadata["cleaned_query"], "rows": execution["rows_returned"], "success": True})
+        else:
+            self._log_query({"query": metadata["cleaned_query"], "error": execution.get("error"), "success": False})
+
     def _init_db(self):
         """Initialize database tables if they don't exist"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_history(session_id)")
-            conn.commit()
-            conn.close()
+            with self.pool.connection() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chat_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        session_id TEXT NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_history(session_id)")
+                conn.commit()
         except Exception as e:
             print(f"Error initializing database: {e}")
 
-    def execute_query(self, sql_query: str) -> Tuple[bool, Any, Dict]:
+    def execute_query(
+        self,
+        sql_query: str,
+        read_only: bool = False,
+        log: bool = True,
+        on_page: Optional[Callable[[pd.DataFrame], None]] = None,
+        page_size: int = 500,
+        progress_handler: Optional[Callable[[], int]] = None,
+        progress_interval: int = 10000
+    ) -> Tuple[bool, Any, Dict]:
         """
         Execute SQL query with validation
 
+        Args:
+            sql_query: Query to validate and run
+            read_only: Run on a read-only connection
+            log: Record the execution in the query log
+            on_page: Called with each page of `page_size` rows as it is fetched
+            progress_handler: SQLite progress handler, called every `progress_interval`
+                VM instructions; returning non-zero interrupts the query
+
         Returns:
             Tuple of (success, result, metadata)
         """
@@ -60,21 +203,35 @@ class DatabaseManager:
             return False, None, metadata
 
         # Execute query
+        pool = self.read_only_pool if read_only else self.pool
         try:
-            conn = sqlite3.connect(self.db_path)
-            df = pd.read_sql_query(cleaned_query, conn)
-            conn.close()
+            with pool.connection() as conn:
+                if progress_handler is not None:
+                    conn.set_progress_handler(progress_handler, progress_interval)
+                try:
+                    if on_page is None:
+                        df = pd.read_sql_query(cleaned_query, conn)
+                    else:
+                        pages = []
+                        for page in pd.read_sql_query(cleaned_query, conn, chunksize=page_size):
+                            on_page(page)
+                            pages.append(page)
+                        if len(pages) == 1:
+                            df = pages[0]
+                        else:
+                            df = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
+                finally:
+                    if progress_handler is not None:
+                        # Pooled connections are reused: never leave a handler behind
+                        conn.set_progress_handler(None, 0)
 
             metadata["execution"]["success"] = True
             metadata["execution"]["rows_returned"] = len(df)
             metadata["execution"]["columns"] = list(df.columns)
 
             # Log successful query
-            self.query_log.append({
-                "query": cleaned_query,
-                "rows": len(df),
-                "success": True
-            })
+            if log:
+                self.log_execution(metadata)
 
             return True, df, metadata
 
@@ -83,27 +240,23 @@ class DatabaseManager:
             metadata["execution"]["error"] = str(e)
 
             # Log failed query
-            self.query_log.append({
-                "query": cleaned_query,
-                "error": str(e),
-                "success": False
-            })
+            if log:
+                self.log_execution(metadata)
 
             return False, None, metadata
 
     def get_chat_history(self, session_id: str, limit: int = 10) -> List[Dict[str, str]]:
         """Retrieve chat history for a session"""
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.execute("""
-            SELECT role, content FROM chat_history
-            WHERE session_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (session_id, limit))
+        with self.pool.connection() as conn:
+            cursor = conn.execute("""
+                SELECT role, content FROM chat_history
+                WHERE session_id = ? AND role != 'summary'
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (session_id, limit))
 
-        history = [{"role": row[0], "content": row[1]} for row in cursor.fetchall()]
-        conn.close()
+            history = [{"role": row[0], "content": row[1]} for row in cursor.fetchall()]
 
         # Reverse to get chronological order
         return list(reversed(history))
@@ -111,46 +264,73 @@ class DatabaseManager:
     def save_chat_message(self, session_id: str, role: str, content: str):
         """Save a chat message to history"""
 
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("""
-            INSERT INTO chat_history (session_id, role, content)
-            VALUES (?, ?, ?)
-        """, (session_id, role, content))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute("""
+                INSERT INTO chat_history (session_id, role, content)
+                VALUES (?, ?, ?)
+            """, (session_id, role, content))
+            conn.commit()
+
+    def get_history_summary(self, session_id: str) -> Optional[str]:
+        """Get the rolling conversation summary for a session (if any)"""
+
+        with self.pool.connection() as conn:
+            row = conn.execute("""
+                SELECT content FROM chat_history
+                WHERE session_id = ? AND role = 'summary'
+                ORDER BY id DESC
+                LIMIT 1
+            """, (session_id,)).fetchone()
+
+        return row[0] if row else None
+
+    def save_history_summary(self, session_id: str, content: str):
+        """Replace the rolling conversation summary for a session"""
+
+        with self.pool.connection() as conn:
+            conn.execute(
+                "DELETE FROM chat_history WHERE session_id = ? AND role = 'summary'",
+                (session_id,)
+            )
+            conn.execute("""
+                INSERT INTO chat_history (session_id, role, content)
+                VALUES (?, 'summary', ?)
+            """, (session_id, content))
+            conn.commit()
 
     def clear_chat_history(self, session_id: str):
         """Clear chat history for a session"""
 
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM chat_history WHERE session_id = ?", (session_id,))
+            conn.commit()
 
     def get_all_sessions(self) -> List[str]:
         """Get all unique session IDs"""
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.execute("""
-            SELECT session_id
-            FROM chat_history
-            GROUP BY session_id
-            ORDER BY MAX(timestamp) DESC
-        """)
+        with self.pool.connection() as conn:
+            cursor = conn.execute("""
+                SELECT session_id
+                FROM chat_history
+                GROUP BY session_id
+                ORDER BY MAX(timestamp) DESC
+            """)
 
-        sessions = [row[0] for row in cursor.fetchall()]
-        conn.close()
+            sessions = [row[0] for row in cursor.fetchall()]
 
         return sessions
 
     def get_query_stats(self) -> Dict:
         """Get statistics about executed queries"""
 
-        if not self.query_log:
+        with self._log_lock:
+            log = list(self.query_log)
+
+        if not log:
             return {"total": 0, "successful": 0, "failed": 0}
 
-        total = len(self.query_log)
-        successful = sum(1 for q in self.query_log if q["success"])
+        total = len(log)
+        successful = sum(1 for q in log if q["success"])
 
         return {
             "total": total,
@@ -163,10 +343,9 @@ class DatabaseManager:
         """Test database connection"""
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
-            count = cursor.fetchone()[0]
-            conn.close()
+            with self.pool.connection() as conn:
+                cursor = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
+                count = cursor.fetchone()[0]
             return count > 0
         except:
             return False
@@ -0,0 +1,379 @@
+"""
+Dataset definitions shared by the loaders
+For each Kaggle dataset: which CSV feeds which table, the dtypes every
+column is parsed with (fixed up front so chunked reads agree with each other
+and never fall back to object columns), the physical schema each table is
+created with, the secondary indexes and derived tables built after
+loading, how a demo sample follows the table relationships, and the
+standard queries timed when a database is optimized.
+"""
+
+# Table mapping: CSV filename -> table name
+OLIST_TABLES = {
+    'olist_customers_dataset.csv': 'customers',
+    'olist_geolocation_dataset.csv': 'geolocation',
+    'olist_order_items_dataset.csv': 'order_items',
+    'olist_order_payments_dataset.csv': 'order_payments',
+    'olist_order_reviews_dataset.csv': 'order_reviews',
+    'olist_orders_dataset.csv': 'orders',
+    'olist_products_dataset.csv': 'products',
+    'olist_sellers_dataset.csv': 'sellers',
+    'product_category_name_translation.csv': 'product_category_translation'
+}
+
+OLIST_DTYPES = {
+    "customers": {
+        "customer_id": "str", "customer_unique_id": "str", "customer_zip_code_prefix": "int32",
+        "customer_city": "str", "customer_state": "str",
+    },
+    "geolocation": {
+        "geolocation_zip_code_prefix": "int32", "geolocation_lat": "float64", "geolocation_lng": "float64",
+        "geolocation_city": "str", "geolocation_state": "str",
+    },
+    "order_items": {
+        "order_id": "str", "order_item_id": "int16", "product_id": "str", "seller_id": "str",
+        "shipping_limit_date": "str", "price": "float64", "freight_value": "float64",
+    },
+    "order_payments": {
+        "order_id": "str", "payment_sequential": "int16", "payment_type": "str",
+        "payment_installments": "int16", "payment_value": "float64",
+    },
+    "order_reviews": {
+        "review_id": "str", "order_id": "str", "review_score": "int8", "review_comment_title": "str",
+        "review_comment_message": "str", "review_creation_date": "str", "review_answer_timestamp": "str",
+    },
+    "orders": {
+        "order_id": "str", "customer_id": "str", "order_status": "str", "order_purchase_timestamp": "str",
+        "order_approved_at": "str", "order_delivered_carrier_date": "str",
+        "order_delivered_customer_date": "str", "order_estimated_delivery_date": "str",
+    },
+    "products": {
+        "product_id": "str", "product_category_name": "str", "product_name_lenght": "float64",
+        "product_description_lenght": "float64", "product_photos_qty": "float64", "product_weight_g": "float64",
+        "product_length_cm": "float64", "product_height_cm": "float64", "product_width_cm": "float64",
+    },
+    "sellers": {
+        "seller_id": "str", "seller_zip_code_prefix": "int32", "seller_city": "str", "seller_state": "str",
+    },
+    "product_category_translation": {
+        "product_category_name": "str", "product_category_name_english": "str",
+    },
+}
+
+# 32-character hash id columns stored as dense integers (column -> entity);
+# the original hashes are kept once each in id_dictionary
+OLIST_ENCODED_IDS = {
+    "customer_id": "customer",
+    "customer_unique_id": "customer_unique",
+    "order_id": "order",
+    "product_id": "product",
+    "seller_id": "seller",
+    "review_id": "review",
+}
+
+
+def _columns(dtypes, **types):
+    """Declared SQLite types in CSV column order: encoded ids INTEGER, others as given or TEXT"""
+    return {
+        name: types.get(name) or ("INTEGER" if name in OLIST_ENCODED_IDS else "TEXT")
+        for name in dtypes
+    }
+
+
+# Physical schema: declared types, primary key and whether the table is
+# clustered on that key (WITHOUT ROWID). Single INTEGER keys are the rowid.
+# "generated" columns are VIRTUAL (computed on read, stored only in their
+# indexes), so they can also be added to tables loaded before they existed.
+OLIST_SCHEMA = {
+    "customers": {
+        "columns": _columns(OLIST_DTYPES["customers"], customer_zip_code_prefix="INTEGER"),
+        "primary_key": ["customer_id"],
+    },
+    # Several rows per zip prefix and no natural key
+    "geolocation": {
+        "columns": _columns(OLIST_DTYPES["geolocation"], geolocation_zip_code_prefix="INTEGER",
+                            geolocation_lat="REAL", geolocation_lng="REAL"),
+    },
+    "order_items": {
+        "columns": _columns(OLIST_DTYPES["order_items"], order_item_id="INTEGER", shipping_limit_date="TIMESTAMP",
+                            price="REAL", freight_value="REAL"),
+        "primary_key": ["order_id", "order_item_id"],
+        "without_rowid": True,
+    },
+    "order_payments": {
+        "columns": _columns(OLIST_DTYPES["order_payments"], payment_sequential="INTEGER",
+                            payment_installments="INTEGER", payment_value="REAL"),
+        "primary_key": ["order_id", "payment_sequential"],
+        "without_rowid": True,
+    },
+    # review_id alone repeats across orders in the Kaggle export
+    "order_reviews": {
+        "columns": _columns(OLIST_DTYPES["order_reviews"], review_score="INTEGER",
+                            review_creation_date="TIMESTAMP", review_answer_timestamp="TIMESTAMP"),
+        "primary_key": ["order_id", "review_id"],
+        "without_rowid": True,
+    },
+    "orders": {
+        "columns": _columns(OLIST_DTYPES["orders"], order_purchase_timestamp="TIMESTAMP",
+                            order_approved_at="TIMESTAMP", order_delivered_carrier_date="TIMESTAMP",
+                            order_delivered_customer_date="TIMESTAMP", order_estimated_delivery_date="TIMESTAMP"),
+        "primary_key": ["order_id"],
+        # Date parts the agent filters and groups by; strftime()/JULIANDAY()
+        # over the raw timestamps can't use an index
+        "generated": {
+            "purchase_year": ("INTEGER", "CAST(strftime('%Y', order_purchase_timestamp) AS INTEGER)"),
+            "purchase_month": ("TEXT", "strftime('%Y-%m', order_purchase_timestamp)"),
+            "delivery_days": ("REAL", "julianday(order_delivered_customer_date) - julianday(order_purchase_timestamp)"),
+        },
+    },
+    "products": {
+        "columns": _columns(OLIST_DTYPES["products"], **{
+            name: "REAL" for name, dtype in OLIST_DTYPES["products"].items() if dtype == "float64"
+        }),
+        "primary_key": ["product_id"],
+    },
+    "sellers": {
+        "columns": _columns(OLIST_DTYPES["sellers"], seller_zip_code_prefix="INTEGER"),
+        "primary_key": ["seller_id"],
+    },
+    "product_category_translation": {
+        "columns": _columns(OLIST_DTYPES["product_category_translation"]),
+        "primary_key": ["product_category_name"],
+        "without_rowid": True,
+    },
+}
+
+# (index name, table, columns) — built once all tables are loaded. Lookups
+# by order_id are served by the primary keys above.
+OLIST_INDEXES = [
+    ("idx_orders_customer", "orders", ["customer_id"]),
+    ("idx_orders_purchase_month", "orders", ["purchase_year", "purchase_month"]),
+    ("idx_orders_delivery_days", "orders", ["delivery_days"]),
+    ("idx_order_items_product", "order_items", ["product_id"]),
+    ("idx_order_items_seller", "order_items", ["seller_id"]),
+    ("idx_customers_state", "customers", ["customer_state"]),
+    ("idx_sellers_state", "sellers", ["seller_state"]),
+]
+
+# Derived tables, rebuilt with INSERT ... SELECT whenever their source table
+# changes. geolocation has ~1M rows with many per zip prefix, so joining
+# customers or sellers to it multiplies rows; geolocation_prefix has one row
+# per prefix: the centroid of its points inside Brazil (a few raw points are
+# elsewhere in the world) and its most common city and state spelling.
+OLIST_DERIVED = {
+    "geolocation_prefix": {
+        "from": "geolocation",
+        "columns": {
+            "zip_code_prefix": "INTEGER", "lat": "REAL", "lng": "REAL", "city": "TEXT", "state": "TEXT",
+            "points": "INTEGER",
+        },
+        "primary_key": ["zip_code_prefix"],
+        "select": """
+            SELECT prefix, lat_sum / inside, lng_sum / inside, city, state, points
+            FROM (
+                SELECT prefix, city, state,
+                       ROW_NUMBER() OVER (PARTITION BY prefix ORDER BY n DESC, city, state) AS rank,
+                       SUM(lat_sum) OVER (PARTITION BY prefix) AS lat_sum,
+                       SUM(lng_sum) OVER (PARTITION BY prefix) AS lng_sum,
+                       NULLIF(SUM(inside) OVER (PARTITION BY prefix), 0) AS inside,
+                       SUM(n) OVER (PARTITION BY prefix) AS points
+                FROM (
+                    SELECT geolocation_zip_code_prefix AS prefix, geolocation_city AS city,
+                           geolocation_state AS state, COUNT(*) AS n,
+                           SUM(IIF(in_brazil, geolocation_lat, NULL)) AS lat_sum,
+                           SUM(IIF(in_brazil, geolocation_lng, NULL)) AS lng_sum,
+                           SUM(in_brazil) AS inside
+                    FROM (
+                        SELECT *, geolocation_lat BETWEEN -34 AND 5.5
+                                  AND geolocation_lng BETWEEN -74 AND -34.5 AS in_brazil
+                        FROM geolocation
+                    )
+                    GROUP BY 1, 2, 3
+                )
+            )
+            WHERE rank = 1
+            ORDER BY prefix""",
+    },
+}
+
+# Tables whose free-text fields can hold quoted newlines, so their files
+# can't be split into byte ranges at arbitrary line breaks
+MULTILINE_TABLES = {"order_reviews"}
+
+INSTACART_TABLES = {
+    'aisles.csv': 'aisles',
+    'departments.csv': 'departments',
+    'products.csv': 'products',
+    'orders.csv': 'orders',
+    'order_products__train.csv': 'order_products__train',
+    'order_products__prior.csv': 'order_products__prior',
+}
+
+_ORDER_PRODUCTS = {"order_id": "int32", "product_id": "int32", "add_to_cart_order": "int16", "reordered": "int8"}
+
+INSTACART_DTYPES = {
+    "aisles": {"aisle_id": "int16", "aisle": "str"},
+    "departments": {"department_id": "int8", "department": "str"},
+    "products": {"product_id": "int32", "product_name": "str", "aisle_id": "int16", "department_id": "int8"},
+    "orders": {
+        "order_id": "int32", "user_id": "int32", "eval_set": "str", "order_number": "int16",
+        "order_dow": "int8", "order_hour_of_day": "int8", "days_since_prior_order": "float32",
+    },
+    "order_products__train": _ORDER_PRODUCTS,
+    "order_products__prior": _ORDER_PRODUCTS,
+}
+
+_ORDER_PRODUCTS_SCHEMA = {
+    "columns": {name: "INTEGER" for name in _ORDER_PRODUCTS},
+    "primary_key": ["order_id", "add_to_cart_order"],
+    "without_rowid": True,
+}
+
+INSTACART_SCHEMA = {
+    "aisles": {"columns": {"aisle_id": "INTEGER", "aisle": "TEXT"}, "primary_key": ["aisle_id"]},
+    "departments": {"columns": {"department_id": "INTEGER", "department": "TEXT"}, "primary_key": ["department_id"]},
+    "products": {
+        "columns": {"product_id": "INTEGER", "product_name": "TEXT", "aisle_id": "INTEGER", "department_id": "INTEGER"},
+        "primary_key": ["product_id"],
+    },
+    "orders": {
+        "columns": {
+            "order_id": "INTEGER", "user_id": "INTEGER", "eval_set": "TEXT", "order_number": "INTEGER",
+            "order_dow": "INTEGER", "order_hour_of_day": "INTEGER", "days_since_prior_order": "REAL",
+        },
+        "primary_key": ["order_id"],
+    },
+    "order_products__train": _ORDER_PRODUCTS_SCHEMA,
+    "order_products__prior": _ORDER_PRODUCTS_SCHEMA,
+}
+
+INSTACART_INDEXES = [
+    ("idx_orders_user_id", "orders", ["user_id"]),
+    ("idx_order_products__prior_product_id", "order_products__prior", ["product_id"]),
+    ("idx_order_products__train_product_id", "order_products__train", ["product_id"]),
+    ("idx_products_aisle_id", "products", ["aisle_id"]),
+    ("idx_products_department_id", "products", ["department_id"]),
+]
+
+# Demo sampling (sampling.py): the root table is sampled by hashing its key,
+# "cascade" keeps the child rows whose parent was kept, as (child, column,
+# parent, parent column) in load order, and "full" tables are kept whole.
+# Sampling whole customers/users keeps their order histories intact.
+OLIST_SAMPLING = {
+    "full": ["product_category_translation", "products", "sellers", "geolocation"],
+    "root": ("customers", "customer_unique_id"),
+    "cascade": [
+        ("orders", "customer_id", "customers", "customer_id"),
+        ("order_items", "order_id", "orders", "order_id"),
+        ("order_items", "product_id", "products", "product_id"),
+        ("order_items", "seller_id", "sellers", "seller_id"),
+        ("order_payments", "order_id", "orders", "order_id"),
+        ("order_reviews", "order_id", "orders", "order_id"),
+    ],
+}
+
+INSTACART_SAMPLING = {
+    "full": ["aisles", "departments", "products"],
+    "root": ("orders", "user_id"),
+    "cascade": [
+        ("order_products__train", "order_id", "orders", "order_id"),
+        ("order_products__train", "product_id", "products", "product_id"),
+        ("order_products__prior", "order_id", "orders", "order_id"),
+        ("order_products__prior", "product_id", "products", "product_id"),
+    ],
+}
+
+# Standard questions timed before and after optimize.py: the join and
+# aggregate shapes the agent generates most, plus selective lookups whose
+# plans depend on the planner's statistics
+OLIST_QUERIES = {
+    "revenue by category": """
+        SELECT t.product_category_name_english, SUM(i.price + i.freight_value)
+        FROM order_items i
+        JOIN products p ON p.product_id = i.product_id
+        JOIN product_category_translation t ON t.product_category_name = p.product_category_name
+        GROUP BY 1""",
+    "orders by customer state": """
+        SELECT c.customer_state, COUNT(*)
+        FROM orders o JOIN customers c ON c.customer_id = o.customer_id
+        GROUP BY 1""",
+    "seller revenue by state": """
+        SELECT s.seller_state, SUM(i.price)
+        FROM order_items i JOIN sellers s ON s.seller_id = i.seller_id
+        GROUP BY 1""",
+    "payment value by status": """
+        SELECT o.order_status, AVG(p.payment_value)
+        FROM orders o JOIN order_payments p ON p.order_id = o.order_id
+        GROUP BY 1""",
+    "item price by review score": """
+        SELECT r.review_score, AVG(i.price)
+        FROM order_reviews r JOIN order_items i ON i.order_id = r.order_id
+        GROUP BY 1""",
+    "orders from one state": """
+        SELECT COUNT(*), AVG(i.price)
+        FROM customers c
+        JOIN orders o ON o.customer_id = c.customer_id
+        JOIN order_items i ON i.order_id = o.order_id
+        WHERE c.customer_state = 'RJ'""",
+    "monthly revenue in a year": """
+        SELECT o.purchase_month, SUM(i.price + i.freight_value)
+        FROM orders o JOIN order_items i ON i.order_id = o.order_id
+        WHERE o.purchase_year = 2017
+        GROUP BY 1""",
+    "delivery days by state": """
+        SELECT c.customer_state, AVG(o.delivery_days)
+        FROM orders o JOIN customers c ON c.customer_id = o.customer_id
+        WHERE o.delivery_days IS NOT NULL
+        GROUP BY 1""",
+    "customers by state, located": """
+        SELECT c.customer_state, COUNT(*), AVG(g.lat), AVG(g.lng)
+        FROM customers c JOIN geolocation_prefix g ON g.zip_code_prefix = c.customer_zip_code_prefix
+        GROUP BY 1""",
+    "sellers in one state": """
+        SELECT s.seller_city, SUM(i.price)
+        FROM sellers s JOIN order_items i ON i.seller_id = s.seller_id
+        WHERE s.seller_state = 'PR'
+        GROUP BY 1""",
+}
+
+INSTACART_QUERIES = {
+    "top products": """
+        SELECT p.product_name, COUNT(*) AS frequency
+        FROM order_products__prior op JOIN products p ON op.product_id = p.product_id
+        GROUP BY p.product_id ORDER BY frequency DESC LIMIT 10""",
+    "reorder rate by department": """
+        SELECT d.department, AVG(op.reordered)
+        FROM order_products__prior op
+        JOIN products p ON op.product_id = p.product_id
+        JOIN departments d ON p.department_id = d.department_id
+        GROUP BY d.department""",
+    "orders by hour": """
+        SELECT order_hour_of_day, COUNT(*) FROM orders GROUP BY order_hour_of_day""",
+    "one user's products": """
+        SELECT p.product_name, COUNT(*)
+        FROM orders o
+        JOIN order_products__prior op ON op.order_id = o.order_id
+        JOIN products p ON p.product_id = op.product_id
+        WHERE o.user_id = 1
+        GROUP BY p.product_id""",
+    "aisles in one department": """
+        SELECT a.aisle, COUNT(*)
+        FROM aisles a
+        JOIN products p ON a.aisle_id = p.aisle_id
+        JOIN departments d ON p.department_id = d.department_id
+        WHERE d.department = 'frozen'
+        GROUP BY a.aisle_id""",
+}
+
+DATASETS = {
+    "olist": {
+        "tables": OLIST_TABLES, "dtypes": OLIST_DTYPES, "schema": OLIST_SCHEMA,
+        "encode": OLIST_ENCODED_IDS, "indexes": OLIST_INDEXES, "sampling": OLIST_SAMPLING,
+        "queries": OLIST_QUERIES, "derived": OLIST_DERIVED,
+    },
+    "instacart": {
+        "tables": INSTACART_TABLES, "dtypes": INSTACART_DTYPES, "schema": INSTACART_SCHEMA,
+        "encode": {}, "indexes": INSTACART_INDEXES, "sampling": INSTACART_SAMPLING,
+        "queries": INSTACART_QUERIES, "derived": {},
+    },
+}
@@ -42,17 +42,19 @@ def download_dataset():
         api.authenticate()
 
         dataset = "olistbr/brazilian-ecommerce"
-        api.dataset_download_files(dataset, path=raw_dir, unzip=True)
+        # Kept zipped: setup_database.py reads the CSVs straight from the archive
+        api.dataset_download_files(dataset, path=raw_dir, unzip=False)
 
         print("✅ Dataset downloaded successfully!")
         print(f"📁 Location: {raw_dir}")
 
         # List downloaded files
-        csv_files = list(raw_dir.glob("*.csv"))
+        with zipfile.ZipFile(raw_dir / "brazilian-ecommerce.zip") as z:
+            csv_files = [info for info in z.infolist() if info.filename.endswith(".csv")]
         print(f"\n📊 Found {len(csv_files)} CSV files:")
-        for f in sorted(csv_files):
-            size_mb = f.stat().st_size / (1024 * 1024)
-            print(f"  - {f.name} ({size_mb:.2f} MB)")
+        for info in sorted(csv_files, key=lambda info: info.filename):
+            size_mb = info.file_size / (1024 * 1024)
+            print(f"  - {info.filename} ({size_mb:.2f} MB)")
 
         print("\n✨ Next step: Run 'python src/setup_database.py' to create the database")
 
@@ -60,7 +62,7 @@ def download_dataset():
         print(f"❌ Error downloading dataset: {e}")
         print("\nTry manual download:")
         print("1. Visit: https://www.kaggle.com/datasets/olistbr/brazilian-ecommerce")
-        print(f"2. Download and extract to: {raw_dir}")
+        print(f"2. Save the zip (or the extracted CSVs) to: {raw_dir}")
         sys.exit(1)
 
 if __name__ == "__main__":
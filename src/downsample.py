@@ -0,0 +1,180 @@
+"""
+Visualization data reduction - keep charts responsive on large results
+Line charts are downsampled with LTTB (or min/max buckets for very large
+series), bar and pie charts keep the top N categories and fold the rest into
+"Other", and high-cardinality numeric axes are binned. The full DataFrame is
+left untouched for the table view.
+"""
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Tuple
+
+MAX_LINE_POINTS = 2000
+MAX_CATEGORIES = {"bar": 30, "pie": 12}
+MAX_BINS = 50
+# Above this many points LTTB's per-bucket loop costs more than it saves
+MINMAX_THRESHOLD = 500_000
+OTHER_LABEL = "Other"
+
+
+def _numeric_axis(series: pd.Series) -> np.ndarray:
+    """Float view of an x axis (datetimes as ns, strings as their position)"""
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype("int64").to_numpy(dtype="float64")
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64")
+    return np.arange(len(series), dtype="float64")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of the points that best preserve
+    the visual shape of the series
+    """
+
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Keep the minimum and maximum of each bucket (fully vectorized)"""
+
+    n = len(y)
+    buckets = max(1, threshold // 2)
+    if n <= threshold:
+        return np.arange(n)
+
+    size = int(np.ceil(n / buckets))
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+
+    # nanarg* needs at least one non-NaN per bucket
+    filled = ~np.isnan(blocks).all(axis=1)
+    low = offsets[filled] + np.nanargmin(blocks[filled], axis=1)
+    high = offsets[filled] + np.nanargmax(blocks[filled], axis=1)
+    return np.unique(np.concatenate(([0, n - 1], low, high)))
+
+
+def top_n_with_other(df: pd.DataFrame, label: str, value: str, n: int) -> pd.DataFrame:
+    """Keep the n largest categories and sum the remainder into "Other" """
+
+    grouped = df.groupby(label, sort=False, dropna=False)[value].sum()
+    if len(grouped) <= n:
+        return df
+
+    top = grouped.nlargest(n - 1)
+    rest = grouped.drop(top.index).sum()
+    reduced = top.reset_index()
+    reduced[label] = reduced[label].astype(str)
+    return pd.concat(
+        [reduced, pd.DataFrame({label: [OTHER_LABEL], value: [rest]})],
+        ignore_index=True
+    )
+
+
+def bin_numeric(df: pd.DataFrame, x: str, y: str, bins: int = MAX_BINS) -> pd.DataFrame:
+    """Aggregate a high-cardinality numeric x axis into equal-width bins"""
+
+    codes, edges = pd.cut(df[x], bins=bins, retbins=True, include_lowest=True)
+    grouped = df.groupby(codes, observed=True)[y].sum()
+    return pd.DataFrame({
+        x: [f"{interval.left:,.4g}–{interval.right:,.4g}" for interval in grouped.index],
+        y: grouped.to_numpy(),
+    })
+
+
+def reduce_for_chart(df: pd.DataFrame, viz_type: str, max_points: int = MAX_LINE_POINTS) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    Reduce a result to what the chart can usefully draw
+
+    Returns:
+        (chart_df, info) where info has original_rows, rows, method and elapsed_ms
+    """
+
+    start = time.perf_counter()
+    rows = 0 if df is None else len(df)
+    info = {"original_rows": rows, "rows": rows, "method": None, "elapsed_ms": 0.0}
+
+    if df is None or len(df.columns) < 2:
+        return df, info
+
+    x_col, y_col = df.columns[0], df.columns[1]
+    reduced = df
+    y_numeric = pd.api.types.is_numeric_dtype(df[y_col])
+
+    if viz_type == "line" and len(df) > max_points and y_numeric:
+        y = df[y_col].to_numpy(dtype="float64")
+        if len(df) > MINMAX_THRESHOLD or np.isnan(y).any():
+            indices = minmax_indices(y, max_points)
+            info["method"] = "minmax"
+        else:
+            indices = lttb_indices(_numeric_axis(df[x_col]), y, max_points)
+            info["method"] = "lttb"
+        reduced = df.iloc[indices]
+
+    elif viz_type in MAX_CATEGORIES and y_numeric:
+        limit = MAX_CATEGORIES[viz_type]
+        x_numeric = pd.api.types.is_numeric_dtype(df[x_col])
+
+        if viz_type == "bar" and x_numeric and df[x_col].nunique() > MAX_BINS:
+            reduced = bin_numeric(df, x_col, y_col)
+            info["method"] = "binned"
+        elif df[x_col].nunique() > limit:
+            reduced = top_n_with_other(df, x_col, y_col, limit)
+            info["method"] = f"top {limit} + other"
+
+    info["rows"] = len(reduced)
+    info["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return reduced, info
+
+
+if __name__ == "__main__":
+    print("📉 Testing visualization downsampling\n")
+
+    rng = np.random.default_rng(0)
+    n = 300_000
+    series = pd.DataFrame({
+        "timestamp": pd.date_range("2017-01-01", periods=n, freq="min"),
+        "value": np.cumsum(rng.normal(size=n)),
+    })
+    categories = pd.DataFrame({
+        "product_category": [f"category_{i}" for i in range(5000)],
+        "sales": rng.pareto(1.5, 5000) * 100,
+    })
+    prices = pd.DataFrame({"price": rng.uniform(0, 5000, 20000).round(2), "orders": rng.integers(1, 50, 20000)})
+
+    for name, df, viz_type in [
+        ("line", series, "line"),
+        ("pie", categories, "pie"),
+        ("bar (categorical)", categories, "bar"),
+        ("bar (numeric x)", prices, "bar"),
+    ]:
+        reduced, info = reduce_for_chart(df, viz_type)
+        print(f"{name}: {info['original_rows']:,} → {info['rows']:,} rows "
+              f"({info['method']}, {info['elapsed_ms']:.1f} ms)")
@@ -0,0 +1,183 @@
+"""
+Offline evaluation of dynamic few-shot retrieval
+Indexes the seed + training examples of an eval set, retrieves examples for
+each held-out question and reports retrieval quality and prompt savings
+against the old static three-example prompt.
+
+    python src/evaluate_fewshot.py examples/fewshot/olist_eval.json
+    python src/evaluate_fewshot.py examples/fewshot/olist_eval.json \\
+        --db data/ecommerce.db --model gpt-4o-mini
+
+With --db and --model it also generates SQL for every held-out question with
+static and dynamic examples and compares first-try execution success and
+result agreement with the gold query.
+"""
+import re
+import sys
+import json
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set, Any
+
+from database import DatabaseManager
+from fewshot import ExampleStore, SEED_EXAMPLES, format_examples
+from history import count_tokens
+
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def tables_in(sql: str) -> Set[str]:
+    return {t.lower() for t in TABLE_REFERENCE.findall(sql)}
+
+
+def identifiers_from(examples: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Approximate a schema snapshot from identifiers used in the example SQL"""
+
+    tables = {}
+    for example in examples:
+        words = set(re.findall(r"[a-z_][a-z0-9_]*", example["sql"].lower()))
+        for table in tables_in(example["sql"]):
+            tables.setdefault(table, set()).update(w for w in words if "_" in w)
+    return {"tables": {t: {"columns": [{"name": c} for c in sorted(cols)]} for t, cols in tables.items()}}
+
+
+def build_store(eval_set: Dict[str, Any], schema_info: Dict[str, Any], workdir: str) -> ExampleStore:
+    """Example store over seeds + training examples, in a scratch database"""
+
+    db_manager = DatabaseManager(str(Path(workdir) / "fewshot_eval.db"))
+    store = ExampleStore(db_manager, eval_set["dataset"], schema_info)
+    for example in eval_set["train"]:
+        store.add(example["question"], example["sql"])
+    return store
+
+
+def evaluate_retrieval(store: ExampleStore, heldout: List[Dict[str, str]], k: int, budget: int) -> Dict[str, Any]:
+    static_examples = store.seed_examples()
+    static_tokens = count_tokens(format_examples(static_examples))
+
+    rows = []
+    for item in heldout:
+        retrieved = store.retrieve(item["question"], k=k, token_budget=budget)
+        gold = tables_in(item["sql"])
+        covered = set().union(*(tables_in(e["sql"]) for e in retrieved)) if retrieved else set()
+
+        rows.append({
+            "question": item["question"],
+            "retrieved": [e["question"] for e in retrieved],
+            "table_recall": len(gold & covered) / len(gold) if gold else 1.0,
+            "exact_table_hit": any(tables_in(e["sql"]) == gold for e in retrieved),
+            "prompt_tokens": count_tokens(format_examples(retrieved)) if retrieved else 0,
+        })
+
+    n = len(rows) or 1
+    return {
+        "questions": len(rows),
+        "k": k,
+        "table_recall": sum(r["table_recall"] for r in rows) / n,
+        "exact_table_hit_rate": sum(r["exact_table_hit"] for r in rows) / n,
+        "static_example_tokens": static_tokens,
+        "dynamic_example_tokens_avg": sum(r["prompt_tokens"] for r in rows) / n,
+        "per_question": rows,
+    }
+
+
+def evaluate_generation(eval_set: Dict[str, Any], store: ExampleStore, db_path: str, model: str, k: int, budget: int) -> Dict[str, Any]:
+    """First-try execution success and gold agreement, static vs dynamic examples"""
+
+    from agents import SQLAgentSystem
+
+    agent = SQLAgentSystem(db_path, model=model)
+    static_examples = store.seed_examples()
+    outcomes = {"static": [], "dynamic": []}
+
+    for item in eval_set["heldout"]:
+        ok, gold, _ = agent.db_manager.execute_query(item["sql"])
+
+        for mode in ("static", "dynamic"):
+            examples = static_examples if mode == "static" else store.retrieve(item["question"], k=k, token_budget=budget)
+            prompt = (
+                agent.sql_agent_prompt
+                + ("EXAMPLES:\n\n" + format_examples(examples) + "\n\n" if examples else "")
+                + "Now generate the SQL query for the following request:\n\n" + item["question"]
+            )
+            response = agent.llm.invoke([
+                {"role": "system", "content": "You are a SQL expert. Generate only valid SQL queries."},
+                {"role": "user", "content": prompt}
+            ])
+            sql = response.content.strip().strip("`")
+            if sql.lower().startswith("sql"):
+                sql = sql[3:]
+
+            success, data, _ = agent.db_manager.execute_query(sql)
+            matches = bool(
+                success and ok
+                and data.shape == gold.shape
+                and sorted(map(str, data.values.ravel())) == sorted(map(str, gold.values.ravel()))
+            )
+            outcomes[mode].append({"success": success, "matches_gold": matches, "prompt_tokens": count_tokens(prompt)})
+
+    summary = {}
+    for mode, rows in outcomes.items():
+        n = len(rows) or 1
+        summary[mode] = {
+            "first_try_success": sum(r["success"] for r in rows) / n,
+            "gold_match": sum(r["matches_gold"] for r in rows) / n,
+            "prompt_tokens_avg": sum(r["prompt_tokens"] for r in rows) / n,
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate few-shot example retrieval on a held-out set")
+    parser.add_argument("eval_file", help="JSON file with dataset, train and heldout examples")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--token-budget", type=int, default=600)
+    parser.add_argument("--db", help="Database for schema identifiers and execution checks")
+    parser.add_argument("--model", help="Also compare SQL generation (requires --db)")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.eval_file) as f:
+        eval_set = json.load(f)
+
+    if args.db:
+        from schema import SchemaExtractor
+        schema_info = SchemaExtractor(args.db).extract_schema()
+    else:
+        schema_info = identifiers_from(SEED_EXAMPLES.get(eval_set["dataset"], []) + eval_set["train"] + eval_set["heldout"])
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = build_store(eval_set, schema_info, workdir)
+        report = {"dataset": eval_set["dataset"], "retrieval": evaluate_retrieval(store, eval_set["heldout"], args.k, args.token_budget)}
+
+        if args.model and args.db:
+            report["generation"] = evaluate_generation(eval_set, store, args.db, args.model, args.k, args.token_budget)
+
+    retrieval = report["retrieval"]
+    print(f"\n📚 Few-shot retrieval — {report['dataset']} ({retrieval['questions']} held-out questions)")
+    print("=" * 60)
+    for row in retrieval["per_question"]:
+        print(f"\n❓ {row['question']}")
+        for question in row["retrieved"]:
+            print(f"   → {question}")
+    print("\n" + "=" * 60)
+    print(f"Table recall@{retrieval['k']}:        {retrieval['table_recall']:.2f}")
+    print(f"Exact table-set hit rate:  {retrieval['exact_table_hit_rate']:.2f}")
+    print(f"Example tokens (static):   {retrieval['static_example_tokens']}")
+    print(f"Example tokens (dynamic):  {retrieval['dynamic_example_tokens_avg']:.0f} avg")
+
+    for mode, stats in report.get("generation", {}).items():
+        print(f"\n{mode}: success {stats['first_try_success']:.0%}, "
+              f"gold match {stats['gold_match']:.0%}, prompt {stats['prompt_tokens_avg']:.0f} tokens")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to: {args.json}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Dynamic few-shot examples for the SQL generator agent
+Successful (question, SQL) pairs are stored in the database and retrieved
+per request with BM25 over question words and schema identifiers, so the
+prompt carries only the few examples most similar to the current request.
+"""
+import re
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Any
+
+from history import count_tokens
+
+WORD = re.compile(r"[a-z0-9_]+")
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "by", "in", "on", "to", "and", "or", "with",
+    "from", "is", "are", "me", "show", "get", "what", "which", "how", "each",
+    "per", "all", "list", "please", "give", "find", "id"
+}
+
+# Seed examples so a fresh database still gets relevant few-shot context.
+# A seed whose "requires" columns the schema lacks uses its "fallback" SQL.
+SEED_EXAMPLES = {
+    "olist": [
+        {
+            "question": "Get top 10 products by total quantity sold",
+            "sql": """SELECT
+    p.product_id,
+    COUNT(oi.order_id) as total_orders,
+    SUM(oi.order_item_id) as total_quantity
+FROM order_items oi
+JOIN products p ON oi.product_id = p.product_id
+GROUP BY p.product_id
+ORDER BY total_quantity DESC
+LIMIT 10"""
+        },
+        {
+            "question": "Calculate monthly revenue for 2017",
+            "sql": """SELECT
+    o.purchase_month as month,
+    ROUND(SUM(oi.price + oi.freight_value), 2) as revenue
+FROM orders o
+JOIN order_items oi ON o.order_id = oi.order_id
+WHERE o.purchase_year = 2017
+GROUP BY month
+ORDER BY month""",
+            # Date-part columns only exist once the database is built or refreshed with them
+            "requires": {"orders": ["purchase_year", "purchase_month"]},
+            "fallback": """SELECT
+    strftime('%Y-%m', o.order_purchase_timestamp) as month,
+    ROUND(SUM(oi.price + oi.freight_value), 2) as revenue
+FROM orders o
+JOIN order_items oi ON o.order_id = oi.order_id
+WHERE strftime('%Y', o.order_purchase_timestamp) = '2017'
+GROUP BY month
+ORDER BY month"""
+        },
+        {
+            "question": "Show payment method distribution",
+            "sql": """SELECT
+    payment_type,
+    COUNT(*) as count,
+    ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM order_payments), 2) as percentage
+FROM order_payments
+GROUP BY payment_type
+ORDER BY count DESC"""
+        },
+    ],
+    "instacart": [
+        {
+            "question": "Get the top 10 most ordered products",
+            "sql": """SELECT
+    p.product_name,
+    COUNT(*) as times_ordered
+FROM order_products__prior op
+JOIN products p ON op.product_id = p.product_id
+GROUP BY p.product_id
+ORDER BY times_ordered DESC
+LIMIT 10"""
+        },
+        {
+            "question": "Count orders by hour of day",
+            "sql": """SELECT
+    order_hour_of_day,
+    COUNT(*) as orders
+FROM orders
+GROUP BY order_hour_of_day
+ORDER BY order_hour_of_day"""
+        },
+        {
+            "question": "Count products per department",
+            "sql": """SELECT
+    d.department,
+    COUNT(*) as products
+FROM products p
+JOIN departments d ON p.department_id = d.department_id
+GROUP BY d.department
+ORDER BY products DESC"""
+        },
+    ],
+}
+
+
+def tokenize(text: str, identifiers: Optional[set] = None) -> List[str]:
+    """
+    Lowercased word tokens. Schema identifiers are kept whole and also split
+    on underscores, so "order_purchase_timestamp" matches "purchase".
+    """
+
+    tokens = []
+    for word in WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        tokens.append(word)
+        if "_" in word and (identifiers is None or word in identifiers):
+            tokens.extend(part for part in word.split("_") if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Minimal incremental Okapi BM25 index"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[Counter] = []
+        self.lengths: List[int] = []
+        self.doc_freq: Counter = Counter()
+
+    def add(self, tokens: List[str]):
+        terms = Counter(tokens)
+        self.docs.append(terms)
+        self.lengths.append(len(tokens))
+        self.doc_freq.update(terms.keys())
+
+    def scores(self, query: List[str]) -> List[float]:
+        n = len(self.docs)
+        if n == 0:
+            return []
+
+        avg_len = sum(self.lengths) / n or 1.0
+        query_terms = set(query)
+        results = []
+
+        for terms, length in zip(self.docs, self.lengths):
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                df = self.doc_freq[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+            results.append(score)
+
+        return results
+
+
+class ExampleStore:
+    """Persistent store of successful (question, SQL) pairs with BM25 retrieval"""
+
+    def __init__(self, db_manager, dataset: str, schema_info: Optional[Dict[str, Any]] = None):
+        self.db_manager = db_manager
+        self.dataset = dataset
+        self.identifiers = set()
+        self.schema_info = schema_info
+
+        for table, info in (schema_info or {}).get("tables", {}).items():
+            self.identifiers.add(table.lower())
+            self.identifiers.update(col["name"].lower() for col in info["columns"])
+
+        self.examples: List[Dict[str, str]] = []
+        self._by_question: Dict[str, str] = {}
+        self.index = BM25Index()
+        self._lock = threading.Lock()
+
+        self._init_table()
+        self._load()
+
+    def _init_table(self):
+        with self.db_manager.pool.connection() as conn:
+            # Underscore-prefixed so schema extraction keeps it out of the prompt;
+            # stores created under the old name are renamed in place
+            tables = {name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('query_examples', '_query_examples')"
+            )}
+            if tables == {"query_examples"}:
+                conn.execute("ALTER TABLE query_examples RENAME TO _query_examples")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS _query_examples (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dataset TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    sql_query TEXT NOT NULL,
+                    source TEXT DEFAULT 'log',
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (dataset, question)
+                )
+            """)
+            conn.commit()
+
+    def _columns(self, table: str) -> set:
+        if self.schema_info is not None:
+            return {col["name"] for col in self.schema_info.get("tables", {}).get(table, {}).get("columns", [])}
+        with self.db_manager.pool.connection() as conn:
+            return {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+
+    def seed_examples(self) -> List[Dict[str, str]]:
+        """Seed examples with SQL that runs against this database's schema"""
+
+        seeds = []
+        for example in SEED_EXAMPLES.get(self.dataset, []):
+            sql = example["sql"]
+            if any(not set(columns) <= self._columns(table) for table, columns in example.get("requires", {}).items()):
+                sql = example.get("fallback")
+            if sql:
+                seeds.append({"question": example["question"], "sql": sql})
+        return seeds
+
+    def _load(self):
+        with self.db_manager.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT question, sql_query, source FROM _query_examples WHERE dataset = ? ORDER BY id",
+                (self.dataset,)
+            ).fetchall()
+
+        seeds = self.seed_examples()
+        # Stored seeds follow the current schema (it can gain or lack columns since seeding)
+        seed_sql = {seed["question"].lower(): seed["sql"] for seed in seeds}
+        for question, sql, source in rows:
+            self._index(question, seed_sql.get(question.lower(), sql) if source == "seed" else sql)
+
+        if not rows:
+            for seed in seeds:
+                self.add(seed["question"], seed["sql"], source="seed")
+
+    def _index(self, question: str, sql: str):
+        key = question.strip().lower()
+        if key in self._by_question:
+            return
+
+        self._by_question[key] = sql
+        self.examples.append({"question": question, "sql": sql})
+        # Index the question and the identifiers its SQL touches
+        sql_identifiers = [t for t in WORD.findall(sql.lower()) if t in self.identifiers]
+        self.index.add(tokenize(question, self.identifiers) + tokenize(" ".join(sql_identifiers), self.identifiers))
+
+    def add(self, question: str, sql: str, source: str = "log"):
+        """Record a (question, SQL) pair that executed successfully"""
+
+        question = question.strip()
+        if not question or not sql.strip():
+            return
+
+        with self._lock:
+            if question.lower() in self._by_question:
+                return
+
+            with self.db_manager.pool.connection() as conn:
+                conn.execute("""
+                    INSERT OR IGNORE INTO _query_examples (dataset, question, sql_query, source)
+                    VALUES (?, ?, ?, ?)
+                """, (self.dataset, question, sql.strip(), source))
+                conn.commit()
+
+            self._index(question, sql.strip())
+
+    def find_exact(self, question: str) -> Optional[str]:
+        """SQL previously generated for exactly this question, if any"""
+
+        with self._lock:
+            return self._by_question.get(question.strip().lower())
+
+    def retrieve(self, question: str, k: int = 3, token_budget: int = 600) -> List[Dict[str, str]]:
+        """Top-k most similar examples whose combined size fits the token budget"""
+
+        with self._lock:
+            scores = self.index.scores(tokenize(question, self.identifiers))
+            ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+            candidates = [self.examples[i] for i in ranked if scores[i] > 0]
+
+        selected = []
+        used = 0
+        for example in candidates:
+            cost = count_tokens(format_examples([example]))
+            if used + cost > token_budget:
+                continue
+            selected.append(example)
+            used += cost
+            if len(selected) >= k:
+                break
+
+        return selected
+
+
+def format_examples(examples: List[Dict[str, str]]) -> str:
+    """Render examples in the SQL agent prompt format"""
+
+    return "\n\n".join(
+        f'Request: "{example["question"]}"\nQuery:\n{example["sql"]}'
+        for example in examples
+    )
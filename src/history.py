@@ -0,0 +1,201 @@
+"""
+Token-budgeted chat history for the conversational agent
+Keeps the most recent turns that fit a token budget and folds older turns
+into a rolling summary stored in the chat_history table.
+"""
+import json
+import hashlib
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+LLM_ROLES = ("user", "assistant")
+
+_encoder = None
+
+
+def _get_encoder():
+    """Load a tiktoken encoder on first use (None if tiktoken is not installed)"""
+    global _encoder
+
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+
+    return _encoder or None
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count tokens in text (tiktoken if available, else ~4 characters per token)"""
+
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+
+    return max(1, (len(text) + 3) // 4)
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Tokens for one chat message, including per-message framing overhead"""
+    return count_tokens(message["content"]) + 4
+
+
+def message_key(message: Dict[str, str]) -> str:
+    """Stable identifier for a message, used to track what has been summarized"""
+    raw = f"{message['role']}\x00{message['content']}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def sanitize_messages(messages: Optional[List[Dict]]) -> List[Dict[str, str]]:
+    """
+    Strip everything an LLM should not see: DataFrames, visualization
+    configs, SQL metadata and non-chat roles. Returns plain role/content dicts.
+    """
+
+    clean = []
+    for message in messages or []:
+        role = message.get("role")
+        content = message.get("content")
+
+        if role not in LLM_ROLES or not isinstance(content, str) or not content.strip():
+            continue
+
+        clean.append({"role": role, "content": content})
+
+    return clean
+
+
+def summarize_turns(messages: List[Dict[str, str]], max_chars: int = 160) -> List[str]:
+    """Cheap extractive summary: one short line per message, no LLM call"""
+
+    lines = []
+    for message in messages:
+        text = " ".join(message["content"].split())
+        if message["role"] == "assistant":
+            # First sentence carries the answer; the rest is usually detail
+            text = text.split(". ")[0]
+        if len(text) > max_chars:
+            text = text[:max_chars - 3] + "..."
+
+        speaker = "User asked" if message["role"] == "user" else "Assistant"
+        lines.append(f"- {speaker}: {text}")
+
+    return lines
+
+
+class ChatHistoryManager:
+    """Fits chat history into a token budget with an incrementally updated summary"""
+
+    def __init__(
+        self,
+        db_manager=None,
+        token_budget: int = 1500,
+        summary_budget: int = 300,
+        summarizer: Optional[Callable[[str, List[Dict[str, str]]], str]] = None
+    ):
+        """
+        Args:
+            db_manager: DatabaseManager used to persist the rolling summary
+            token_budget: Max tokens for summary + recent turns
+            summary_budget: Max tokens for the rolling summary itself
+            summarizer: Optional fn(previous_summary, new_messages) -> summary,
+                e.g. an LLM call. Defaults to a local extractive summary.
+        """
+        self.db_manager = db_manager
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer
+        self._summaries: Dict[str, Dict] = {}  # used when there is no db_manager
+
+    def build_context(self, session_id: str, chat_history: Optional[List[Dict]]) -> List[Dict[str, str]]:
+        """
+        Return LLM-ready messages: an optional summary system message followed
+        by the most recent turns that fit the token budget.
+        """
+
+        messages = sanitize_messages(chat_history)
+        summary = self._load_summary(session_id)
+
+        # Newest turns first, until the budget (minus the summary) is used up
+        summary_tokens = count_tokens(summary["text"]) if summary["text"] else 0
+        available = self.token_budget - min(summary_tokens, self.summary_budget)
+        used = 0
+        cut = len(messages)
+
+        while cut > 0:
+            cost = message_tokens(messages[cut - 1])
+            if used + cost > available:
+                break
+            used += cost
+            cut -= 1
+
+        recent = messages[cut:]
+        older = messages[:cut]
+
+        if older:
+            summary = self._update_summary(session_id, summary, older)
+
+        context = []
+        if summary["text"]:
+            context.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary['text']}"
+            })
+        context.extend(recent)
+
+        return context
+
+    def _update_summary(self, session_id: str, summary: Dict, older: List[Dict[str, str]]) -> Dict:
+        """Fold turns not yet covered by the summary into it"""
+
+        keys = [message_key(m) for m in older]
+        # Keys repeat ("yes" twice), so resume at the recorded position when it
+        # still holds that key, else after the key's last occurrence
+        count = summary.get("count")
+        if count and count <= len(keys) and keys[count - 1] == summary["last"]:
+            start = count
+        elif summary["last"] in keys:
+            start = len(keys) - keys[::-1].index(summary["last"])
+        else:
+            start = 0
+        pending = older[start:]
+
+        if not pending:
+            return summary
+
+        if self.summarizer:
+            text = self.summarizer(summary["text"], pending)
+        else:
+            lines = (summary["text"].splitlines() if summary["text"] else []) + summarize_turns(pending)
+            # Drop the oldest lines once the summary outgrows its budget
+            while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_budget:
+                lines.pop(0)
+            text = "\n".join(lines)
+
+        summary = {"text": text, "last": keys[-1], "count": len(keys)}
+        self._save_summary(session_id, summary)
+        return summary
+
+    def _load_summary(self, session_id: str) -> Dict:
+        empty = {"text": "", "last": None}
+        if self.db_manager is None:
+            return self._summaries.get(session_id, empty)
+
+        raw = self.db_manager.get_history_summary(session_id)
+        if not raw:
+            return empty
+
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return {"text": raw, "last": None}
+
+    def _save_summary(self, session_id: str, summary: Dict):
+        if self.db_manager is None:
+            self._summaries[session_id] = summary
+            return
+
+        self.db_manager.save_history_summary(session_id, json.dumps(summary))
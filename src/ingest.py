@@ -0,0 +1,371 @@
+"""
+Streaming CSV ingestion
+CSVs are read in fixed-size chunks with declared dtypes and written through
+a BulkLoader, so peak memory depends on the chunk size, not the file size.
+Each chunk is committed together with a progress row in `_ingest_progress`;
+an interrupted load can resume where it stopped and tables that finished
+are skipped. With a physical schema (datasets.py) tables get declared types
+and primary keys, and long hash ids are dictionary-encoded to integers.
+"""
+import sys
+import time
+import sqlite3
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from bulk_load import BulkLoader, RESUMABLE_PRAGMAS, _quote, frame_rows, sqlite_type
+from sources import as_source
+
+CHUNK_ROWS = 100_000
+PROGRESS_TABLE = "_ingest_progress"
+ID_DICTIONARY = "id_dictionary"
+
+# pandas dtype name -> SQLite column type
+DTYPE_SQL = {"str": "TEXT"}
+
+
+def column_types(dtypes: Dict[str, str]):
+    return [(name, DTYPE_SQL.get(dtype) or sqlite_type(pd.api.types.pandas_dtype(dtype)))
+            for name, dtype in dtypes.items()]
+
+
+def create_table(loader: BulkLoader, table: str, dtypes: Dict[str, str], spec: Optional[Dict[str, Any]] = None,
+                 replace: bool = True):
+    """Create a table from its declared schema, or from the parse dtypes without one"""
+
+    if spec is None:
+        loader.create_table(table, column_types(dtypes), replace=replace)
+    else:
+        generated = [(name, f"{sql_type} GENERATED ALWAYS AS ({expression}) VIRTUAL")
+                     for name, (sql_type, expression) in spec.get("generated", {}).items()]
+        loader.create_table(table, list(spec["columns"].items()) + generated, replace=replace,
+                            primary_key=spec.get("primary_key"), without_rowid=spec.get("without_rowid", False))
+
+
+def add_generated_columns(conn: sqlite3.Connection, table: str, spec: Dict[str, Any]) -> List[str]:
+    """
+    Add the spec's generated columns an existing table lacks (it was loaded
+    before they were declared); returns the names added
+    """
+
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({_quote(table)})")}
+    added = []
+    for name, (sql_type, expression) in spec.get("generated", {}).items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(name)} {sql_type} "
+                         f"GENERATED ALWAYS AS ({expression}) VIRTUAL")
+            added.append(name)
+    return added
+
+
+def build_derived(loader: BulkLoader, table: str, spec: Dict[str, Any]) -> int:
+    """
+    (Re)create a derived table from its SELECT over loaded tables (see
+    datasets.py) inside the loader's transaction; returns its row count
+    """
+
+    loader._begin()
+    loader.create_table(table, list(spec["columns"].items()), primary_key=spec.get("primary_key"),
+                        without_rowid=spec.get("without_rowid", False))
+    columns = ", ".join(_quote(name) for name in spec["columns"])
+    return loader.conn.execute(f"INSERT INTO {_quote(table)} ({columns}) {spec['select']}").rowcount
+
+
+class IdEncoder:
+    """
+    Dictionary-encodes hash id columns to dense integers
+
+    Each entity (order, customer, ...) numbers its ids 1, 2, 3... in order of
+    first appearance, whichever table they appear in first, so foreign keys
+    encode to the same integer as the key they reference. The dictionary is
+    persisted in `id_dictionary` inside the load transaction, so resumed and
+    incremental loads keep the same numbering. Only (entity, id) is indexed:
+    decoding is the common lookup, and a hash search scans one entity.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, columns: Dict[str, str]):
+        self.conn = conn
+        self.columns = columns
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {ID_DICTIONARY} (
+                entity TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                PRIMARY KEY (entity, id)
+            ) WITHOUT ROWID
+        """)
+
+        self.maps: Dict[str, Dict[str, int]] = {entity: {} for entity in set(columns.values())}
+        for entity, key, value in conn.execute(f"SELECT entity, id, hash FROM {ID_DICTIONARY}"):
+            if entity in self.maps:
+                self.maps[entity][value] = key
+
+    def encode(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Replace encoded columns with their integer ids, registering new hashes"""
+
+        chunk = chunk.copy()
+        for column in chunk.columns:
+            entity = self.columns.get(column)
+            if entity is None:
+                continue
+
+            mapping = self.maps[entity]
+            values = chunk[column]
+            codes = values.map(mapping)
+            unseen = values[codes.isna() & values.notna()].unique()
+            if len(unseen):
+                start = len(mapping) + 1
+                new = dict(zip(unseen.tolist(), range(start, start + len(unseen))))
+                mapping.update(new)
+                self.conn.executemany(
+                    f"INSERT INTO {ID_DICTIONARY} (entity, id, hash) VALUES (?, ?, ?)",
+                    [(entity, key, value) for value, key in new.items()]
+                )
+                codes = values.map(mapping)
+            chunk[column] = codes.astype("Int64")
+        return chunk
+
+
+def _ensure_progress_table(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            source TEXT,
+            source_bytes INTEGER,
+            rows_loaded INTEGER NOT NULL DEFAULT 0,
+            complete INTEGER NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def load_progress(db_path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """Recorded progress per table ({} for a new database)"""
+
+    if not Path(db_path).exists():
+        return {}
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute(
+            f"SELECT table_name, source, source_bytes, rows_loaded, complete FROM {PROGRESS_TABLE}"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {
+        table: {"source": source, "source_bytes": size, "rows_loaded": loaded, "complete": bool(complete)}
+        for table, source, size, loaded, complete in rows
+    }
+
+
+def print_progress(table: str, rows: int, fraction: Optional[float]):
+    """Single-line progress indicator"""
+
+    percent = f" {min(fraction, 1.0) * 100:5.1f}%" if fraction is not None else ""
+    sys.stdout.write(f"\r   ⏳ {table}: {rows:,} rows{percent}")
+    sys.stdout.flush()
+
+
+class _CountingReader:
+    """File wrapper that counts bytes handed to the CSV parser"""
+
+    def __init__(self, raw: BinaryIO):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __iter__(self):
+        return iter(self.raw)
+
+
+def stream_csv(
+    loader: BulkLoader,
+    source: Union[str, Path, BinaryIO, Any],
+    table: str,
+    dtypes: Dict[str, str],
+    chunk_rows: int = CHUNK_ROWS,
+    transform: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+    max_rows: Optional[int] = None,
+    total_bytes: Optional[int] = None,
+    resume: bool = True,
+    on_progress: Optional[Callable[[str, int, Optional[float]], None]] = print_progress,
+    spec: Optional[Dict[str, Any]] = None,
+    encoder: Optional[IdEncoder] = None
+) -> Dict[str, Any]:
+    """
+    Load one CSV into `table` chunk by chunk
+
+    Args:
+        source: Path, source (see sources.py, e.g. a zip member) or binary file object
+        dtypes: Column -> pandas dtype; also decides the SQLite column types
+        transform: Optional per-chunk filter/rewrite applied before insert
+        max_rows: Stop after this many rows have been written
+        total_bytes: Source size for progress when `source` is a file object
+        resume: Continue from recorded progress instead of reloading
+        spec: Physical schema for the table (columns, primary_key, without_rowid)
+        encoder: IdEncoder applied to each chunk before insert
+
+    Returns:
+        The loader's stats entry for the table (plus "resumed_from")
+    """
+
+    start = time.perf_counter()
+    conn = loader.conn
+    _ensure_progress_table(conn)
+
+    source = as_source(source)
+    opened = hasattr(source, "open")
+    name = getattr(source, "name", table)
+    if total_bytes is None and opened:
+        total_bytes = source.size
+
+    done = None
+    if resume:
+        done = conn.execute(
+            f"SELECT rows_loaded, complete, source, source_bytes FROM {PROGRESS_TABLE} WHERE table_name = ?",
+            (table,)
+        ).fetchone()
+        # A different or changed source file means starting over
+        if done and (done[2], done[3]) != (name, total_bytes):
+            done = None
+
+    if done and done[1]:
+        entry = loader.record(table, 0, time.perf_counter() - start)
+        entry.update(resumed_from=done[0], skipped=True)
+        return entry
+
+    skip = done[0] if done else 0
+    create_table(loader, table, dtypes, spec, replace=not skip)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {PROGRESS_TABLE} (table_name, source, source_bytes, rows_loaded, complete) "
+        f"VALUES (?, ?, ?, ?, 0)",
+        (table, name, total_bytes, skip)
+    )
+
+    handle = source.open() if opened else source
+    reader = _CountingReader(handle)
+    written = skip
+    seen = 0
+    columns = list(dtypes)
+
+    try:
+        for chunk in pd.read_csv(reader, dtype=dtypes, usecols=columns, chunksize=chunk_rows):
+            chunk = chunk[columns]
+            if transform is not None:
+                chunk = transform(chunk)
+
+            # Already committed by an earlier, interrupted run
+            if seen + len(chunk) <= skip:
+                seen += len(chunk)
+                continue
+            if seen < skip:
+                chunk = chunk.iloc[skip - seen:]
+            seen += len(chunk)
+
+            if max_rows is not None:
+                chunk = chunk.iloc[:max(0, max_rows - written)]
+            if encoder is not None:
+                chunk = encoder.encode(chunk)
+
+            written += loader.insert_rows(table, columns, frame_rows(chunk), commit=False)
+            conn.execute(
+                f"UPDATE {PROGRESS_TABLE} SET rows_loaded = ?, updated_at = CURRENT_TIMESTAMP WHERE table_name = ?",
+                (written, table)
+            )
+            loader.maybe_commit()
+
+            if on_progress:
+                on_progress(table, written, reader.bytes_read / total_bytes if total_bytes else None)
+            if max_rows is not None and written >= max_rows:
+                break
+    finally:
+        if opened:
+            handle.close()
+
+    conn.execute(f"UPDATE {PROGRESS_TABLE} SET complete = 1 WHERE table_name = ?", (table,))
+    loader.commit()
+    if on_progress:
+        sys.stdout.write("\n")
+
+    entry = loader.record(table, written - skip, time.perf_counter() - start)
+    entry["resumed_from"] = skip
+    return entry
+
+
+def ingest_dataset(
+    db_path: Union[str, Path],
+    sources: Dict[str, Union[str, Path]],
+    dtypes: Dict[str, Dict[str, str]],
+    indexes=(),
+    chunk_rows: int = CHUNK_ROWS,
+    resume: bool = True,
+    on_progress=print_progress,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    encode: Optional[Dict[str, str]] = None,
+    derived: Optional[Dict[str, Dict[str, Any]]] = None
+) -> BulkLoader:
+    """
+    Stream several CSVs into one database, then build derived tables and indexes
+
+    Args:
+        sources: Table -> CSV path or source (see sources.py)
+        dtypes: Table -> column dtypes (see datasets.py)
+        indexes: (name, table, columns) built once every table is loaded
+        schema: Table -> physical schema (see datasets.py); dtypes-derived tables without it
+        encode: Column -> entity for hash ids to dictionary-encode
+        derived: Table -> derived table spec (see datasets.py), built from loaded tables
+    """
+
+    with BulkLoader(db_path, pragmas=RESUMABLE_PRAGMAS, transaction_rows=chunk_rows) as loader:
+        encoder = IdEncoder(loader.conn, encode) if encode else None
+        for table, source in sources.items():
+            stream_csv(loader, source, table, dtypes[table], chunk_rows, resume=resume, on_progress=on_progress,
+                       spec=(schema or {}).get(table), encoder=encoder)
+        for table, spec in (derived or {}).items():
+            if spec["from"] in sources:
+                start = time.perf_counter()
+                loader.record(table, build_derived(loader, table, spec), time.perf_counter() - start)
+        loader.commit()
+        for index in indexes:
+            if index[1] in sources:
+                loader.add_index(*index)
+    return loader
+
+
+if __name__ == "__main__":
+    import tempfile
+    import tracemalloc
+    from sample_data import write_olist_csvs
+    from datasets import OLIST_DTYPES
+
+    with tempfile.TemporaryDirectory() as workdir:
+        write_olist_csvs(Path(workdir), orders=50_000)
+        source = Path(workdir) / "olist_order_items_dataset.csv"
+        db_path = Path(workdir) / "stream.db"
+
+        print("🌊 Streaming ingestion (interrupted after 30,000 rows, then resumed)")
+
+        def interrupt(table, rows, fraction):
+            if rows >= 30_000:
+                raise KeyboardInterrupt
+
+        try:
+            with BulkLoader(db_path, pragmas=RESUMABLE_PRAGMAS, transaction_rows=10_000) as loader:
+                stream_csv(loader, source, "order_items", OLIST_DTYPES["order_items"], chunk_rows=10_000,
+                           on_progress=interrupt)
+        except KeyboardInterrupt:
+            print(f"   interrupted: {load_progress(db_path)['order_items']}")
+
+        tracemalloc.start()
+        loader = ingest_dataset(db_path, {"order_items": source}, OLIST_DTYPES, chunk_rows=10_000)
+        peak = tracemalloc.get_traced_memory()[1]
+        print(f"   resumed: {loader.stats[0]}")
+        print(f"   progress: {load_progress(db_path)['order_items']}")
+        print(f"   peak Python memory: {peak / 1e6:.1f} MB")
@@ -0,0 +1,243 @@
+"""
+Background jobs for long-running questions and SQL
+Submitting returns a job id immediately; jobs run on a bounded worker pool,
+report progress from a SQLite progress handler (VM steps, rows fetched,
+elapsed time) and can be cancelled while queued, between pipeline stages or
+in the middle of query execution. Finished results are kept in a ResultStore
+so clients can poll and collect them later.
+"""
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from result_store import ResultStore
+
+# VM instructions between progress handler calls (also the cancellation latency)
+PROGRESS_INTERVAL = 20000
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's pipeline once it has been cancelled"""
+
+
+class JobManager:
+    """Bounded background execution of agent questions and raw SQL"""
+
+    def __init__(
+        self,
+        agent,
+        workers: int = 2,
+        max_finished: int = 200,
+        store: Optional[ResultStore] = None,
+        progress_interval: int = PROGRESS_INTERVAL
+    ):
+        """
+        Args:
+            agent: SQLAgentSystem used for questions (and its db_manager for SQL)
+            workers: Jobs running at once; the rest wait in the queue
+            max_finished: Finished jobs remembered before the oldest are dropped
+        """
+        self.agent = agent
+        self.store = store or ResultStore()
+        self.max_finished = max_finished
+        self.progress_interval = progress_interval
+
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _new_job(self, kind: str, **fields) -> Dict[str, Any]:
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "stage": "queued",
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": {"vm_steps": 0, "rows_fetched": 0},
+            "error": None,
+            "result": None,
+            "cancel": threading.Event(),
+            **fields,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._trim()
+        return job
+
+    def _trim(self):
+        finished = [jid for jid, job in self._jobs.items() if job["finished"] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            self._jobs.pop(job_id)
+            self.store.discard(job_id)
+
+    def submit_question(self, question: str, session_id: str = "default", chat_history: Optional[List[Dict]] = None) -> str:
+        """Run a natural-language question through the agent pipeline"""
+
+        job = self._new_job("question", question=question, session_id=session_id, chat_history=chat_history)
+        job["future"] = self._pool.submit(self._run, job, self._run_question)
+        return job["id"]
+
+    def submit_sql(self, sql: str) -> str:
+        """Run a SQL query (validated, read-only)"""
+
+        job = self._new_job("sql", sql=sql)
+        job["future"] = self._pool.submit(self._run, job, self._run_sql)
+        return job["id"]
+
+    def _progress_handler(self, job: Dict[str, Any]):
+        def handler() -> int:
+            job["progress"]["vm_steps"] += self.progress_interval
+            # Non-zero aborts the statement with "interrupted"
+            return 1 if job["cancel"].is_set() else 0
+        return handler
+
+    def _on_event(self, job: Dict[str, Any]):
+        def on_event(event: str, data: Dict[str, Any]):
+            if job["cancel"].is_set():
+                raise JobCancelled()
+            if event == "status":
+                job["stage"] = data["stage"]
+            elif event == "sql":
+                job["stage"] = "executing"
+                job["sql"] = data["sql"]
+            elif event == "page":
+                job["progress"]["rows_fetched"] = data["offset"] + len(data["data"])
+        return on_event
+
+    def _run(self, job: Dict[str, Any], runner):
+        try:
+            # Cancelled after a worker picked it up but before it started:
+            # still finishes as cancelled below
+            if job["cancel"].is_set():
+                raise JobCancelled()
+
+            job["status"] = "running"
+            job["started"] = time.time()
+            result = runner(job)
+            if job["cancel"].is_set():
+                job["status"] = "cancelled"
+            elif result["metadata"].get("error"):
+                job["status"] = "failed"
+                job["error"] = result["metadata"]["error"]
+            else:
+                job["status"] = "done"
+
+            if job["status"] != "cancelled":
+                if result.get("data") is not None:
+                    self.store.put(result["data"], job["id"])
+                # Keep everything but the DataFrame in the job record
+                job["result"] = {**result, "data": None}
+        except Exception as e:
+            job["status"] = "cancelled" if job["cancel"].is_set() else "failed"
+            job["error"] = None if job["status"] == "cancelled" else str(e)
+        finally:
+            job["stage"] = job["status"]
+            job["finished"] = time.time()
+            with self._lock:
+                self._trim()
+
+    def _run_question(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        job["stage"] = "thinking"
+        return self.agent.process_user_query(
+            job["question"],
+            session_id=job["session_id"],
+            chat_history=job["chat_history"],
+            on_event=self._on_event(job),
+            progress_handler=self._progress_handler(job),
+            progress_interval=self.progress_interval
+        )
+
+    def _run_sql(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        job["stage"] = "executing"
+        on_event = self._on_event(job)
+        success, data, metadata = self.agent.db_manager.execute_query(
+            job["sql"],
+            read_only=True,
+            on_page=lambda page: on_event("page", {"data": page, "offset": job["progress"]["rows_fetched"]}),
+            progress_handler=self._progress_handler(job),
+            progress_interval=self.progress_interval
+        )
+        error = None if success else metadata["execution"].get("error", "Unknown error")
+        return {
+            "response": "" if success else f"I encountered an error: {error}",
+            "data": data,
+            "visualization": {"type": "table"},
+            "metadata": {"sql_query": job["sql"], "query_success": success, "error": error},
+        }
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if unknown or already finished"""
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job["finished"] is not None:
+            return False
+
+        job["cancel"].set()
+        if job.get("future") is not None and job["future"].cancel():
+            # Never started
+            job["status"] = job["stage"] = "cancelled"
+            job["finished"] = time.time()
+        return True
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state and progress (without the result data)"""
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        end = job["finished"] or time.time()
+        return {
+            "id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "question": job.get("question"),
+            "sql": job.get("sql"),
+            "error": job["error"],
+            "progress": {
+                **job["progress"],
+                "elapsed_ms": round((end - job["started"]) * 1000, 1) if job["started"] else 0.0,
+            },
+        }
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Finished job's result, with its DataFrame loaded back from the store"""
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job["result"] is None:
+            return None
+        return {**job["result"], "data": self.store.get(job_id)}
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            job_ids = list(self._jobs)
+        return [self.status(job_id) for job_id in job_ids]
+
+
+if __name__ == "__main__":
+    import sys
+    from agents import SQLAgentSystem
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "data/ecommerce.db"
+    jobs = JobManager(SQLAgentSystem(db_path, model="replay"))
+
+    print("⏳ Testing background jobs\n")
+    quick = jobs.submit_sql("SELECT order_status, COUNT(*) AS orders FROM orders GROUP BY order_status")
+    slow = jobs.submit_sql("SELECT COUNT(*) FROM order_items a, order_items b, order_items c")
+
+    time.sleep(1.0)
+    print(f"quick: {jobs.status(quick)['status']}, {len(jobs.result(quick)['data'])} rows")
+    print(f"slow:  {jobs.status(slow)['status']} — {jobs.status(slow)['progress']}")
+
+    jobs.cancel(slow)
+    time.sleep(0.2)
+    print(f"slow after cancel: {jobs.status(slow)['status']} — {jobs.status(slow)['progress']}")
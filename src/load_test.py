@@ -0,0 +1,178 @@
+"""
+Load test for the HTTP API
+By default starts an in-process server on a copy of the database with the
+replay LLM backend, so it measures server overhead and concurrency rather
+than a real provider:
+
+    python src/load_test.py --db data/ecommerce.db --clients 16 --requests 800
+    python src/load_test.py --url http://localhost:8000 --clients 8 --duration 30
+
+Each client keeps one keep-alive connection and reports requests per second
+and p50/p95/p99 latency.
+"""
+import os
+import sys
+import json
+import time
+import gzip
+import argparse
+import tempfile
+import threading
+import http.client
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from benchmark import DEFAULT_DB, replay_model, fresh_db
+
+QUESTIONS = [
+    "How many orders are there?",
+    "Count orders by status",
+    "How many customers are there?",
+    "Total payment value by payment type",
+]
+
+REPLAY_RULES = [
+    {"agent": "sql", "match": "How many orders", "response": "SELECT COUNT(*) AS orders FROM orders"},
+    {"agent": "sql", "match": "orders by status",
+     "response": "SELECT order_status, COUNT(*) AS orders FROM orders GROUP BY order_status"},
+    {"agent": "sql", "match": "How many customers", "response": "SELECT COUNT(*) AS customers FROM customers"},
+    {"agent": "sql", "match": "payment value",
+     "response": "SELECT payment_type, SUM(payment_value) AS total FROM order_payments GROUP BY payment_type"},
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_client(url: str, client_id: int, deadline: float, budget: Dict[str, int], lock: threading.Lock,
+               latencies: List[float], statuses: Counter):
+    """One keep-alive connection issuing requests until the budget or deadline runs out"""
+
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+    i = 0
+
+    while time.perf_counter() < deadline:
+        with lock:
+            if budget["remaining"] <= 0:
+                break
+            budget["remaining"] -= 1
+
+        body = json.dumps({"query": QUESTIONS[(client_id + i) % len(QUESTIONS)], "session_id": f"load-{client_id}"})
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/api/query", body=body, headers={
+                "Content-Type": "application/json", "Accept-Encoding": "gzip"
+            })
+            response = conn.getresponse()
+            payload = response.read()
+            if response.getheader("Content-Encoding") == "gzip":
+                payload = gzip.decompress(payload)
+            status = response.status
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = "connection_error"
+            conn.close()
+
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    conn.close()
+
+
+def load_test(url: str, clients: int, requests: Optional[int], duration: Optional[float]) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    budget = {"remaining": requests if requests else float("inf")}
+    deadline = time.perf_counter() + (duration if duration else 3600)
+
+    threads = [
+        threading.Thread(target=run_client, args=(url, i, deadline, budget, lock, latencies, statuses))
+        for i in range(clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": sum(statuses.values()),
+        "seconds": elapsed,
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else 0.0,
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the SQL AI Agent HTTP API")
+    parser.add_argument("--url", help="Existing server to test (default: start one with the replay backend)")
+    parser.add_argument("--db", default=str(DEFAULT_DB))
+    parser.add_argument("--latency-ms", type=float, default=50, help="Simulated LLM latency per call (replay)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a request count")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    requests = None if args.duration else args.requests
+
+    if args.url:
+        report = load_test(args.url, args.clients, requests, args.duration)
+    else:
+        from api_server import create_server
+
+        os.environ["REPLAY_LATENCY_MS"] = str(args.latency_ms)
+        with tempfile.TemporaryDirectory() as workdir:
+            server = create_server(
+                fresh_db(args.db, workdir, "load_test"), port=0,
+                model=replay_model(REPLAY_RULES, workdir), workers=args.workers, backlog=args.clients
+            )
+            server.agent.warm_up(background=False)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+
+            try:
+                report = load_test(f"http://127.0.0.1:{server.server_address[1]}", args.clients, requests, args.duration)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+        report.update({"backend": "replay", "llm_latency_ms": args.latency_ms, "workers": args.workers})
+
+    print(f"\n⚡ API load test ({report['clients']} clients, {report['requests']} requests)")
+    print("=" * 60)
+    print(f"Throughput:  {report['requests_per_sec']:.1f} req/s")
+    print(f"Latency:     p50 {report['p50_ms']:.0f} ms · p95 {report['p95_ms']:.0f} ms · "
+          f"p99 {report['p99_ms']:.0f} ms · max {report['max_ms']:.0f} ms")
+    print(f"Statuses:    {report['statuses']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to: {args.json}")
+
+    return 0 if set(report["statuses"]) <= {"200"} else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
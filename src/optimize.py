@@ -0,0 +1,240 @@
+"""
+Post-load physical optimization
+A freshly loaded database has no planner statistics and keeps whatever page
+size and free pages the load left behind. optimize_database() checks the
+file's integrity, runs ANALYZE so the planner picks indexes and join orders
+from real row counts, and can rebuild the file with VACUUM INTO (compacted,
+optionally with a different page size). A standard query set is timed
+before and after, and the timings are kept in `_optimize_log`.
+
+    python src/optimize.py data/ecommerce.db
+    python src/optimize.py data/instacart.db --page-size 8192
+"""
+import os
+import time
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from datasets import DATASETS
+
+OPTIMIZE_LOG = "_optimize_log"
+REPEAT = 3        # runs per query; the best one counts
+
+
+def check_integrity(conn: sqlite3.Connection, full: bool = False) -> List[str]:
+    """
+    Problems found by PRAGMA quick_check (or the slower integrity_check,
+    which also verifies every index against its table); [] when healthy
+    """
+
+    rows = [row[0] for row in conn.execute("PRAGMA integrity_check" if full else "PRAGMA quick_check")]
+    return [] if rows == ["ok"] else rows
+
+
+def detect_dataset(conn: sqlite3.Connection) -> Optional[str]:
+    """The dataset (see datasets.py) whose tables the database holds"""
+
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    matches = {name: len(tables & set(spec["tables"].values())) for name, spec in DATASETS.items()}
+    best = max(matches, key=matches.get)
+    return best if matches[best] else None
+
+
+def time_queries(conn: sqlite3.Connection, queries: Dict[str, str], repeat: int = REPEAT) -> Dict[str, Optional[float]]:
+    """
+    Best-of-`repeat` milliseconds per query; None for queries the database
+    can't answer (e.g. a table a partial load doesn't have)
+    """
+
+    timings = {}
+    for label, sql in queries.items():
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            try:
+                conn.execute(sql).fetchall()
+            except sqlite3.OperationalError:
+                break
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings[label] = best
+    return timings
+
+
+def rebuild(db_path: Union[str, Path], page_size: Optional[int] = None) -> float:
+    """
+    Rewrite the database with VACUUM INTO, compacted and with `page_size`,
+    and swap it in; returns seconds taken. The old file is held under an
+    exclusive lock throughout, so this refuses (sqlite3.OperationalError)
+    while any other connection has it open: a swapped file would strand
+    them, and a WAL database's -wal/-shm would no longer match it. A WAL
+    database is checkpointed into the file first and put back in WAL after.
+    """
+
+    start = time.perf_counter()
+    db_path = Path(db_path)
+    target = db_path.with_name(db_path.name + ".optimizing")
+    target.unlink(missing_ok=True)
+
+    conn = sqlite3.connect(str(db_path), timeout=0, isolation_level=None)
+    try:
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        # Kept until the connection closes; fails if anything else has the file open
+        conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+        try:
+            conn.execute("BEGIN EXCLUSIVE")
+            conn.execute("COMMIT")
+        except sqlite3.OperationalError:
+            raise sqlite3.OperationalError(f"{db_path} is open elsewhere; stop the app before rebuilding it") from None
+        if journal_mode == "wal":
+            # Every committed page into the database file, leaving an empty WAL
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            if busy:
+                raise sqlite3.OperationalError(f"could not checkpoint {db_path}; not rebuilding")
+        if page_size:
+            # VACUUM INTO writes the copy with the connection's pending page size
+            conn.execute(f"PRAGMA page_size = {int(page_size)}")
+        conn.execute("VACUUM INTO ?", (str(target),))
+        os.replace(target, db_path)
+    finally:
+        conn.close()
+        target.unlink(missing_ok=True)
+
+    if journal_mode == "wal":
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+    return time.perf_counter() - start
+
+
+def _record(conn: sqlite3.Connection, run_at: str, before: Dict[str, Optional[float]],
+            after: Dict[str, Optional[float]], page_size: int, size_bytes: int):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {OPTIMIZE_LOG} (
+            run_at DATETIME NOT NULL,
+            query TEXT NOT NULL,
+            before_ms REAL,
+            after_ms REAL,
+            page_size INTEGER,
+            size_bytes INTEGER
+        )
+    """)
+    conn.executemany(
+        f"INSERT INTO {OPTIMIZE_LOG} (run_at, query, before_ms, after_ms, page_size, size_bytes) "
+        f"VALUES (?, ?, ?, ?, ?, ?)",
+        [(run_at, label, before[label], after[label], page_size, size_bytes) for label in before]
+    )
+    conn.commit()
+
+
+def optimize_database(
+    db_path: Union[str, Path],
+    queries: Optional[Dict[str, str]] = None,
+    vacuum: bool = False,
+    page_size: Optional[int] = None,
+    analysis_limit: Optional[int] = None,
+    full_check: bool = False,
+    repeat: int = REPEAT
+) -> Dict[str, Any]:
+    """
+    Check, analyze and optionally rebuild a loaded database
+
+    Args:
+        queries: Label -> SQL timed before and after (default: the standard
+            set of the dataset the database holds, see datasets.py)
+        vacuum: Rebuild the file compacted with VACUUM INTO
+        page_size: Rebuild with this page size (implies vacuum)
+        analysis_limit: Rows ANALYZE samples per index (approximate, faster
+            on very large tables); None analyzes everything
+        full_check: PRAGMA integrity_check instead of quick_check
+
+    Raises sqlite3.DatabaseError if the integrity check fails; nothing is
+    changed in that case.
+    """
+
+    db_path = Path(db_path)
+    run_at = datetime.now().isoformat(timespec="seconds")
+    conn = sqlite3.connect(str(db_path))
+    try:
+        problems = check_integrity(conn, full_check)
+        if problems:
+            raise sqlite3.DatabaseError(f"{db_path} failed its integrity check: {'; '.join(problems[:5])}")
+
+        if queries is None:
+            dataset = detect_dataset(conn)
+            queries = DATASETS[dataset]["queries"] if dataset else {}
+        size_before = db_path.stat().st_size
+        page_before = conn.execute("PRAGMA page_size").fetchone()[0]
+        before = time_queries(conn, queries, repeat)
+
+        start = time.perf_counter()
+        if analysis_limit:
+            conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        conn.execute("ANALYZE")
+        conn.commit()
+        analyze_seconds = time.perf_counter() - start
+    finally:
+        conn.close()
+
+    vacuum_seconds = rebuild(db_path, page_size) if vacuum or page_size else 0.0
+
+    # A new connection plans with the fresh statistics and page size
+    conn = sqlite3.connect(str(db_path))
+    try:
+        page_after = conn.execute("PRAGMA page_size").fetchone()[0]
+        after = time_queries(conn, queries, repeat)
+        size_after = db_path.stat().st_size
+        _record(conn, run_at, before, after, page_after, size_after)
+    finally:
+        conn.close()
+
+    return {
+        "db": str(db_path),
+        "integrity": "ok",
+        "analyze_seconds": analyze_seconds,
+        "vacuum_seconds": vacuum_seconds,
+        "page_size": f"{page_before} → {page_after}",
+        "size_mb": f"{size_before / 1e6:.1f} → {size_after / 1e6:.1f}",
+        "before_ms": sum(t for t in before.values() if t is not None),
+        "after_ms": sum(after[label] for label, t in before.items() if t is not None and after[label] is not None),
+        "queries": {label: (before[label], after[label]) for label in queries},
+    }
+
+
+def print_optimize_report(report: Dict[str, Any]):
+    """One summary line plus a line per timed query"""
+
+    print(f"🔧 Optimized {report['db']}: integrity {report['integrity']}, ANALYZE {report['analyze_seconds']:.2f}s"
+          + (f", VACUUM INTO {report['vacuum_seconds']:.2f}s" if report["vacuum_seconds"] else "")
+          + f", page size {report['page_size']}, {report['size_mb']} MB")
+    for label, (before, after) in report["queries"].items():
+        if before is None or after is None:
+            print(f"   {label}: skipped (not answerable in this database)")
+        else:
+            print(f"   {label}: {before:.1f} ms → {after:.1f} ms")
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ANALYZE, integrity-check and optionally rebuild a SQLite database")
+    parser.add_argument("db", help="Database to optimize")
+    parser.add_argument("--dataset", choices=sorted(DATASETS), help="Standard query set (default: detected)")
+    parser.add_argument("--vacuum", action="store_true", help="Rebuild the file compacted with VACUUM INTO")
+    parser.add_argument("--page-size", type=int, help="Rebuild with this page size, e.g. 8192 (implies --vacuum)")
+    parser.add_argument("--analysis-limit", type=int, help="Approximate ANALYZE: rows sampled per index")
+    parser.add_argument("--full-check", action="store_true", help="integrity_check instead of quick_check")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="Runs per timed query (best counts)")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = optimize_database(args.db, DATASETS[args.dataset]["queries"] if args.dataset else None,
+                               vacuum=args.vacuum, page_size=args.page_size, analysis_limit=args.analysis_limit,
+                               full_check=args.full_check, repeat=args.repeat)
+    print_optimize_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,240 @@
+"""
+Parallel CSV ingestion with a single writer
+A process pool parses sources — big plain files split into newline-aligned
+byte ranges, zip members and gzip files streamed whole — into typed
+DataFrame batches and hands them to the calling process through a bounded
+queue. That process is the only SQLite writer, so parsing
+scales with cores while inserts stay in one connection and one transaction
+stream. When the writer falls behind, the full queue blocks the parsers
+(back-pressure) and memory stays bounded.
+"""
+import io
+import os
+import time
+import queue
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from bulk_load import BulkLoader, RESUMABLE_PRAGMAS, frame_rows
+from datasets import MULTILINE_TABLES
+from sources import as_source
+from ingest import CHUNK_ROWS, PROGRESS_TABLE, IdEncoder, _ensure_progress_table, create_table, print_progress
+
+SPLIT_BYTES = 32 * 1024 * 1024     # byte range per parse task
+QUEUE_BATCHES = 8                  # parsed batches waiting for the writer
+
+_queue = None
+
+
+def _init_worker(batches):
+    global _queue
+    _queue = batches
+
+
+def plan_units(sources: Dict[str, Any], split_bytes: int = SPLIT_BYTES,
+               multiline: Collection[str] = MULTILINE_TABLES) -> List[Tuple]:
+    """
+    Split sources into (unit_id, table, source, start, end) parse tasks,
+    largest first so the long tasks start early. Compressed sources and
+    tables whose text fields may contain quoted newlines are never split.
+    """
+
+    units = []
+    for table, source in sources.items():
+        source = as_source(source)
+        size = source.size
+        step = max(size, 1) if table in multiline or not source.splittable else max(split_bytes, 1)
+        for start in range(0, max(size, 1), step):
+            units.append((table, source, start, min(start + step, size)))
+
+    units.sort(key=lambda unit: unit[3] - unit[2], reverse=True)
+    return [(i, *unit) for i, unit in enumerate(units)]
+
+
+def read_range(path: str, start: int, end: int) -> bytes:
+    """
+    CSV text for the lines that start inside [start, end), with the header
+    prepended for ranges after the first
+    """
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        if start == 0:
+            f.seek(0)
+        else:
+            # The line straddling `start` belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+            start = f.tell()
+        if start >= end and start > 0:
+            return header
+
+        data = f.read(max(0, end - f.tell()))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()
+    return data if start == 0 else header + data
+
+
+def _parse_unit(unit: Tuple, dtypes: Dict[str, str], chunk_rows: int) -> int:
+    """Parse one range and queue its batches; runs in a worker process"""
+
+    unit_id, table, source, start, end = unit
+    columns = list(dtypes)
+    rows = 0
+    if start == 0 and end >= source.size:
+        # A whole source is streamed, never held in memory
+        handle = source.open()
+    else:
+        text = read_range(source.path, start, end)
+        if not text.strip():
+            _queue.put((unit_id, table, None))
+            return 0
+        handle = io.BytesIO(text)
+    with handle:
+        for chunk in pd.read_csv(handle, dtype=dtypes, usecols=columns, chunksize=chunk_rows):
+            # Blocks while the writer is behind
+            _queue.put((unit_id, table, chunk[columns]))
+            rows += len(chunk)
+    _queue.put((unit_id, table, None))
+    return rows
+
+
+def parallel_ingest(
+    db_path: Union[str, Path],
+    sources: Dict[str, Any],
+    dtypes: Dict[str, Dict[str, str]],
+    indexes: Sequence = (),
+    workers: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+    split_bytes: int = SPLIT_BYTES,
+    queue_batches: int = QUEUE_BATCHES,
+    resume: bool = True,
+    on_progress=print_progress,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    encode: Optional[Dict[str, str]] = None,
+    multiline: Collection[str] = MULTILINE_TABLES,
+    restore: Optional[List[Tuple[str, Any]]] = None
+) -> BulkLoader:
+    """
+    Load several CSVs with parallel parsing and a single writer
+
+    Resume works per table: tables recorded as complete are skipped, any
+    other table is reloaded from scratch (byte ranges finish out of order,
+    so a row count can't mark a resume point). Id encoding happens in the
+    writer, so every table sees one consistent dictionary.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    batches = mp.get_context("spawn").Queue(maxsize=queue_batches)
+
+    with BulkLoader(db_path, pragmas=RESUMABLE_PRAGMAS, restore=restore, transaction_rows=chunk_rows) as loader:
+        conn = loader.conn
+        _ensure_progress_table(conn)
+        encoder = IdEncoder(conn, encode) if encode else None
+
+        pending = {}
+        for table, source in sources.items():
+            source = as_source(source)
+            done = conn.execute(
+                f"SELECT complete FROM {PROGRESS_TABLE} WHERE table_name = ? AND source = ? AND source_bytes = ?",
+                (table, source.name, source.size)
+            ).fetchone() if resume else None
+            if done and done[0]:
+                entry = loader.record(table, 0, 0.0)
+                entry["skipped"] = True
+                continue
+
+            create_table(loader, table, dtypes[table], (schema or {}).get(table))
+            conn.execute(
+                f"INSERT OR REPLACE INTO {PROGRESS_TABLE} (table_name, source, source_bytes, rows_loaded, complete) "
+                f"VALUES (?, ?, ?, 0, 0)",
+                (table, source.name, source.size)
+            )
+            pending[table] = source
+        loader.commit()
+
+        units = plan_units(pending, split_bytes, multiline)
+        remaining = {table: sum(1 for unit in units if unit[1] == table) for table in pending}
+        rows = {table: 0 for table in pending}
+        started = {table: time.perf_counter() for table in pending}
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(batches,)) as pool:
+            futures = [pool.submit(_parse_unit, unit, dtypes[unit[1]], chunk_rows) for unit in units]
+            try:
+                while any(remaining.values()):
+                    try:
+                        unit_id, table, chunk = batches.get(timeout=1.0)
+                    except queue.Empty:
+                        # Surface parser crashes instead of waiting forever
+                        for future in futures:
+                            if future.done() and future.exception():
+                                raise future.exception()
+                        continue
+
+                    if chunk is None:
+                        remaining[table] -= 1
+                        if remaining[table] == 0:
+                            conn.execute(f"UPDATE {PROGRESS_TABLE} SET complete = 1 WHERE table_name = ?", (table,))
+                            loader.commit()
+                            loader.record(table, rows[table], time.perf_counter() - started[table])
+                        continue
+
+                    if encoder is not None:
+                        chunk = encoder.encode(chunk)
+                    rows[table] += loader.insert_rows(table, list(chunk.columns), frame_rows(chunk), commit=False)
+                    conn.execute(f"UPDATE {PROGRESS_TABLE} SET rows_loaded = ? WHERE table_name = ?",
+                                 (rows[table], table))
+                    loader.maybe_commit()
+                    if on_progress:
+                        on_progress(table, rows[table], None)
+            except BaseException:
+                # Parsers blocked on the full queue would keep the pool from shutting down
+                for future in futures:
+                    future.cancel()
+                while not all(future.done() for future in futures):
+                    try:
+                        batches.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+                raise
+
+        if on_progress:
+            print()
+        for index in indexes:
+            if index[1] in sources:
+                loader.add_index(*index)
+
+    return loader
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import zipfile
+    from datasets import INSTACART_TABLES, INSTACART_DTYPES, INSTACART_INDEXES
+    from ingest import ingest_dataset
+    from sample_data import write_instacart_zip
+
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as workdir:
+        write_instacart_zip(Path(workdir) / "instacart.zip", orders)
+        with zipfile.ZipFile(Path(workdir) / "instacart.zip") as z:
+            z.extractall(workdir)
+        sources = {table: Path(workdir) / name for name, table in INSTACART_TABLES.items()}
+
+        start = time.perf_counter()
+        ingest_dataset(Path(workdir) / "sequential.db", sources, INSTACART_DTYPES, INSTACART_INDEXES, on_progress=None)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel_ingest(Path(workdir) / "parallel.db", sources, INSTACART_DTYPES, INSTACART_INDEXES,
+                        split_bytes=8 * 1024 * 1024, on_progress=None)
+        parallel = time.perf_counter() - start
+
+        print(f"⚡ {os.cpu_count()} cores: sequential {sequential:.2f}s, parallel {parallel:.2f}s "
+              f"({sequential / parallel:.2f}x)")
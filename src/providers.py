@@ -0,0 +1,252 @@
+"""
+Lazy LLM provider registry
+Each backend SDK is imported only when a model that needs it is first used,
+so importing the agent system does not pay for every installed provider.
+"""
+import os
+import json
+import time
+import importlib
+import importlib.util
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_ENV_LOADED = False
+
+
+def load_env():
+    """Load the .env file once, on first use"""
+    global _ENV_LOADED
+
+    if _ENV_LOADED:
+        return
+
+    _ENV_LOADED = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+class ReplayMessage:
+    """Minimal stand-in for a LangChain message (only .content is used)"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class ReplayChatModel:
+    """
+    Local offline chat model for benchmarks, load tests and fake backends
+
+    Responses come from an optional JSON file of {"match": ..., "response": ...,
+    "agent": "main"|"sql"} rules (substring match on the final paragraph of the
+    last user message, optionally restricted to one agent). Without a matching rule
+    the main agent gets a needs_query=true answer and the SQL agent a trivial
+    catalog query, which is enough to exercise the full pipeline.
+    """
+
+    DEFAULT_SQL = "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+
+    def __init__(
+        self,
+        rules: Optional[List[Dict[str, str]]] = None,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.rules = rules or []
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._seed = seed
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayChatModel":
+        with open(path) as f:
+            return cls(rules=json.load(f), **kwargs)
+
+    def _should_fail(self) -> bool:
+        if self.failure_rate <= 0:
+            return False
+        # Deterministic pseudo-random sequence so runs are reproducible
+        self._seed = (self._seed * 1103515245 + 12345) % (2 ** 31)
+        return (self._seed / 2 ** 31) < self.failure_rate
+
+    def _match(self, agent: str, request: str) -> Optional[str]:
+        for rule in self.rules:
+            if rule.get("agent", agent) == agent and rule.get("match", "") in request:
+                return rule["response"]
+        return None
+
+    def invoke(self, messages: List[Dict[str, str]]) -> ReplayMessage:
+        self.calls += 1
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self._should_fail():
+            raise RuntimeError("Replay backend: simulated provider failure")
+
+        return ReplayMessage(self._respond(messages))
+
+    def stream(self, messages: List[Dict[str, str]], chunk_chars: int = 12) -> Iterator[ReplayMessage]:
+        """Yield the response in small chunks; a fifth of the latency passes before the first"""
+
+        self.calls += 1
+
+        if self._should_fail():
+            raise RuntimeError("Replay backend: simulated provider failure")
+
+        content = self._respond(messages)
+        chunks = [content[i:i + chunk_chars] for i in range(0, len(content), chunk_chars)] or [""]
+
+        if self.latency:
+            time.sleep(self.latency * 0.2)
+        for chunk in chunks:
+            yield ReplayMessage(chunk)
+            if self.latency:
+                time.sleep(self.latency * 0.8 / len(chunks))
+
+    def _respond(self, messages: List[Dict[str, str]]) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        agent = "main" if "RESPONSE FORMAT" in system else "sql"
+        # Match only the request itself, not the schema context or examples before it
+        request = user.rsplit("\n\n", 1)[-1]
+
+        if agent == "sql" and "JSON array" in user:
+            # Packed SQL generation: answer each numbered request in turn
+            requests = [line.split(". ", 1)[1] for line in request.splitlines() if line[:1].isdigit() and ". " in line]
+            return json.dumps([self._match(agent, r) or self.DEFAULT_SQL for r in requests])
+
+        matched = self._match(agent, request)
+        if matched is not None:
+            return matched
+
+        if agent == "main":
+            question = user.strip()
+            return json.dumps({
+                "response": "Here is what I found.",
+                "needs_query": True,
+                "enhanced_query": question,
+                "visualization": {"type": "table"}
+            })
+
+        return self.DEFAULT_SQL
+
+
+def _langchain_factory(module: str, class_name: str, model_kwarg: str) -> Callable:
+    """Build a factory that imports a LangChain chat class on first call"""
+
+    def factory(model: str, api_key: Optional[str], temperature: float) -> Any:
+        chat_class = getattr(importlib.import_module(module), class_name)
+        return chat_class(**{model_kwarg: model}, temperature=temperature, api_key=api_key)
+
+    return factory
+
+
+def _replay_factory(model: str, api_key: Optional[str], temperature: float) -> Any:
+    # "replay" or "replay:<rules.json>"
+    latency = float(os.getenv("REPLAY_LATENCY_MS", "0")) / 1000
+    if ":" in model:
+        return ReplayChatModel.from_file(model.split(":", 1)[1], latency=latency)
+    return ReplayChatModel(latency=latency)
+
+
+# Provider name -> how to recognise, check and build it.
+# "module"/"package" are only used for availability checks and error messages.
+PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "openai": {
+        "matches": lambda model: model.startswith("gpt"),
+        "module": "langchain_openai",
+        "package": "langchain-openai",
+        "api_key_env": "OPENAI_API_KEY",
+        "factory": _langchain_factory("langchain_openai", "ChatOpenAI", "model"),
+    },
+    "anthropic": {
+        "matches": lambda model: model.startswith("claude"),
+        "module": "langchain_anthropic",
+        "package": "langchain-anthropic",
+        "api_key_env": "ANTHROPIC_API_KEY",
+        "factory": _langchain_factory("langchain_anthropic", "ChatAnthropic", "model"),
+    },
+    "groq": {
+        "matches": lambda model: "llama" in model or "mixtral" in model or "gemma" in model,
+        "module": "langchain_groq",
+        "package": "langchain-groq",
+        "api_key_env": "GROQ_API_KEY",
+        "factory": _langchain_factory("langchain_groq", "ChatGroq", "model_name"),
+    },
+    "replay": {
+        "matches": lambda model: model == "replay" or model.startswith("replay:"),
+        "module": None,
+        "package": None,
+        "api_key_env": None,
+        "factory": _replay_factory,
+    },
+}
+
+
+def register_provider(
+    name: str,
+    matches: Callable[[str], bool],
+    factory: Callable[[str, Optional[str], float], Any],
+    module: Optional[str] = None,
+    package: Optional[str] = None,
+    api_key_env: Optional[str] = None
+):
+    """Register an additional provider plugin (checked before the built-ins)"""
+
+    global PROVIDERS
+    PROVIDERS = {
+        name: {
+            "matches": matches,
+            "module": module,
+            "package": package,
+            "api_key_env": api_key_env,
+            "factory": factory,
+        },
+        **{k: v for k, v in PROVIDERS.items() if k != name},
+    }
+
+
+def resolve_provider(model: str) -> str:
+    """Return the provider name that serves a model"""
+
+    for name, provider in PROVIDERS.items():
+        if provider["matches"](model):
+            return name
+
+    raise ValueError(f"Unsupported model: {model}")
+
+
+def check_provider(model: str) -> str:
+    """
+    Validate that a model's backend is installed and configured, without
+    importing it. Raises the same errors the LLM factory would.
+    """
+
+    load_env()
+    name = resolve_provider(model)
+    provider = PROVIDERS[name]
+
+    if provider["module"] and importlib.util.find_spec(provider["module"]) is None:
+        raise ImportError(
+            f"{name.capitalize()} not available. Run: pip install {provider['package']}"
+        )
+
+    if provider["api_key_env"] and not os.getenv(provider["api_key_env"]):
+        raise ValueError(f"{provider['api_key_env']} not found in environment")
+
+    return name
+
+
+def create_llm(model: str, temperature: float = 0) -> Any:
+    """Import the model's backend (on first use) and build the chat model"""
+
+    name = check_provider(model)
+    provider = PROVIDERS[name]
+    api_key = os.getenv(provider["api_key_env"]) if provider["api_key_env"] else None
+
+    return provider["factory"](model, api_key, temperature)
@@ -0,0 +1,307 @@
+"""
+Incremental, change-detecting re-ingestion
+A manifest (`_ingest_manifest`) records each source's content fingerprint,
+size and row count. A refresh hashes the files again and only loads what
+changed: a file that grew by appended rows loads just its new tail, any
+other change reloads the whole table. Both go into hidden shadow tables
+first and are published together in one transaction (the reloaded table
+is swapped in, appended rows are copied over), so readers keep querying
+the old data until that commit and an interrupted refresh resumes.
+"""
+import time
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from bulk_load import BulkLoader, RESUMABLE_PRAGMAS, SERVING_PRAGMAS, _quote
+from datasets import MULTILINE_TABLES
+from ingest import (CHUNK_ROWS, PROGRESS_TABLE, IdEncoder, add_generated_columns, build_derived, print_progress,
+                    stream_csv)
+from parallel_ingest import parallel_ingest
+from sources import as_source
+
+MANIFEST_TABLE = "_ingest_manifest"
+SHADOW_PREFIX = "_shadow_"
+
+
+def _ensure_manifest(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            source TEXT,
+            content_hash TEXT NOT NULL,
+            source_bytes INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            loaded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def record_manifest(conn: sqlite3.Connection, table: str, source: str, content_hash: str, source_bytes: int,
+                    rows: int):
+    """Upsert a table's manifest row (inside the caller's transaction)"""
+
+    _ensure_manifest(conn)
+    conn.execute(
+        f"INSERT OR REPLACE INTO {MANIFEST_TABLE} (table_name, source, content_hash, source_bytes, rows) "
+        f"VALUES (?, ?, ?, ?, ?)",
+        (table, source, content_hash, source_bytes, rows)
+    )
+
+
+def load_manifest(db_path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """Recorded source state per table ({} for a new or pre-manifest database)"""
+
+    if not Path(db_path).exists():
+        return {}
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute(
+            f"SELECT table_name, source, content_hash, source_bytes, rows FROM {MANIFEST_TABLE}"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {
+        table: {"source": source, "content_hash": digest, "source_bytes": size, "rows": rows}
+        for table, source, digest, size, rows in rows
+    }
+
+
+def plan_refresh(db_path: Union[str, Path], sources: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Decide per table: "unchanged" (same content fingerprint), "append" (a
+    plain file whose old content is an exact prefix, ending on a line break)
+    or "reload" (anything else, including tables never loaded with a manifest)
+    """
+
+    manifest = load_manifest(db_path)
+    existing = set()
+    if Path(db_path).exists():
+        conn = sqlite3.connect(str(db_path))
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.close()
+
+    plan = {}
+    for table, source in sources.items():
+        source = as_source(source)
+        size = source.size
+        known = manifest.get(table) if table in existing else None
+        grown = known is not None and source.appendable and size > known["source_bytes"]
+        digest, prefix = source.fingerprint(known["source_bytes"] if grown else None)
+
+        action = "reload"
+        if known and digest == known["content_hash"]:
+            action = "unchanged"
+        elif grown and prefix == known["content_hash"]:
+            with open(source.path, "rb") as f:
+                f.seek(known["source_bytes"] - 1)
+                if f.read(1) == b"\n":
+                    action = "append"
+
+        plan[table] = {
+            "action": action,
+            "source": source,
+            "content_hash": digest,
+            "source_bytes": size,
+            "offset": known["source_bytes"] if action == "append" else 0,
+            "rows": known["rows"] if known else 0,
+        }
+    return plan
+
+
+def refresh_dataset(
+    db_path: Union[str, Path],
+    sources: Dict[str, Any],
+    dtypes: Dict[str, Dict[str, str]],
+    indexes=(),
+    chunk_rows: int = CHUNK_ROWS,
+    workers: int = 1,
+    on_progress=print_progress,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    encode: Optional[Dict[str, str]] = None,
+    derived: Optional[Dict[str, Dict[str, Any]]] = None
+) -> BulkLoader:
+    """
+    Bring the database up to date with `sources`, loading only what changed
+
+    Returns the loader whose stats hold one entry per source table with
+    "action" and "total_rows". workers > 1 parses reloaded files in
+    parallel processes; appended tails are always streamed. Derived tables
+    (see datasets.py) are rebuilt in the publish transaction when their
+    source table changed. The database is left in WAL mode so later
+    refreshes don't block readers.
+    """
+
+    plan = plan_refresh(db_path, sources)
+    schema = schema or {}
+    changed = {table: step for table, step in plan.items() if step["action"] != "unchanged"}
+    shadow = {table: SHADOW_PREFIX + table for table in changed}
+    loaded = {}
+
+    reloads = {table: step["source"] for table, step in changed.items() if step["action"] == "reload"}
+    if workers > 1 and reloads:
+        parsed = parallel_ingest(
+            db_path, {shadow[t]: source for t, source in reloads.items()}, {shadow[t]: dtypes[t] for t in reloads},
+            workers=workers, chunk_rows=chunk_rows, on_progress=on_progress,
+            schema={shadow[t]: schema[t] for t in reloads if t in schema}, encode=encode,
+            multiline={shadow[t] for t in reloads if t in MULTILINE_TABLES}, restore=SERVING_PRAGMAS
+        )
+        for entry in parsed.stats:
+            loaded[entry["table"][len(SHADOW_PREFIX):]] = entry
+
+    with BulkLoader(db_path, pragmas=RESUMABLE_PRAGMAS, restore=SERVING_PRAGMAS, transaction_rows=chunk_rows) as loader:
+        conn = loader.conn
+        _ensure_manifest(conn)
+        encoder = IdEncoder(conn, encode) if encode else None
+
+        for table, step in changed.items():
+            if table in loaded:
+                continue
+            if step["action"] == "append":
+                source = step["source"].open_tail(step["offset"])
+                total_bytes = source.size
+            else:
+                source, total_bytes = step["source"], None
+            try:
+                loaded[table] = stream_csv(loader, source, shadow[table], dtypes[table], chunk_rows,
+                                           total_bytes=total_bytes, on_progress=on_progress,
+                                           spec=schema.get(table), encoder=encoder)
+            finally:
+                if source is not step["source"]:
+                    source.close()
+
+        # Publish every change in one transaction
+        start = time.perf_counter()
+        loader.commit()
+        conn.execute("BEGIN")
+        for table, step in changed.items():
+            if step["action"] == "append":
+                columns = ", ".join(_quote(c) for c in dtypes[table])
+                conn.execute(f"INSERT INTO {_quote(table)} ({columns}) SELECT {columns} FROM {_quote(shadow[table])}")
+                conn.execute(f"DROP TABLE {_quote(shadow[table])}")
+            else:
+                conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+                conn.execute(f"ALTER TABLE {_quote(shadow[table])} RENAME TO {_quote(table)}")
+                for name, index_table, columns in indexes:
+                    if index_table == table:
+                        conn.execute(f"CREATE INDEX {_quote(name)} ON {_quote(table)} "
+                                     f"({', '.join(_quote(c) for c in columns)})")
+
+            entry = loaded[table]
+            rows = entry["rows"] + entry.get("resumed_from", 0)
+            step["loaded"] = rows
+            if step["action"] == "append":
+                rows += step["rows"]
+            record_manifest(conn, table, step["source"].name, step["content_hash"], step["source_bytes"], rows)
+            conn.execute(f"DELETE FROM {PROGRESS_TABLE} WHERE table_name = ?", (shadow[table],))
+            step["rows"] = rows
+
+        # Kept tables loaded before their schema declared generated columns get them, and their indexes, in place
+        for table, step in plan.items():
+            if step["action"] != "reload" and table in schema and add_generated_columns(conn, table, schema[table]):
+                for name, index_table, columns in indexes:
+                    if index_table == table:
+                        conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(table)} "
+                                     f"({', '.join(_quote(c) for c in columns)})")
+
+        existing = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for table, spec in (derived or {}).items():
+            if spec["from"] in sources and (spec["from"] in changed or table not in existing):
+                build_derived(loader, table, spec)
+        loader.commit()
+        publish = time.perf_counter() - start
+
+    loader.stats = []
+    for table, step in plan.items():
+        entry = loaded.get(table) or {"seconds": 0.0}
+        seconds = entry["seconds"]
+        rows = step.get("loaded", 0)
+        loader.stats.append({
+            "table": table,
+            "action": step["action"],
+            "rows": rows,
+            "total_rows": step["rows"],
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(rows / seconds) if seconds > 0 else 0,
+        })
+    loader.stats.append({"table": "(publish)", "rows": 0, "seconds": round(publish, 3), "rows_per_sec": 0})
+    return loader
+
+
+def publish_database(build_path: Union[str, Path], db_path: Union[str, Path], keep=("chat_history",)) -> float:
+    """
+    Publish a separately built database into `db_path` in place; returns
+    seconds taken. The build's tables and their indexes replace the live
+    ones in one transaction, so connections already open (a running app's
+    pools) keep working and see the new data after the commit, which
+    replacing the file can't promise. Tables in `keep`, and live tables the
+    build doesn't have, are left as they are.
+    """
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("ATTACH DATABASE ? AS build", (str(build_path),))
+        objects = conn.execute("""
+            SELECT type, name, tbl_name, sql FROM build.sqlite_master
+            WHERE type IN ('table', 'index') AND sql IS NOT NULL AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+            ORDER BY type DESC
+        """).fetchall()
+
+        conn.execute("BEGIN IMMEDIATE")
+        for kind, name, table, sql in objects:
+            if table in keep:
+                continue
+            if kind == "index":
+                conn.execute(sql)
+                continue
+            conn.execute(f"DROP TABLE IF EXISTS main.{_quote(name)}")
+            conn.execute(sql)
+            # Generated columns (hidden 2 or 3) are computed, not copied
+            columns = ", ".join(_quote(row[1]) for row in conn.execute(f"PRAGMA build.table_xinfo({_quote(name)})")
+                                if row[6] == 0)
+            conn.execute(f"INSERT INTO main.{_quote(name)} ({columns}) SELECT {columns} FROM build.{_quote(name)}")
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE build")
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    from datasets import OLIST_TABLES, OLIST_DTYPES, OLIST_SCHEMA, OLIST_ENCODED_IDS, OLIST_INDEXES, OLIST_DERIVED
+    from sample_data import write_olist_csvs
+
+    with tempfile.TemporaryDirectory() as workdir:
+        raw, fresh = Path(workdir) / "raw", Path(workdir) / "fresh"
+        write_olist_csvs(raw, orders=50_000)
+        write_olist_csvs(fresh, orders=60_000, seed=1)
+        sources = {table: raw / name for name, table in OLIST_TABLES.items()}
+        db_path = Path(workdir) / "olist.db"
+        options = dict(schema=OLIST_SCHEMA, encode=OLIST_ENCODED_IDS, derived=OLIST_DERIVED, on_progress=None)
+
+        def run(label):
+            start = time.perf_counter()
+            loader = refresh_dataset(db_path, sources, OLIST_DTYPES, OLIST_INDEXES, **options)
+            actions = {}
+            for entry in loader.stats[:-1]:
+                actions.setdefault(entry["action"], []).append(entry["table"])
+            print(f"🔄 {label}: {time.perf_counter() - start:.2f}s  {actions}")
+
+        run("initial load")
+        run("nothing changed")
+
+        # New rows appended to one file, another file replaced
+        with open(fresh / "olist_geolocation_dataset.csv", "rb") as f:
+            f.readline()
+            tail = f.read()
+        with open(sources["geolocation"], "ab") as f:
+            f.write(tail)
+        shutil.copy(fresh / "olist_sellers_dataset.csv", sources["sellers"])
+        run("one append, one change")
+        print(f"   manifest: {load_manifest(db_path)['geolocation']}")
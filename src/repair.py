@@ -0,0 +1,233 @@
+"""
+Local SQL repair - fixes common LLM mistakes without another LLM round trip
+Uses the schema snapshot to fuzzy-match unknown identifiers and rewrites
+non-SQLite dialect constructs (YEAR(), DATE_TRUNC, ILIKE, TOP N).
+"""
+import re
+import difflib
+import threading
+from typing import Dict, List, Optional, Tuple, Any
+
+NO_SUCH_TABLE = re.compile(r"no such table:\s*([\w.]+)", re.IGNORECASE)
+NO_SUCH_COLUMN = re.compile(r"no such column:\s*([\w.]+)", re.IGNORECASE)
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+# String literals and quoted identifiers, which identifier fixes leave alone
+QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])")
+
+DATE_TRUNC_FORMATS = {
+    "year": "%Y-01-01",
+    "month": "%Y-%m-01",
+    "day": "%Y-%m-%d",
+    "hour": "%Y-%m-%d %H:00:00",
+}
+
+DATE_PART_FORMATS = {
+    "YEAR": "%Y",
+    "MONTH": "%m",
+    "DAY": "%d",
+    "HOUR": "%H",
+}
+
+# Words that can follow a table name and must not be taken as its alias
+SQL_KEYWORDS = {
+    "where", "join", "left", "right", "inner", "outer", "cross", "on", "group",
+    "order", "limit", "having", "union", "using", "natural", "full", "as"
+}
+
+
+class SQLRepairer:
+    """Rule-based SQL repair against a known schema"""
+
+    def __init__(self, schema_info: Dict[str, Any], cutoff: float = 0.6):
+        self.cutoff = cutoff
+        self.tables = {
+            name: [col["name"] for col in info["columns"]]
+            for name, info in schema_info.get("tables", {}).items()
+        }
+        self.all_columns = sorted({col for cols in self.tables.values() for col in cols})
+
+        self.stats = {
+            "attempts": 0,
+            "local_repaired": 0,
+            "llm_repaired": 0,
+            "unrepaired": 0,
+            "local_repair_ms": 0.0,
+            "latency_saved_ms": 0.0,
+        }
+        self._stats_lock = threading.Lock()
+
+    def fix_dialect(self, sql: str) -> Tuple[str, List[str]]:
+        """Rewrite constructs from other SQL dialects into SQLite"""
+
+        fixes = []
+
+        def date_trunc(match):
+            unit = match.group(1).lower()
+            fmt = DATE_TRUNC_FORMATS.get(unit)
+            if not fmt:
+                return match.group(0)
+            fixes.append(f"DATE_TRUNC('{unit}') → strftime")
+            return f"strftime('{fmt}', {match.group(2).strip()})"
+
+        sql = re.sub(
+            r"\bDATE_TRUNC\s*\(\s*'(\w+)'\s*,\s*([^()]+(?:\([^()]*\))?[^()]*)\)",
+            date_trunc, sql, flags=re.IGNORECASE
+        )
+
+        def date_part(match):
+            part = match.group(1).upper()
+            fixes.append(f"{part}() → strftime")
+            return f"CAST(strftime('{DATE_PART_FORMATS[part]}', {match.group(2).strip()}) AS INTEGER)"
+
+        sql = re.sub(
+            r"\b(YEAR|MONTH|DAY|HOUR)\s*\(\s*([^()]+(?:\([^()]*\))?[^()]*)\)",
+            date_part, sql, flags=re.IGNORECASE
+        )
+
+        if re.search(r"\bILIKE\b", sql, re.IGNORECASE):
+            # SQLite LIKE is already case-insensitive for ASCII
+            sql = re.sub(r"\bILIKE\b", "LIKE", sql, flags=re.IGNORECASE)
+            fixes.append("ILIKE → LIKE")
+
+        top = re.match(r"^\s*SELECT\s+(DISTINCT\s+)?TOP\s*\(?\s*(\d+)\s*\)?\s+", sql, re.IGNORECASE)
+        if top:
+            sql = f"SELECT {top.group(1) or ''}" + sql[top.end():]
+            if not re.search(r"\bLIMIT\s+\d+", sql, re.IGNORECASE):
+                sql = sql.rstrip().rstrip(";") + f" LIMIT {top.group(2)}"
+            fixes.append("TOP N → LIMIT N")
+
+        if re.search(r"\bNOW\s*\(\s*\)", sql, re.IGNORECASE):
+            sql = re.sub(r"\bNOW\s*\(\s*\)", "datetime('now')", sql, flags=re.IGNORECASE)
+            fixes.append("NOW() → datetime('now')")
+
+        return sql, fixes
+
+    def _referenced_tables(self, sql: str) -> Dict[str, str]:
+        """Map alias (and table name) -> table for FROM/JOIN clauses"""
+
+        aliases = {}
+        for table, alias in TABLE_REFERENCE.findall(sql):
+            aliases[table.lower()] = table
+            if alias and alias.lower() not in SQL_KEYWORDS:
+                aliases[alias.lower()] = table
+        return aliases
+
+    def _sub_unquoted(self, pattern: str, replacement: str, sql: str) -> Tuple[str, int]:
+        """re.subn outside string literals and quoted identifiers (case-insensitive)"""
+
+        parts = QUOTED.split(sql)
+        total = 0
+        for i in range(0, len(parts), 2):
+            parts[i], count = re.subn(pattern, replacement, parts[i], flags=re.IGNORECASE)
+            total += count
+        return "".join(parts), total
+
+    def _closest(self, name: str, candidates: List[str]) -> Optional[str]:
+        lowered = {c.lower(): c for c in candidates}
+        match = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=self.cutoff)
+        return lowered[match[0]] if match else None
+
+    def fix_identifiers(self, sql: str, error: str) -> Tuple[str, List[str]]:
+        """Replace an unknown table or column named in the error with its closest match"""
+
+        table_error = NO_SUCH_TABLE.search(error)
+        if table_error:
+            bad = table_error.group(1).split(".")[-1]
+            good = self._closest(bad, list(self.tables))
+            if good and good != bad:
+                # Only table positions: after FROM/JOIN (optionally schema-qualified)
+                # and as a column qualifier, so keywords and columns sharing the
+                # name (ORDER BY, order_id) are untouched
+                name = re.escape(bad)
+                sql, count = self._sub_unquoted(rf"(\b(?:FROM|JOIN)\s+(?:\w+\.)?){name}\b", rf"\g<1>{good}", sql)
+                sql, qualified = self._sub_unquoted(rf"(?<![\w.]){name}(?=\.\w)", good, sql)
+                if count + qualified:
+                    return sql, [f"table {bad} → {good}"]
+            return sql, []
+
+        column_error = NO_SUCH_COLUMN.search(error)
+        if column_error:
+            qualified = column_error.group(1)
+            qualifier, _, bad = qualified.rpartition(".")
+            aliases = self._referenced_tables(sql)
+
+            if qualifier and aliases.get(qualifier.lower()) in self.tables:
+                candidates = self.tables[aliases[qualifier.lower()]]
+            else:
+                referenced = {t for t in aliases.values() if t in self.tables}
+                candidates = [c for t in referenced for c in self.tables[t]] or self.all_columns
+
+            good = self._closest(bad, candidates)
+            if good and good != bad:
+                # Column references only: not inside literals, not an alias
+                # being defined (AS name) and not a function call
+                pattern = (rf"(?<![\w.]){re.escape(qualifier)}\.{re.escape(bad)}\b" if qualifier
+                           else rf"(?<![\w.])(?<!\bAS\s){re.escape(bad)}\b(?!\s*\()")
+                replacement = f"{qualifier}.{good}" if qualifier else good
+                sql, count = self._sub_unquoted(pattern, replacement, sql)
+                if count:
+                    return sql, [f"column {qualified} → {replacement}"]
+
+        return sql, []
+
+    def repair(self, sql: str, error: str) -> Tuple[Optional[str], List[str]]:
+        """
+        Propose a repaired query for an execution error
+
+        Returns:
+            (repaired_sql or None if nothing could be fixed, list of fixes applied)
+        """
+
+        repaired, fixes = self.fix_dialect(sql)
+        if not fixes:
+            repaired, fixes = self.fix_identifiers(sql, error)
+
+        return (repaired, fixes) if fixes else (None, [])
+
+    def record(self, outcome: str, local_ms: float = 0.0, saved_ms: float = 0.0):
+        """Record a repair outcome: 'local', 'llm' or 'failed'"""
+
+        key = {"local": "local_repaired", "llm": "llm_repaired", "failed": "unrepaired"}[outcome]
+        with self._stats_lock:
+            self.stats["attempts"] += 1
+            self.stats[key] += 1
+            self.stats["local_repair_ms"] += local_ms
+            self.stats["latency_saved_ms"] += saved_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Repair hit rates and latency saved versus re-asking the LLM"""
+
+        with self._stats_lock:
+            stats = dict(self.stats)
+
+        attempts = stats["attempts"]
+        stats["local_hit_rate"] = f"{(stats['local_repaired']/attempts)*100:.1f}%" if attempts else "0%"
+        stats["overall_hit_rate"] = (
+            f"{((stats['local_repaired'] + stats['llm_repaired'])/attempts)*100:.1f}%" if attempts else "0%"
+        )
+        return stats
+
+
+if __name__ == "__main__":
+    schema = {"tables": {
+        "orders": {"columns": [{"name": "order_id"}, {"name": "order_purchase_timestamp"}]},
+        "customers": {"columns": [{"name": "customer_id"}, {"name": "customer_state"}]},
+    }}
+    repairer = SQLRepairer(schema)
+
+    cases = [
+        ("SELECT TOP 5 customer_state FROM customers", "near \"5\": syntax error"),
+        ("SELECT YEAR(o.order_purchase_timestamp) AS y FROM orders o", "no such function: YEAR"),
+        ("SELECT * FROM customers WHERE customer_state ILIKE 'sp'", "near \"ILIKE\": syntax error"),
+        ("SELECT c.customer_stat FROM customers c", "no such column: c.customer_stat"),
+        ("SELECT COUNT(*) FROM order", "no such table: order"),
+        ("SELECT COUNT(*) FROM order GROUP BY order_id ORDER BY 1", "no such table: order"),
+        ("SELECT customer_stat FROM customers WHERE customer_stat = 'customer_stat'", "no such column: customer_stat"),
+    ]
+
+    print("🔧 Testing SQL Repairer\n")
+    for sql, error in cases:
+        repaired, fixes = repairer.repair(sql, error)
+        print(f"Query:    {sql}")
+        print(f"Repaired: {repaired}")
+        print(f"Fixes:    {fixes}\n")
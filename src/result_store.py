@@ -0,0 +1,180 @@
+"""
+Memory-bounded result storage
+Keeps recent query results in memory under an LRU byte budget and spills
+older ones to compressed files on disk, keyed by result id, so long chat
+sessions don't grow without bound.
+"""
+import os
+import uuid
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+DEFAULT_BUDGET_MB = 64
+# Favour speed over ratio: spills happen on the request path
+SPILL_COMPRESSION = {"method": "gzip", "compresslevel": 1}
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """In-memory size of a DataFrame, including object/string payloads"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class ResultStore:
+    """LRU result cache with a byte budget and on-disk spill"""
+
+    def __init__(self, byte_budget: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        Args:
+            byte_budget: Bytes of DataFrames kept in memory (RESULT_STORE_MB env, default 64 MB)
+            spill_dir: Directory for spilled results (a private temp dir by default)
+        """
+        if byte_budget is None:
+            byte_budget = int(float(os.getenv("RESULT_STORE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024)
+
+        self.byte_budget = byte_budget
+        self.spill_dir = Path(spill_dir or tempfile.mkdtemp(prefix="sql-agent-results-"))
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+        self._memory: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self.memory_bytes = 0
+        self.stats = {"memory_hits": 0, "disk_loads": 0, "spills": 0, "misses": 0}
+        self._lock = threading.RLock()
+
+        # Remove our own temp dir when the store is garbage collected
+        if spill_dir is None:
+            self._finalizer = weakref.finalize(self, shutil.rmtree, str(self.spill_dir), True)
+
+    def _path(self, result_id: str) -> Path:
+        return self.spill_dir / f"{result_id}.pkl.gz"
+
+    def put(self, df: pd.DataFrame, result_id: Optional[str] = None) -> str:
+        """Store a result and return its id"""
+
+        result_id = result_id or uuid.uuid4().hex
+        size = frame_bytes(df)
+
+        with self._lock:
+            if result_id in self._memory:
+                self.memory_bytes -= self._meta[result_id]["bytes"]
+            self._memory[result_id] = df
+            self._memory.move_to_end(result_id)
+            self._meta[result_id] = {
+                "rows": len(df),
+                "columns": list(df.columns),
+                "bytes": size,
+                "spilled": False,
+            }
+            self.memory_bytes += size
+            self._evict()
+
+        return result_id
+
+    def _evict(self):
+        """Spill least recently used results until under budget (always keep the newest)"""
+
+        while self.memory_bytes > self.byte_budget and len(self._memory) > 1:
+            result_id, df = self._memory.popitem(last=False)
+            meta = self._meta[result_id]
+            if not meta["spilled"]:
+                df.to_pickle(self._path(result_id), compression=SPILL_COMPRESSION)
+                meta["spilled"] = True
+                meta["disk_bytes"] = self._path(result_id).stat().st_size
+                self.stats["spills"] += 1
+            self.memory_bytes -= meta["bytes"]
+
+    def get(self, result_id: str) -> Optional[pd.DataFrame]:
+        """Fetch a result, loading it back from disk if it was spilled"""
+
+        with self._lock:
+            if result_id in self._memory:
+                self._memory.move_to_end(result_id)
+                self.stats["memory_hits"] += 1
+                return self._memory[result_id]
+
+            meta = self._meta.get(result_id)
+            if meta is None or not meta["spilled"]:
+                self.stats["misses"] += 1
+                return None
+
+            df = pd.read_pickle(self._path(result_id), compression=SPILL_COMPRESSION)
+            self.stats["disk_loads"] += 1
+
+            # Re-admit as most recently used; its spill file stays valid
+            self._memory[result_id] = df
+            self.memory_bytes += meta["bytes"]
+            self._evict()
+            return df
+
+    def __contains__(self, result_id: str) -> bool:
+        return result_id in self._meta
+
+    def info(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Row count, columns, size and residency of a stored result"""
+
+        with self._lock:
+            meta = self._meta.get(result_id)
+            if meta is None:
+                return None
+            return {**meta, "in_memory": result_id in self._memory}
+
+    def discard(self, result_id: str):
+        """Forget a result and delete its spill file"""
+
+        with self._lock:
+            if result_id in self._memory:
+                self._memory.pop(result_id)
+                self.memory_bytes -= self._meta[result_id]["bytes"]
+            self._meta.pop(result_id, None)
+            self._path(result_id).unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            for result_id in list(self._meta):
+                self.discard(result_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "results": len(self._meta),
+                "in_memory": len(self._memory),
+                "memory_mb": self.memory_bytes / 1024 / 1024,
+                "budget_mb": self.byte_budget / 1024 / 1024,
+                "disk_mb": sum(m.get("disk_bytes", 0) for m in self._meta.values()) / 1024 / 1024,
+            }
+
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+
+    print("🗄️  Testing result store\n")
+
+    store = ResultStore(byte_budget=20 * 1024 * 1024)
+    rng = np.random.default_rng(0)
+    ids = []
+
+    for i in range(10):
+        df = pd.DataFrame({
+            "order_id": [f"order_{j}" for j in range(50_000)],
+            "price": rng.uniform(1, 500, 50_000).round(2),
+        })
+        ids.append(store.put(df))
+
+    stats = store.get_stats()
+    print(f"Stored {stats['results']} results: {stats['in_memory']} in memory "
+          f"({stats['memory_mb']:.1f}/{stats['budget_mb']:.0f} MB), {stats['spills']} spilled "
+          f"({stats['disk_mb']:.1f} MB on disk)")
+
+    start = time.perf_counter()
+    oldest = store.get(ids[0])
+    print(f"Loaded oldest result back from disk: {len(oldest):,} rows in {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(f"Stats: {store.get_stats()}")
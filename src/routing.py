@@ -0,0 +1,312 @@
+"""
+Latency-aware model routing across configured LLM backends
+Tracks rolling latency and error rate per model, opens a circuit breaker on
+repeated failures and can hedge slow requests to a second model once a
+latency-percentile deadline passes.
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional
+
+from providers import create_llm
+
+# Roles prefer a tier: the SQL agent wants cheap/fast, the conversational agent stronger
+ROLE_TIERS = {
+    "sql": "fast",
+    "chat": "strong",
+}
+
+FAST_MODEL_HINTS = ("mini", "haiku", "flash", "3.5", "8b", "instant", "mixtral", "gemma")
+
+
+def default_tier(model: str) -> str:
+    """Classify a model as 'fast' or 'strong' from its name"""
+    return "fast" if any(hint in model.lower() for hint in FAST_MODEL_HINTS) else "strong"
+
+
+class CircuitBreaker:
+    """
+    Closed → open after `failure_threshold` consecutive failures; after
+    `cooldown` seconds one trial request is let through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def force_trial(self) -> bool:
+        """Let one trial through before the cooldown ends (unless one is already in flight)"""
+        if self.trial_in_flight:
+            return False
+        self.trial_in_flight = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.failure_threshold or self.opened_at is not None:
+            self.opened_at = self.clock()
+
+
+class ModelHealth:
+    """Rolling window of call outcomes for one model"""
+
+    def __init__(self, window: int = 50):
+        self.samples = deque(maxlen=window)  # (latency_ms, ok)
+        self.calls = 0
+
+    def record(self, latency_ms: float, ok: bool):
+        self.samples.append((latency_ms, ok))
+        self.calls += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(latency for latency, ok in self.samples if ok)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(pct / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+
+class ModelRouter:
+    """
+    Routes LLM calls across models by role, rolling latency and error rate
+
+    Exposes the same invoke(messages) interface as a LangChain chat model
+    (plus a role argument), so it can stand in for a single bound model.
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        backends: Optional[Dict[str, Any]] = None,
+        tiers: Optional[Dict[str, str]] = None,
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        min_samples: int = 5,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            models: Model names in order of preference
+            backends: Optional prebuilt backends (e.g. fakes); others are created lazily
+            tiers: Optional model -> 'fast'|'strong' overrides
+            hedge: Send a second request when the first exceeds the latency deadline
+            hedge_percentile: Latency percentile used as the hedging deadline
+            min_samples: Successful calls needed before a model's deadline is trusted
+        """
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+
+        self.models = list(models)
+        self.backends = dict(backends or {})
+        self.tiers = {model: (tiers or {}).get(model, default_tier(model)) for model in self.models}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+
+        self.health = {model: ModelHealth() for model in self.models}
+        self.breakers = {model: CircuitBreaker(failure_threshold, cooldown, clock) for model in self.models}
+        self.hedges = {"sent": 0, "won": 0}
+
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _backend(self, model: str) -> Any:
+        if model not in self.backends:
+            with self._lock:
+                if model not in self.backends:
+                    self.backends[model] = create_llm(model, temperature=0)
+        return self.backends[model]
+
+    def _score(self, model: str) -> float:
+        """Lower is better: median latency inflated by error rate"""
+        health = self.health[model]
+        p50 = health.percentile(50)
+        return (p50 if p50 is not None else 0.0) * (1 + 4 * health.error_rate)
+
+    def candidates(self, role: str = "chat") -> List[str]:
+        """Models in the order they should be tried for a role (open breakers excluded)"""
+
+        preferred = ROLE_TIERS.get(role)
+        with self._lock:
+            allowed = [m for m in self.models if self.breakers[m].state != "open"]
+
+        return sorted(
+            allowed,
+            key=lambda m: (self.tiers[m] != preferred, self._score(m), self.models.index(m))
+        )
+
+    def _call(self, model: str, messages: List[Dict[str, str]], force: bool = False) -> Any:
+        with self._lock:
+            breaker = self.breakers[model]
+            if not (breaker.force_trial() if force else breaker.allow()):
+                raise RuntimeError(f"Circuit open for {model}")
+
+        start = time.perf_counter()
+        try:
+            response = self._backend(model).invoke(messages)
+        except Exception:
+            with self._lock:
+                self.health[model].record((time.perf_counter() - start) * 1000, False)
+                self.breakers[model].record_failure()
+            raise
+
+        with self._lock:
+            self.health[model].record((time.perf_counter() - start) * 1000, True)
+            self.breakers[model].record_success()
+        return response
+
+    def _deadline(self, model: str) -> Optional[float]:
+        health = self.health[model]
+        if sum(1 for _, ok in health.samples if ok) < self.min_samples:
+            return None
+        deadline_ms = health.percentile(self.hedge_percentile)
+        return deadline_ms / 1000 if deadline_ms is not None else None
+
+    def _hedged_call(self, primary: str, backup: str, messages: List[Dict[str, str]],
+                     tried: Optional[set] = None) -> Any:
+        """
+        Call primary; if it misses its deadline, race a backup request against
+        it (and add the backup to `tried`, so failover doesn't call it again)
+        """
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+
+        first = self._executor.submit(self._call, primary, messages)
+        done, _ = wait([first], timeout=self._deadline(primary))
+        if done:
+            return first.result()
+
+        with self._lock:
+            self.hedges["sent"] += 1
+        if tried is not None:
+            tried.add(backup)
+        second = self._executor.submit(self._call, backup, messages)
+        pending = {first, second}
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            self.hedges["won"] += 1
+                    return future.result()
+                error = future.exception()
+
+        raise error
+
+    def invoke(self, messages: List[Dict[str, str]], role: str = "chat") -> Any:
+        """Invoke the best available model for a role, failing over on errors"""
+
+        order = self.candidates(role)
+        if not order:
+            # Every breaker is open: force a half-open trial on the least recently
+            # opened model rather than fail outright
+            with self._lock:
+                model = min(self.models, key=lambda m: self.breakers[m].opened_at or 0)
+            return self._call(model, messages, force=True)
+
+        last_error = None
+        tried = set()
+        for i, model in enumerate(order):
+            if model in tried:
+                # Already raced (and failed) as the previous model's hedge
+                continue
+            backup = order[i + 1] if i + 1 < len(order) else None
+            tried.add(model)
+            try:
+                if self.hedge and backup and self._deadline(model) is not None:
+                    return self._hedged_call(model, backup, messages, tried)
+                return self._call(model, messages)
+            except Exception as e:
+                last_error = e
+
+        raise last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-model rolling latency, error rate and breaker state"""
+
+        with self._lock:
+            return {
+                "models": {
+                    model: {
+                        "tier": self.tiers[model],
+                        "calls": self.health[model].calls,
+                        "p50_ms": self.health[model].percentile(50),
+                        "p95_ms": self.health[model].percentile(95),
+                        "error_rate": self.health[model].error_rate,
+                        "breaker": self.breakers[model].state,
+                    }
+                    for model in self.models
+                },
+                "hedges": dict(self.hedges),
+            }
+
+
+if __name__ == "__main__":
+    # Exercise the router with local fake backends
+    from providers import ReplayChatModel
+
+    router = ModelRouter(
+        ["gpt-4o", "gpt-4o-mini", "llama-3.1-8b-instant"],
+        backends={
+            "gpt-4o": ReplayChatModel(latency=0.05),
+            "gpt-4o-mini": ReplayChatModel(latency=0.02, failure_rate=0.5, seed=7),
+            "llama-3.1-8b-instant": ReplayChatModel(latency=0.01),
+        },
+        hedge=True,
+        cooldown=0.5
+    )
+
+    messages = [{"role": "system", "content": "You are a SQL expert."}, {"role": "user", "content": "count orders"}]
+
+    print("🔀 Testing model router with fake backends\n")
+    for role in ("sql", "chat"):
+        print(f"{role}: candidates = {router.candidates(role)}")
+        for _ in range(20):
+            router.invoke(messages, role=role)
+
+    for model, stats in router.get_stats()["models"].items():
+        print(f"  - {model}: {stats}")
+    print(f"Hedges: {router.get_stats()['hedges']}")
@@ -0,0 +1,237 @@
+"""
+Synthetic CSVs shaped like the Kaggle datasets
+Same file names, columns and value formats as the real Olist and Instacart
+exports, at any size, so loaders and benchmarks can run without downloading
+anything.
+"""
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+STATES = ["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "DF", "GO", "ES", "PE", "CE"]
+CITIES = ["sao paulo", "rio de janeiro", "belo horizonte", "porto alegre", "curitiba", "florianopolis",
+          "salvador", "brasilia", "goiania", "vitoria", "recife", "fortaleza"]
+CATEGORIES = ["cama_mesa_banho", "beleza_saude", "esporte_lazer", "moveis_decoracao", "informatica_acessorios",
+              "utilidades_domesticas", "relogios_presentes", "telefonia", "automotivo", "brinquedos"]
+ENGLISH = ["bed_bath_table", "health_beauty", "sports_leisure", "furniture_decor", "computers_accessories",
+           "housewares", "watches_gifts", "telephony", "auto", "toys"]
+STATUSES = ["delivered"] * 30 + ["shipped", "canceled", "unavailable", "invoiced", "processing"]
+PAYMENT_TYPES = ["credit_card"] * 7 + ["boleto"] * 2 + ["voucher", "debit_card"]
+
+
+def hex_ids(rng: np.random.Generator, n: int) -> np.ndarray:
+    """32-character hex ids like Olist's"""
+    return np.array([f"{a:016x}{b:016x}" for a, b in rng.integers(0, 2 ** 63, size=(n, 2))], dtype=object)
+
+
+def timestamps(start: np.ndarray, offset_hours: np.ndarray) -> pd.Series:
+    return pd.Series(start + offset_hours.astype("timedelta64[h]")).dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def olist_frames(orders: int = 10_000, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Olist tables keyed by CSV file name, scaled to `orders` orders"""
+
+    rng = np.random.default_rng(seed)
+    n_customers = orders
+    n_sellers = max(10, orders // 30)
+    n_products = max(30, orders // 3)
+    n_prefixes = max(50, orders // 10)
+
+    prefixes = rng.choice(np.arange(1000, 99999), n_prefixes, replace=False)
+    prefix_city = rng.integers(0, len(CITIES), n_prefixes)
+
+    customers = pd.DataFrame({
+        "customer_id": hex_ids(rng, n_customers),
+        "customer_unique_id": hex_ids(rng, n_customers),
+    })
+    where = rng.integers(0, n_prefixes, n_customers)
+    customers["customer_zip_code_prefix"] = prefixes[where]
+    customers["customer_city"] = np.array(CITIES)[prefix_city[where]]
+    customers["customer_state"] = np.array(STATES)[prefix_city[where]]
+
+    sellers = pd.DataFrame({"seller_id": hex_ids(rng, n_sellers)})
+    where = rng.integers(0, n_prefixes, n_sellers)
+    sellers["seller_zip_code_prefix"] = prefixes[where]
+    sellers["seller_city"] = np.array(CITIES)[prefix_city[where]]
+    sellers["seller_state"] = np.array(STATES)[prefix_city[where]]
+
+    # ~10 raw geolocation rows per prefix, as in the real 1M-row file
+    where = rng.integers(0, n_prefixes, n_prefixes * 10)
+    geolocation = pd.DataFrame({
+        "geolocation_zip_code_prefix": prefixes[where],
+        "geolocation_lat": -23.5 + prefix_city[where] + rng.normal(0, 0.05, len(where)),
+        "geolocation_lng": -46.6 + prefix_city[where] + rng.normal(0, 0.05, len(where)),
+        "geolocation_city": np.array(CITIES)[prefix_city[where]],
+        "geolocation_state": np.array(STATES)[prefix_city[where]],
+    })
+
+    products = pd.DataFrame({
+        "product_id": hex_ids(rng, n_products),
+        "product_category_name": np.array(CATEGORIES)[rng.integers(0, len(CATEGORIES), n_products)],
+        "product_name_lenght": rng.integers(10, 70, n_products).astype(float),
+        "product_description_lenght": rng.integers(50, 3000, n_products).astype(float),
+        "product_photos_qty": rng.integers(1, 6, n_products).astype(float),
+        "product_weight_g": rng.integers(100, 20000, n_products).astype(float),
+        "product_length_cm": rng.integers(10, 100, n_products).astype(float),
+        "product_height_cm": rng.integers(2, 60, n_products).astype(float),
+        "product_width_cm": rng.integers(10, 60, n_products).astype(float),
+    })
+
+    purchase = np.datetime64("2016-09-01T00") + rng.integers(0, 24 * 760, orders).astype("timedelta64[h]")
+    status = np.array(STATUSES)[rng.integers(0, len(STATUSES), orders)]
+    delivered = rng.integers(48, 24 * 30, orders)
+    orders_df = pd.DataFrame({
+        "order_id": hex_ids(rng, orders),
+        "customer_id": customers["customer_id"].to_numpy()[rng.permutation(n_customers)[:orders]],
+        "order_status": status,
+        "order_purchase_timestamp": timestamps(purchase, np.zeros(orders, dtype=int)),
+        "order_approved_at": timestamps(purchase, rng.integers(0, 48, orders)),
+        "order_delivered_carrier_date": timestamps(purchase, rng.integers(24, 96, orders)),
+        "order_delivered_customer_date": timestamps(purchase, delivered),
+        "order_estimated_delivery_date": timestamps(purchase, delivered + rng.integers(-72, 24 * 10, orders)),
+    })
+    undelivered = status != "delivered"
+    orders_df.loc[undelivered, "order_delivered_customer_date"] = None
+
+    per_order = rng.choice([1, 1, 1, 1, 2, 2, 3], orders)
+    item_order = np.repeat(np.arange(orders), per_order)
+    order_items = pd.DataFrame({
+        "order_id": orders_df["order_id"].to_numpy()[item_order],
+        "order_item_id": np.concatenate([np.arange(1, k + 1) for k in per_order]),
+        "product_id": products["product_id"].to_numpy()[rng.integers(0, n_products, len(item_order))],
+        "seller_id": sellers["seller_id"].to_numpy()[rng.integers(0, n_sellers, len(item_order))],
+        "shipping_limit_date": timestamps(purchase[item_order], np.full(len(item_order), 72)),
+        "price": rng.gamma(2.0, 60.0, len(item_order)).round(2),
+        "freight_value": rng.gamma(2.0, 10.0, len(item_order)).round(2),
+    })
+
+    order_payments = pd.DataFrame({
+        "order_id": orders_df["order_id"],
+        "payment_sequential": 1,
+        "payment_type": np.array(PAYMENT_TYPES)[rng.integers(0, len(PAYMENT_TYPES), orders)],
+        "payment_installments": rng.integers(1, 11, orders),
+        "payment_value": order_items.groupby(item_order)[["price", "freight_value"]].sum().sum(axis=1).round(2).to_numpy(),
+    })
+
+    reviewed = rng.random(orders) < 0.95
+    order_reviews = pd.DataFrame({
+        "review_id": hex_ids(rng, int(reviewed.sum())),
+        "order_id": orders_df["order_id"].to_numpy()[reviewed],
+        "review_score": rng.choice([1, 2, 3, 4, 5, 5, 5, 4], int(reviewed.sum())),
+        "review_comment_title": None,
+        "review_comment_message": np.where(rng.random(int(reviewed.sum())) < 0.4, "produto chegou bem", None),
+        "review_creation_date": timestamps(purchase[reviewed], delivered[reviewed] + 24),
+        "review_answer_timestamp": timestamps(purchase[reviewed], delivered[reviewed] + 72),
+    })
+
+    return {
+        "olist_customers_dataset.csv": customers,
+        "olist_geolocation_dataset.csv": geolocation,
+        "olist_order_items_dataset.csv": order_items,
+        "olist_order_payments_dataset.csv": order_payments,
+        "olist_order_reviews_dataset.csv": order_reviews,
+        "olist_orders_dataset.csv": orders_df,
+        "olist_products_dataset.csv": products,
+        "olist_sellers_dataset.csv": sellers,
+        "product_category_name_translation.csv": pd.DataFrame({
+            "product_category_name": CATEGORIES, "product_category_name_english": ENGLISH
+        }),
+    }
+
+
+def write_olist_csvs(raw_dir: Path, orders: int = 10_000, seed: int = 0) -> Dict[str, int]:
+    """Write synthetic Olist CSVs to `raw_dir`; returns rows per file"""
+
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for name, df in olist_frames(orders, seed).items():
+        df.to_csv(raw_dir / name, index=False)
+        counts[name] = len(df)
+    return counts
+
+
+def instacart_frames(orders: int = 100_000, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """Instacart tables keyed by CSV file name, scaled to `orders` orders (~10 items each)"""
+
+    rng = np.random.default_rng(seed)
+    n_products = min(49_688, max(500, orders // 4))
+    n_users = max(1, orders // 16)
+
+    aisles = pd.DataFrame({"aisle_id": np.arange(1, 135), "aisle": [f"aisle {i}" for i in range(1, 135)]})
+    departments = pd.DataFrame({"department_id": np.arange(1, 22), "department": [f"dept {i}" for i in range(1, 22)]})
+    products = pd.DataFrame({
+        "product_id": np.arange(1, n_products + 1),
+        "product_name": [f"Product {i}" for i in range(1, n_products + 1)],
+        "aisle_id": rng.integers(1, 135, n_products),
+        "department_id": rng.integers(1, 22, n_products),
+    })
+
+    user = np.sort(rng.integers(1, n_users + 1, orders))
+    order_number = pd.Series(user).groupby(user).cumcount().to_numpy() + 1
+    last = np.append(user[1:] != user[:-1], True)
+    days = rng.integers(1, 31, orders).astype(float)
+    days[order_number == 1] = np.nan
+    orders_df = pd.DataFrame({
+        "order_id": rng.permutation(orders) + 1,
+        "user_id": user,
+        "eval_set": np.where(last, "train", "prior"),
+        "order_number": order_number,
+        "order_dow": rng.integers(0, 7, orders),
+        "order_hour_of_day": rng.integers(6, 23, orders),
+        "days_since_prior_order": days,
+    })
+
+    # Popular products dominate baskets, as in the real data
+    weights = 1.0 / np.arange(1, n_products + 1)
+    weights /= weights.sum()
+    per_order = rng.integers(1, 20, orders)
+    item_order = np.repeat(np.arange(orders), per_order)
+    items = pd.DataFrame({
+        "order_id": orders_df["order_id"].to_numpy()[item_order],
+        "product_id": rng.choice(n_products, len(item_order), p=weights) + 1,
+        "add_to_cart_order": np.concatenate([np.arange(1, k + 1) for k in per_order]),
+        "reordered": (rng.random(len(item_order)) < 0.6).astype(int),
+    })
+    is_train = last[item_order]
+
+    return {
+        "aisles.csv": aisles,
+        "departments.csv": departments,
+        "products.csv": products,
+        "orders.csv": orders_df,
+        "order_products__prior.csv": items[~is_train],
+        "order_products__train.csv": items[is_train],
+    }
+
+
+def write_instacart_zip(zip_path: Path, orders: int = 100_000, seed: int = 0) -> Dict[str, int]:
+    """Write synthetic Instacart CSVs into a zip laid out like the Kaggle download"""
+
+    zip_path = Path(zip_path)
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
+        for name, df in instacart_frames(orders, seed).items():
+            z.writestr(name, df.to_csv(index=False))
+            counts[name] = len(df)
+    return counts
+
+
+if __name__ == "__main__":
+    import sys
+
+    dataset = sys.argv[1] if len(sys.argv) > 1 else "olist"
+    target = Path(sys.argv[2] if len(sys.argv) > 2 else f"data/{dataset}_synthetic")
+    orders = int(sys.argv[3]) if len(sys.argv) > 3 else 10_000
+
+    if dataset == "instacart":
+        counts = write_instacart_zip(target, orders)
+    else:
+        counts = write_olist_csvs(target, orders)
+    for name, rows in counts.items():
+        print(f"🧪 {name}: {rows:,} rows")
+    print(f"\n✅ Synthetic {dataset} data written to {target}")
@@ -0,0 +1,253 @@
+"""
+Deterministic, relationship-preserving samples for demo databases
+Root rows are kept when a seeded hash of their key (a user or customer id)
+falls under the sampling fraction, so the same seed always picks the same
+entities and a smaller fraction picks a subset of a larger one. The sample
+then cascades down the relationship graph: each child table is streamed
+once and keeps exactly the rows whose parents were kept, so no child row is
+orphaned and sampled entities keep all of their rows.
+"""
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from bulk_load import BulkLoader, RESUMABLE_PRAGMAS
+from ingest import CHUNK_ROWS, IdEncoder, build_derived, print_progress, stream_csv
+from sources import as_source
+
+SAMPLE_SEED = 20240917
+MAX_PASSES = 4                   # builds tried when aiming at a file size
+ESTIMATE_BYTES = 1024 * 1024     # bytes read per source to estimate its row count
+
+
+def key_hash(values: pd.Series, seed: int = SAMPLE_SEED) -> np.ndarray:
+    """Seeded 64-bit hash of each key, stable across runs and chunkings"""
+
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return pd.util.hash_array(values.to_numpy().astype("uint64") ^ np.uint64(seed))
+    return pd.util.hash_array(values.astype(str).to_numpy(dtype=object), hash_key=f"{seed:016x}"[-16:])
+
+
+def in_sample(values: pd.Series, fraction: float, seed: int = SAMPLE_SEED) -> np.ndarray:
+    """Boolean mask of keys inside a `fraction` sample"""
+
+    if fraction >= 1:
+        return np.ones(len(values), dtype=bool)
+    return key_hash(values, seed) < np.uint64(fraction * 2.0 ** 64)
+
+
+def estimate_rows(source) -> int:
+    """Row count estimated from the average line length at the start of the file"""
+
+    source = as_source(source)
+    with source.open() as f:
+        head = f.read(ESTIMATE_BYTES)
+    lines = max(head.count(b"\n") - 1, 1)
+    if len(head) < ESTIMATE_BYTES:
+        return lines
+    return int(source.size / (len(head) / (lines + 1)))
+
+
+def sample_tables(
+    loader: BulkLoader,
+    sources: Dict[str, Any],
+    dtypes: Dict[str, Dict[str, str]],
+    plan: Dict[str, Any],
+    fraction: float,
+    seed: int = SAMPLE_SEED,
+    chunk_rows: int = CHUNK_ROWS,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    encoder: Optional[IdEncoder] = None,
+    on_progress=print_progress
+) -> Dict[str, int]:
+    """
+    Load a `fraction` sample of a dataset through `loader`; returns rows
+    kept per table. Every table is read once: full tables, then the root,
+    then children in plan order.
+    """
+
+    schema = schema or {}
+    root, root_key = plan["root"]
+    filters: Dict[str, List] = {}
+    for child, column, parent, parent_column in plan["cascade"]:
+        filters.setdefault(child, []).append((column, parent, parent_column))
+
+    # Keys that children are filtered on, collected while their table loads
+    wanted = {(parent, parent_column) for _, _, parent, parent_column in plan["cascade"]}
+    kept: Dict[tuple, List[np.ndarray]] = {key: [] for key in wanted}
+    order = list(plan["full"]) + [root] + list(filters)
+
+    counts = {}
+    for table in order:
+        if table not in sources:
+            continue
+        parents = [
+            (column, pd.Index(np.concatenate(kept[(parent, parent_column)])))
+            for column, parent, parent_column in filters.get(table, [])
+            if parent in counts
+        ]
+
+        def transform(chunk, table=table, parents=parents):
+            if table == root:
+                chunk = chunk[in_sample(chunk[root_key], fraction, seed)]
+            for column, keys in parents:
+                chunk = chunk[chunk[column].isin(keys)]
+            for (parent, parent_column), arrays in kept.items():
+                if parent == table:
+                    arrays.append(chunk[parent_column].to_numpy())
+            return chunk
+
+        entry = stream_csv(loader, sources[table], table, dtypes[table], chunk_rows, transform=transform,
+                           resume=False, on_progress=on_progress, spec=schema.get(table), encoder=encoder)
+        counts[table] = entry["rows"]
+    return counts
+
+
+def build_sample(
+    db_path: Union[str, Path],
+    sources: Dict[str, Any],
+    dtypes: Dict[str, Dict[str, str]],
+    plan: Dict[str, Any],
+    indexes=(),
+    rows: Optional[int] = None,
+    size_mb: Optional[float] = None,
+    fraction: Optional[float] = None,
+    seed: int = SAMPLE_SEED,
+    chunk_rows: int = CHUNK_ROWS,
+    schema: Optional[Dict[str, Dict[str, Any]]] = None,
+    encode: Optional[Dict[str, str]] = None,
+    derived: Optional[Dict[str, Dict[str, Any]]] = None,
+    on_progress=print_progress
+) -> Dict[str, Any]:
+    """
+    Build a sampled database sized by a row budget or a file size
+
+    rows: Budget for the sampled (root and cascade) tables; the fraction
+        comes from row counts estimated from the sources.
+    size_mb: Target file size; the build is repeated with a refitted
+        fraction until it lands within 85-100% of the target. Size is close
+        to linear in the fraction (full tables are a fixed cost), so a
+        secant through the last two builds converges in two or three.
+        If no pass lands in range, the largest build under the target is
+        rebuilt, so the file never ends up over it.
+    fraction: Sample this fraction of root keys as is.
+
+    Returns the fraction used, the rows per table and the file size.
+    """
+
+    sampled = [plan["root"][0]] + [child for child, *_ in plan["cascade"]]
+    sampled = [table for table in dict.fromkeys(sampled) if table in sources]
+    if fraction is not None:
+        size_mb = None
+    elif rows is not None:
+        total = sum(estimate_rows(sources[table]) for table in sampled)
+        fraction = min(1.0, rows / max(total, 1))
+    elif size_mb is not None:
+        # First guess: CSV text and the typed tables plus indexes are roughly the same size
+        fixed = sum(as_source(sources[table]).size for table in plan["full"] if table in sources)
+        total = sum(as_source(sources[table]).size for table in sampled)
+        fraction = min(1.0, max(size_mb * 1e6 - fixed, 0.05 * size_mb * 1e6) / max(total, 1))
+    else:
+        fraction = 1.0
+
+    db_path = Path(db_path)
+    target = size_mb * 1e6 * 0.95 if size_mb is not None else None
+    builds = []
+    best = None
+    for attempt in range(MAX_PASSES):
+        start = time.perf_counter()
+        db_path.unlink(missing_ok=True)
+        with BulkLoader(db_path, pragmas=RESUMABLE_PRAGMAS) as loader:
+            encoder = IdEncoder(loader.conn, encode) if encode else None
+            counts = sample_tables(loader, sources, dtypes, plan, fraction, seed, chunk_rows, schema, encoder,
+                                   on_progress)
+            for table, spec in (derived or {}).items():
+                if spec["from"] in counts:
+                    build_derived(loader, table, spec)
+            loader.commit()
+            for index in indexes:
+                if index[1] in counts:
+                    loader.add_index(*index)
+        size = db_path.stat().st_size
+        result = {"fraction": fraction, "rows": counts, "size_mb": size / 1e6,
+                  "seconds": time.perf_counter() - start, "passes": attempt + 1}
+
+        if size_mb is None or 0.85 * size_mb * 1e6 <= size <= size_mb * 1e6:
+            return result
+        if fraction >= 1 and size <= size_mb * 1e6:
+            return result
+        if size <= size_mb * 1e6 and (best is None or result["size_mb"] > best["size_mb"]):
+            best = result
+        builds.append((fraction, size))
+        if len(builds) >= 2 and builds[-1][1] != builds[-2][1]:
+            (f0, s0), (f1, s1) = builds[-2:]
+            fraction = f1 + (target - s1) * (f1 - f0) / (s1 - s0)
+        else:
+            fraction = fraction * target / size
+        fraction = min(1.0, max(fraction, 1e-6))
+
+    if best is not None and best["passes"] != result["passes"]:
+        # Out of passes: never hand back a file over the target
+        result = build_sample(db_path, sources, dtypes, plan, indexes, fraction=best["fraction"], seed=seed,
+                              chunk_rows=chunk_rows, schema=schema, encode=encode, derived=derived,
+                              on_progress=on_progress)
+        result["passes"] = MAX_PASSES + 1
+    return result
+
+
+def orphans(conn, plan: Dict[str, Any]) -> Dict[str, int]:
+    """Child rows whose parent is missing, per relationship (all zero for a sample)"""
+
+    counts = {}
+    for child, column, parent, parent_column in plan["cascade"]:
+        counts[f"{child}.{column}"] = conn.execute(
+            f"SELECT COUNT(*) FROM {child} WHERE {column} NOT IN (SELECT {parent_column} FROM {parent})"
+        ).fetchone()[0]
+    return counts
+
+
+if __name__ == "__main__":
+    import sqlite3
+    import tempfile
+    from datasets import INSTACART_TABLES, INSTACART_DTYPES, INSTACART_SCHEMA, INSTACART_INDEXES, INSTACART_SAMPLING
+    from sample_data import write_instacart_zip
+    from sources import find_sources
+
+    def profile(db_path):
+        conn = sqlite3.connect(db_path)
+        stats = conn.execute("""
+            SELECT COUNT(*) * 1.0 / COUNT(DISTINCT user_id),
+                   (SELECT AVG(reordered) FROM order_products__prior),
+                   (SELECT COUNT(*) * 1.0 / COUNT(DISTINCT order_id) FROM order_products__prior),
+                   (SELECT COUNT(*) FROM orders o WHERE NOT EXISTS (
+                        SELECT 1 FROM order_products__prior p WHERE p.order_id = o.order_id
+                        UNION ALL SELECT 1 FROM order_products__train t WHERE t.order_id = o.order_id))
+            FROM orders
+        """).fetchone()
+        missing = sum(orphans(conn, INSTACART_SAMPLING).values())
+        conn.close()
+        return (f"orders/user {stats[0]:.2f}, reorder rate {stats[1]:.3f}, items/order {stats[2]:.2f}, "
+                f"orders without items {stats[3]:,}, orphaned rows {missing:,}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        zip_path = Path(workdir) / "instacart.zip"
+        write_instacart_zip(zip_path, 200_000)
+        sources = find_sources(zip_path, INSTACART_TABLES)
+        options = dict(schema=INSTACART_SCHEMA, on_progress=None)
+
+        full = build_sample(Path(workdir) / "full.db", sources, INSTACART_DTYPES, INSTACART_SAMPLING, **options)
+        print(f"📦 full:         {full['size_mb']:.1f} MB  {profile(Path(workdir) / 'full.db')}")
+
+        by_rows = build_sample(Path(workdir) / "rows.db", sources, INSTACART_DTYPES, INSTACART_SAMPLING,
+                               INSTACART_INDEXES, rows=200_000, **options)
+        print(f"🎯 200k rows:    {by_rows['size_mb']:.1f} MB  {profile(Path(workdir) / 'rows.db')}")
+        sampled = sum(rows for table, rows in by_rows["rows"].items() if table not in INSTACART_SAMPLING["full"])
+        print(f"   fraction {by_rows['fraction']:.3f}, {sampled:,} sampled rows")
+
+        by_size = build_sample(Path(workdir) / "size.db", sources, INSTACART_DTYPES, INSTACART_SAMPLING,
+                               INSTACART_INDEXES, size_mb=4, **options)
+        print(f"🎯 4 MB target:  {by_size['size_mb']:.1f} MB  {profile(Path(workdir) / 'size.db')}")
+        print(f"   fraction {by_size['fraction']:.3f} after {by_size['passes']} passes")
@@ -4,6 +4,7 @@ Similar to the Python script shown in the video
 """
 import sqlite3
 import json
+import threading
 from pathlib import Path
 from typing import Dict, List, Any
 
@@ -12,16 +13,23 @@ class SchemaExtractor:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Extraction may run on a background warm-up thread
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
         self.schema_info = {}
+        self._lock = threading.RLock()
 
     def extract_schema(self) -> Dict[str, Any]:
         """Extract complete database schema"""
 
+        with self._lock:
+            return self._extract_schema()
+
+    def _extract_schema(self) -> Dict[str, Any]:
         # Get all tables
         cursor = self.conn.execute("""
             SELECT name FROM sqlite_master
             WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name != 'chat_history'
+              AND name NOT LIKE '\\_%' ESCAPE '\\'
             ORDER BY name
         """)
         tables = [row[0] for row in cursor.fetchall()]
@@ -51,16 +59,19 @@ class SchemaExtractor:
     def _get_table_info(self, table_name: str) -> Dict[str, Any]:
         """Get detailed information about a table"""
 
-        # Get columns
-        cursor = self.conn.execute(f"PRAGMA table_info({table_name})")
+        # Get columns (table_xinfo also lists generated columns: hidden 2 or 3)
+        cursor = self.conn.execute(f"PRAGMA table_xinfo({table_name})")
         columns = []
 
         for row in cursor.fetchall():
+            if row[6] == 1:
+                continue
             col_info = {
                 "name": row[1],
                 "type": row[2],
                 "nullable": not row[3],
-                "primary_key": bool(row[5])
+                "primary_key": bool(row[5]),
+                "generated": row[6] in (2, 3)
             }
             columns.append(col_info)
 
@@ -95,7 +106,12 @@ class SchemaExtractor:
                 {"from": "orders", "to": "orders", "via": "user_id", "type": "many-to-one (same user)"}
             ]
 
-        # Default to Olist
+        # Default to Olist: zip prefixes join the one-row-per-prefix centroid
+        # table when the loader built it (the raw table fans out per prefix)
+        if tables is None or "geolocation_prefix" in tables:
+            geo_table, geo_key = "geolocation_prefix", "zip_code_prefix"
+        else:
+            geo_table, geo_key = "geolocation", "geolocation_zip_code_prefix"
         return [
             {
                 "from": "orders",
@@ -135,14 +151,14 @@ class SchemaExtractor:
             },
             {
                 "from": "customers",
-                "to": "geolocation",
-                "via": "customer_zip_code_prefix = geolocation_zip_code_prefix",
+                "to": geo_table,
+                "via": f"customer_zip_code_prefix = {geo_key}",
                 "type": "many-to-one"
             },
             {
                 "from": "sellers",
-                "to": "geolocation",
-                "via": "seller_zip_code_prefix = geolocation_zip_code_prefix",
+                "to": geo_table,
+                "via": f"seller_zip_code_prefix = {geo_key}",
                 "type": "many-to-one"
             },
             {
@@ -153,6 +169,37 @@ class SchemaExtractor:
             }
         ]
 
+    def _date_rules(self) -> Dict[str, str]:
+        columns = {col["name"] for col in self.schema_info["tables"].get("orders", {}).get("columns", [])}
+        if {"purchase_year", "purchase_month", "delivery_days"} <= columns:
+            return {
+                "date_rule": """       - orders has indexed date parts: purchase_year (INTEGER, e.g. 2017) and
+         purchase_month ('YYYY-MM'). Filter and group on them, e.g.
+         WHERE o.purchase_year = 2017 GROUP BY o.purchase_month, instead of
+         strftime() over order_purchase_timestamp (which scans every order)
+""",
+                "delivery_rule": """       - Use orders.delivery_days (REAL days from purchase to delivery, indexed)
+       - It is NULL until the order is delivered: filter delivery_days IS NOT NULL
+""",
+            }
+        return {
+            "date_rule": "",
+            "delivery_rule": """       - Calculate as: JULIANDAY(order_delivered_customer_date) - JULIANDAY(order_purchase_timestamp)
+       - Filter out NULL delivery dates for accurate metrics
+""",
+        }
+
+    def _location_rule(self) -> str:
+        if "geolocation_prefix" in self.schema_info["tables"]:
+            return """       - For coordinates, city or distance, JOIN geolocation_prefix g
+         ON g.zip_code_prefix = c.customer_zip_code_prefix (or s.seller_zip_code_prefix);
+         it has one row per prefix: centroid lat/lng, city, state, points
+       - Never join the raw geolocation table: it has many rows per prefix
+         and multiplies counts and sums
+"""
+        return """       - Join with geolocation on zip_code_prefix for coordinates
+"""
+
     def generate_ai_context(self) -> str:
         """
         Generate comprehensive context for AI agents
@@ -190,8 +237,9 @@ class SchemaExtractor:
 
             for col in table_info["columns"]:
                 pk_marker = " [PRIMARY KEY]" if col["primary_key"] else ""
-                null_marker = " [NULLABLE]" if col["nullable"] else ""
-                context += f"- **{col['name']}** ({col['type']}){pk_marker}{null_marker}\n"
+                null_marker = " [NULLABLE]" if col["nullable"] and not col.get("generated") else ""
+                generated_marker = " [PRECOMPUTED, INDEXED]" if col.get("generated") else ""
+                context += f"- **{col['name']}** ({col['type']}){pk_marker}{null_marker}{generated_marker}\n"
 
             context += "\n"
 
@@ -230,26 +278,31 @@ class SchemaExtractor:
     1. **Date Handling**:
        - Use date columns from 'orders' table for time-based queries
        - Key dates: order_purchase_timestamp, order_delivered_customer_date
-    
+{date_rule}
     2. **Revenue Calculations**:
        - Revenue = SUM(price + freight_value) from order_items
        - Join order_items → orders → customers for customer-level revenue
     
     3. **Delivery Time**:
-       - Calculate as: JULIANDAY(order_delivered_customer_date) - JULIANDAY(order_purchase_timestamp)
-       - Filter out NULL delivery dates for accurate metrics
-    
+{delivery_rule}
     4. **Product Categories**:
        - Join products → product_category_translation for English category names
        - product_category_name is in Portuguese, use translation table
     
     5. **Location Data**:
        - Use customer_state or seller_state for state-level analysis
-       - Join with geolocation on zip_code_prefix for coordinates
-    
+{location_rule}
     6. **Payment Methods**:
        - Multiple payments possible per order (installments)
        - Use payment_type column for method distribution
+    """.format(location_rule=self._location_rule(), **self._date_rules())
+            if "id_dictionary" in self.schema_info["tables"]:
+                context += """
+    7. **IDs**:
+       - *_id columns are integer surrogate keys; join on them directly
+       - Original hash ids live in id_dictionary (entity, id, hash), e.g.
+         JOIN id_dictionary d ON d.entity = 'order' AND d.id = o.order_id
+       - Only look up hashes when the user asks for the original id
     """
 
         context += """
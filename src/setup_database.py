@@ -5,90 +5,83 @@ Loads all 9 tables with proper relationships
 import os
 import sys
 import sqlite3
-import pandas as pd
+import argparse
 from pathlib import Path
 from datetime import datetime
-
-def setup_database():
-    """Load CSV files into SQLite database"""
+from typing import Optional
+
+from datasets import (OLIST_TABLES, OLIST_DTYPES, OLIST_SCHEMA, OLIST_ENCODED_IDS, OLIST_INDEXES, OLIST_QUERIES,
+                      OLIST_DERIVED)
+from ingest import CHUNK_ROWS
+from optimize import optimize_database, print_optimize_report
+from refresh import load_manifest, refresh_dataset
+from sources import find_sources
+
+
+def setup_database(
+    raw_dir: Optional[Path] = None,
+    db_path: Optional[Path] = None,
+    rebuild: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+    workers: int = 1,
+    optimize: bool = True
+) -> list:
+    """
+    Load CSV files into SQLite database; returns per-table load stats
+
+    CSVs are streamed in chunks, so memory stays flat even for the 1M-row
+    geolocation file. An existing database is refreshed in place: only
+    changed files are reloaded (appended rows load incrementally) and the
+    app can keep querying it meanwhile; an interrupted run continues from
+    its last committed chunk. rebuild=True deletes it and starts over.
+    workers > 1 parses files in parallel processes feeding a single writer.
+    optimize=True finishes with ANALYZE, an integrity check and before/after
+    timings of the standard queries (see optimize.py).
+    """
 
     project_dir = Path(__file__).parent.parent
-    raw_dir = project_dir / "data" / "raw"
-    db_path = project_dir / "data" / "ecommerce.db"
+    raw_dir = Path(raw_dir or project_dir / "data" / "raw")
+    db_path = Path(db_path or project_dir / "data" / "ecommerce.db")
 
-    # Check if CSV files exist
-    if not raw_dir.exists() or not list(raw_dir.glob("*.csv")):
-        print("❌ CSV files not found in data/raw/")
+    # CSVs are read where they are: plain, gzipped or inside the Kaggle zip
+    sources = find_sources(raw_dir, OLIST_TABLES) if raw_dir.exists() else {}
+    if not sources:
+        print(f"❌ Olist CSV files not found in {raw_dir}")
         print("\nPlease run: python src/download_dataset.py")
         sys.exit(1)
 
     print("🗄️  Setting up SQLite database...")
     print(f"📁 Database location: {db_path}\n")
 
-    # Delete existing database
-    if db_path.exists():
+    if rebuild and db_path.exists():
         print("🗑️  Removing existing database...")
-        db_path.unlink()
-
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+        for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+            path.unlink(missing_ok=True)
+    elif load_manifest(db_path):
+        print("♻️  Refreshing existing database (only changed files are loaded)\n")
 
-    # Table mapping: CSV filename -> table name
-    table_mappings = {
-        'olist_customers_dataset.csv': 'customers',
-        'olist_geolocation_dataset.csv': 'geolocation',
-        'olist_order_items_dataset.csv': 'order_items',
-        'olist_order_payments_dataset.csv': 'order_payments',
-        'olist_order_reviews_dataset.csv': 'order_reviews',
-        'olist_orders_dataset.csv': 'orders',
-        'olist_products_dataset.csv': 'products',
-        'olist_sellers_dataset.csv': 'sellers',
-        'product_category_name_translation.csv': 'product_category_translation'
-    }
-
-    total_rows = 0
-
-    for csv_file, table_name in table_mappings.items():
-        csv_path = raw_dir / csv_file
-
-        if not csv_path.exists():
+    for csv_file, table_name in OLIST_TABLES.items():
+        if table_name not in sources:
             print(f"⚠️  Skipping {csv_file} (not found)")
-            continue
-
-        print(f"📊 Loading {table_name}...", end=" ")
-
-        try:
-            # Read CSV
-            df = pd.read_csv(csv_path)
 
-            # Load into SQLite
-            df.to_sql(table_name, conn, if_exists='replace', index=False)
+    # Chunked reads with fixed dtypes into shadow tables, swapped in with their indexes;
+    # typed tables with primary keys, hash ids stored as integers, and
+    # geolocation_prefix (one row per zip prefix) rebuilt with geolocation
+    loader = refresh_dataset(db_path, sources, OLIST_DTYPES, OLIST_INDEXES, chunk_rows=chunk_rows, workers=workers,
+                             schema=OLIST_SCHEMA, encode=OLIST_ENCODED_IDS, derived=OLIST_DERIVED)
 
-            rows = len(df)
-            total_rows += rows
-            print(f"✅ {rows:,} rows")
-
-        except Exception as e:
-            print(f"❌ Error: {e}")
-
-    # Create indexes for better performance
-    print("\n🔗 Creating indexes...")
-
-    indexes = [
-        "CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)",
-        "CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id)",
-        "CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items(product_id)",
-        "CREATE INDEX IF NOT EXISTS idx_order_items_seller ON order_items(seller_id)",
-        "CREATE INDEX IF NOT EXISTS idx_order_payments_order ON order_payments(order_id)",
-        "CREATE INDEX IF NOT EXISTS idx_order_reviews_order ON order_reviews(order_id)",
-        "CREATE INDEX IF NOT EXISTS idx_customers_state ON customers(customer_state)",
-        "CREATE INDEX IF NOT EXISTS idx_sellers_state ON sellers(seller_state)",
-    ]
-
-    for idx_sql in indexes:
-        conn.execute(idx_sql)
+    total_rows = 0
+    for entry in loader.stats:
+        if entry["table"] in sources:
+            total_rows += entry["total_rows"]
+            if entry["action"] == "unchanged":
+                status = "unchanged"
+            else:
+                verb = "appended" if entry["action"] == "append" else "reloaded"
+                status = f"{verb} {entry['rows']:,} rows, {entry['rows_per_sec']:,} rows/s"
+            print(f"📊 {entry['table']}: ✅ {entry['total_rows']:,} rows ({status})")
 
-    conn.commit()
+    conn = sqlite3.connect(db_path)
 
     # Create chat history table
     print("💬 Creating chat history table...")
@@ -104,10 +97,14 @@ def setup_database():
     conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_session ON chat_history(session_id)")
     conn.commit()
 
+    # Planner statistics; no VACUUM INTO here, the app may have the file open
+    if optimize:
+        print_optimize_report(optimize_database(db_path, OLIST_QUERIES))
+
     # Get database stats
     cursor = conn.execute("""
         SELECT name FROM sqlite_master
-        WHERE type='table' AND name NOT LIKE 'sqlite_%'
+        WHERE type='table' AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '\\_%' ESCAPE '\\'
         ORDER BY name
     """)
     tables = cursor.fetchall()
@@ -129,5 +126,17 @@ def setup_database():
     print(f"\n✨ Ready to use! Database at: {db_path}")
     print("\n🚀 Next step: Run 'streamlit run src/app.py'")
 
+    return loader.stats
+
 if __name__ == "__main__":
-    setup_database()
+    parser = argparse.ArgumentParser(description="Load the Olist CSVs into SQLite")
+    parser.add_argument("--raw-dir", help="Directory (or zip) with the Olist CSVs (default: data/raw)")
+    parser.add_argument("--db", help="Database path (default: data/ecommerce.db)")
+    parser.add_argument("--rebuild", action="store_true", help="Delete the database and load everything again")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=1, help="Parser processes (1 = sequential streaming)")
+    parser.add_argument("--no-optimize", action="store_true", help="Skip ANALYZE, integrity check and query timings")
+    args = parser.parse_args()
+
+    setup_database(args.raw_dir, args.db, rebuild=args.rebuild, chunk_rows=args.chunk_rows, workers=args.workers,
+                   optimize=not args.no_optimize)
@@ -0,0 +1,238 @@
+"""
+Ingestion sources
+A source is one CSV to load, wherever it lives: a plain file, a member of a
+zip archive (the Kaggle downloads) or a gzip file. Every source opens as a
+large buffered binary stream for the CSV parser, so archives are read in
+place with no temporary extraction, and reports its size and a content
+fingerprint for progress, resume and change detection.
+"""
+import io
+import os
+import gzip
+import struct
+import hashlib
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+READ_BUFFER = 1024 * 1024    # bytes per read from disk or decompressor
+HASH_BLOCK = 1024 * 1024
+
+
+def file_digest(path: Union[str, Path], prefix_bytes: Optional[int] = None) -> Tuple[str, Optional[str]]:
+    """
+    Content hash of the whole file and, in the same pass, of its first
+    `prefix_bytes` bytes (None when not asked for or the file is shorter)
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    prefix = None
+    with open(path, "rb") as f:
+        if prefix_bytes is not None:
+            remaining = prefix_bytes
+            while remaining > 0:
+                block = f.read(min(HASH_BLOCK, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+            if remaining == 0:
+                prefix = digest.hexdigest()
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest(), prefix
+
+
+class _TailReader:
+    """The file's header line followed by its bytes from `offset` on"""
+
+    def __init__(self, path: Union[str, Path], offset: int):
+        self.file = open(path, "rb", buffering=READ_BUFFER)
+        self.header = self.file.readline()
+        self.file.seek(offset)
+        self.name = f"{path}@{offset}"
+        # Bytes this reader hands out, header included (the total for progress)
+        self.size = len(self.header) + max(0, os.path.getsize(path) - offset)
+
+    def read(self, size: int = -1) -> bytes:
+        if not self.header:
+            return self.file.read(size)
+        data, self.header = self.header, b""
+        if size is None or size < 0:
+            return data + self.file.read()
+        return data + self.file.read(max(0, size - len(data)))
+
+    def close(self):
+        self.file.close()
+
+
+class CsvFile:
+    """A plain CSV on disk; can be split into byte ranges and appended to"""
+
+    splittable = True
+    appendable = True
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.name = str(path)
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def open(self) -> BinaryIO:
+        return open(self.path, "rb", buffering=READ_BUFFER)
+
+    def open_tail(self, offset: int) -> BinaryIO:
+        return _TailReader(self.path, offset)
+
+    def fingerprint(self, prefix_bytes: Optional[int] = None) -> Tuple[str, Optional[str]]:
+        return file_digest(self.path, prefix_bytes)
+
+
+class ZipMember:
+    """
+    A CSV inside a zip archive, decompressed as it is read
+
+    The fingerprint comes from the archive's directory (CRC-32 and size),
+    so checking for changes doesn't decompress anything.
+    """
+
+    splittable = False
+    appendable = False
+
+    def __init__(self, zip_path: Union[str, Path], member: str):
+        self.zip_path = Path(zip_path)
+        self.member = member
+        self.name = f"{zip_path}!{member}"
+        with zipfile.ZipFile(self.zip_path) as archive:
+            info = archive.getinfo(member)
+        self.size = info.file_size
+        self.crc = info.CRC
+
+    def open(self) -> BinaryIO:
+        archive = zipfile.ZipFile(self.zip_path)
+        try:
+            # The archive file stays open until the member stream is closed
+            return io.BufferedReader(archive.open(self.member), READ_BUFFER)
+        finally:
+            archive.close()
+
+    def fingerprint(self, prefix_bytes: Optional[int] = None) -> Tuple[str, Optional[str]]:
+        return f"zip:{self.crc:08x}:{self.size}", None
+
+
+class GzipCsv:
+    """A gzip-compressed CSV (.csv.gz), decompressed as it is read"""
+
+    splittable = False
+    appendable = False
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.name = str(path)
+
+    @property
+    def size(self) -> int:
+        # The trailer holds the uncompressed size modulo 2**32
+        with open(self.path, "rb") as f:
+            f.seek(-4, os.SEEK_END)
+            return struct.unpack("<I", f.read(4))[0]
+
+    def open(self) -> BinaryIO:
+        return io.BufferedReader(gzip.GzipFile(self.path, "rb"), READ_BUFFER)
+
+    def fingerprint(self, prefix_bytes: Optional[int] = None) -> Tuple[str, Optional[str]]:
+        return file_digest(self.path)[0], None
+
+
+def as_source(source):
+    """Wrap a path in the matching source type; sources pass through"""
+
+    if not isinstance(source, (str, Path)):
+        return source
+    if str(source).endswith(".gz"):
+        return GzipCsv(source)
+    return CsvFile(source)
+
+
+def find_sources(location: Union[str, Path], names: Dict[str, str]) -> Dict[str, object]:
+    """
+    Locate a dataset's CSVs (`names`: file name -> table) in a zip archive
+    or a directory. A directory may hold the CSVs, gzipped CSVs or the
+    downloaded zip itself; macOS metadata entries are ignored.
+    """
+
+    location = Path(location)
+    archives = [location] if zipfile.is_zipfile(location) else sorted(location.glob("*.zip"))
+
+    found = {}
+    if location.is_dir():
+        for csv_name, table in names.items():
+            for candidate in (csv_name, csv_name + ".gz"):
+                matches = [p for p in location.rglob(candidate) if "__MACOSX" not in p.parts]
+                if matches:
+                    found[table] = as_source(matches[0])
+                    break
+
+    for archive in archives:
+        with zipfile.ZipFile(archive) as z:
+            members = [m for m in z.namelist() if "__MACOSX" not in m and not m.endswith("/")]
+        for csv_name, table in names.items():
+            for member in members:
+                if table not in found and member.rsplit("/", 1)[-1] == csv_name:
+                    found[table] = ZipMember(archive, member)
+    return found
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import shutil
+    import tempfile
+    import pandas as pd
+    from sample_data import write_instacart_zip
+
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    with tempfile.TemporaryDirectory() as workdir:
+        zip_path = Path(workdir) / "instacart.zip"
+        write_instacart_zip(zip_path, orders)
+        member = ZipMember(zip_path, "order_products__prior.csv")
+        print(f"🗜️  {member.name}: {member.size / 1e6:.0f} MB uncompressed, "
+              f"{zip_path.stat().st_size / 1e6:.0f} MB zipped")
+
+        def parse(handle):
+            rows = 0
+            for chunk in pd.read_csv(handle, chunksize=100_000):
+                rows += len(chunk)
+            return rows
+
+        start = time.perf_counter()
+        with zipfile.ZipFile(zip_path) as z:
+            z.extract(member.member, workdir)
+        with open(Path(workdir) / member.member, "rb") as f:
+            parse(f)
+        extracted = time.perf_counter() - start
+        os.remove(Path(workdir) / member.member)
+
+        start = time.perf_counter()
+        with zipfile.ZipFile(zip_path) as z, z.open(member.member) as f:
+            parse(f)
+        unbuffered = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with member.open() as f:
+            parse(f)
+        buffered = time.perf_counter() - start
+
+        print(f"   extract + parse:         {extracted:.2f}s (+{member.size / 1e6:.0f} MB on disk)")
+        print(f"   parse zip member:        {unbuffered:.2f}s")
+        print(f"   parse buffered member:   {buffered:.2f}s")
+
+        gz_path = Path(workdir) / "order_products__prior.csv.gz"
+        with member.open() as f, gzip.open(gz_path, "wb", compresslevel=1) as out:
+            shutil.copyfileobj(f, out, READ_BUFFER)
+        start = time.perf_counter()
+        with as_source(gz_path).open() as f:
+            parse(f)
+        print(f"   parse buffered gzip:     {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,90 @@
+"""
+Helpers for progressive answers
+The main agent replies with a JSON object; JSONFieldStreamer pulls the text of
+its "response" field out of the partial JSON as chunks arrive, so the user
+sees the answer being written. sse_event formats server-sent events.
+"""
+import json
+import re
+from typing import Any, Dict
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONFieldStreamer:
+    """Incrementally decode one top-level string field from streamed JSON text"""
+
+    def __init__(self, field: str = "response"):
+        self.opening = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self.buffer = ""
+        self.pos = None      # index of the next undecoded character of the value
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return any newly decoded text of the field"""
+
+        self.buffer += chunk
+        if self.done:
+            return ""
+
+        if self.pos is None:
+            match = self.opening.search(self.buffer)
+            if not match:
+                return ""
+            self.pos = match.end()
+
+        out = []
+        i = self.pos
+        while i < len(self.buffer):
+            char = self.buffer[i]
+            if char == '"':
+                self.done = True
+                i += 1
+                break
+            if char != "\\":
+                out.append(char)
+                i += 1
+                continue
+
+            # Escape sequence: wait for the rest if it's split across chunks
+            if i + 1 >= len(self.buffer):
+                break
+            code = self.buffer[i + 1]
+            if code == "u":
+                if i + 6 > len(self.buffer):
+                    break
+                point = int(self.buffer[i + 2:i + 6], 16)
+                if 0xD800 <= point < 0xDC00:
+                    # Surrogate pair (e.g. emoji): decode both halves together
+                    if i + 12 > len(self.buffer):
+                        break
+                    low = int(self.buffer[i + 8:i + 12], 16)
+                    point = 0x10000 + ((point - 0xD800) << 10) + (low - 0xDC00)
+                    i += 6
+                out.append(chr(point))
+                i += 6
+            else:
+                out.append(ESCAPES.get(code, code))
+                i += 2
+
+        self.pos = i
+        return "".join(out)
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event (JSON data on a single line)"""
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+if __name__ == "__main__":
+    text = json.dumps({
+        "response": "Orders grew 12% in \"Q3\" —\nmostly from SP.",
+        "needs_query": True,
+        "enhanced_query": "quarterly orders",
+    })
+
+    streamer = JSONFieldStreamer()
+    pieces = [streamer.feed(text[i:i + 5]) for i in range(0, len(text), 5)]
+    print("🌊 Streamed pieces:", [p for p in pieces if p])
+    print("✅ Decoded:", repr("".join(pieces)))
@@ -0,0 +1,190 @@
+"""
+Local result summarization - key statistics without another LLM call
+Computes totals, top/bottom entries, period-over-period change for time
+series and share of total for distributions with vectorized pandas/NumPy,
+and turns them into a short narrative plus structured highlights.
+"""
+import time
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+ID_SUFFIXES = ("_id", "_prefix", "_code")
+
+
+def _fmt(value: Any) -> str:
+    """Human-friendly number formatting"""
+
+    if isinstance(value, (int, np.integer)):
+        return f"{int(value):,}"
+    if isinstance(value, (float, np.floating)):
+        if float(value).is_integer() and abs(value) < 1e15:
+            return f"{int(value):,}"
+        return f"{float(value):,.2f}"
+    return str(value)
+
+
+def _py(value: Any) -> Any:
+    """Convert NumPy scalars to plain Python for JSON-friendly highlights"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _pick_columns(df: pd.DataFrame):
+    """Choose a label column and the primary numeric metric"""
+
+    numeric = [
+        col for col in df.select_dtypes(include="number").columns
+        if not str(col).lower().endswith(ID_SUFFIXES)
+    ]
+    others = [col for col in df.columns if col not in numeric]
+
+    if others:
+        label = others[0]
+    elif len(numeric) >= 2:
+        # All-numeric results like (order_hour_of_day, orders): first column is the label
+        label = numeric[0]
+    else:
+        label = None
+
+    metrics = [col for col in numeric if col != label]
+    return label, (metrics[0] if metrics else None)
+
+
+def _as_time_axis(series: pd.Series) -> Optional[pd.Series]:
+    """Parse a label column as dates/periods if most values look temporal"""
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    if not (pd.api.types.is_string_dtype(series) or series.dtype == object):
+        return None
+
+    sample = series.dropna().astype(str)
+    if sample.empty or not sample.str.match(r"^\d{4}(-\d{2}){0,2}").mean() >= 0.8:
+        return None
+
+    # Parse the full column so positions line up with the metric values
+    parsed = pd.to_datetime(series.astype(str).str.slice(0, 10), errors="coerce", format="mixed")
+    return parsed if parsed.notna().sum() >= 0.8 * len(sample) else None
+
+
+def summarize_result(df: Optional[pd.DataFrame], visualization: Optional[Dict] = None) -> Dict[str, Any]:
+    """
+    Summarize a query result
+
+    Returns:
+        {"narrative": str, "highlights": [...], "kind": str, "elapsed_ms": float}
+    """
+
+    start = time.perf_counter()
+    highlights: List[Dict[str, Any]] = []
+    sentences: List[str] = []
+    kind = "empty"
+
+    if df is None or len(df) == 0:
+        sentences.append("No rows matched the query.")
+    else:
+        label, metric = _pick_columns(df)
+        viz_type = (visualization or {}).get("type", "none")
+
+        if metric is None or df[metric].isna().all():
+            kind = "listing"
+            sentences.append(f"{len(df):,} rows across {len(df.columns)} columns.")
+
+        elif len(df) == 1:
+            kind = "scalar"
+            value = df[metric].iloc[0]
+            highlights.append({"type": "value", "column": metric, "value": _py(value)})
+            prefix = f"{df[label].iloc[0]}: " if label is not None else ""
+            sentences.append(f"{prefix}{metric} is {_fmt(value)}.")
+
+        else:
+            values = df[metric].to_numpy(dtype="float64")
+            valid = ~np.isnan(values)
+            total = np.nansum(values)
+            labels = df[label].astype(str).to_numpy() if label is not None else np.arange(1, len(df) + 1).astype(str)
+            time_axis = _as_time_axis(df[label]) if label is not None else None
+
+            highlights.append({"type": "total", "column": metric, "value": _py(total)})
+
+            if time_axis is not None or viz_type == "line":
+                kind = "time_series"
+                if time_axis is not None:
+                    order = np.argsort(time_axis.to_numpy())
+                    has_period = time_axis.notna().to_numpy()[order]
+                else:
+                    order = np.arange(len(df))
+                    has_period = np.ones(len(df), dtype=bool)
+                series, periods = values[order], labels[order]
+                series_valid = ~np.isnan(series) & has_period
+                series, periods = series[series_valid], periods[series_valid]
+
+                if len(series) >= 2:
+                    last, prev = series[-1], series[-2]
+                    change = (last - prev) / abs(prev) * 100 if prev else np.nan
+                    overall = (series[-1] - series[0]) / abs(series[0]) * 100 if series[0] else np.nan
+                    peak = int(np.argmax(series))
+
+                    highlights.append({
+                        "type": "change", "column": metric, "from": periods[-2], "to": periods[-1],
+                        "value": _py(last), "pct_change": None if np.isnan(change) else _py(round(change, 2))
+                    })
+                    highlights.append({"type": "peak", "column": metric, "label": periods[peak], "value": _py(series[peak])})
+
+                    sentences.append(
+                        f"{metric} totals {_fmt(series.sum())} over {len(series)} periods "
+                        f"({periods[0]} to {periods[-1]})."
+                    )
+                    sentences.append(f"Peak was {periods[peak]} at {_fmt(series[peak])}.")
+                    if not np.isnan(change):
+                        direction = "up" if change >= 0 else "down"
+                        sentences.append(
+                            f"Latest period {periods[-1]} is {direction} {abs(change):.1f}% vs {periods[-2]}"
+                            + (f" ({overall:+.1f}% since {periods[0]})." if not np.isnan(overall) else ".")
+                        )
+
+            else:
+                kind = "distribution" if viz_type in ("pie", "bar") or label is not None else "numeric"
+                top = int(np.nanargmax(values))
+                bottom = int(np.nanargmin(values))
+                highlights.append({"type": "top", "column": metric, "label": labels[top], "value": _py(values[top])})
+                highlights.append({"type": "bottom", "column": metric, "label": labels[bottom], "value": _py(values[bottom])})
+
+                sentences.append(f"{metric} totals {_fmt(total)} across {int(valid.sum()):,} rows.")
+
+                if total > 0 and (values[valid] >= 0).all():
+                    shares = values / total * 100
+                    top3 = np.sort(values[valid])[::-1][:3].sum() / total * 100
+                    highlights.append({"type": "share", "column": metric, "label": labels[top], "pct": _py(round(shares[top], 2))})
+                    sentences.append(
+                        f"{labels[top]} leads with {_fmt(values[top])} ({shares[top]:.1f}% of total); "
+                        f"the top 3 account for {top3:.1f}%."
+                    )
+                else:
+                    sentences.append(f"Highest is {labels[top]} ({_fmt(values[top])}).")
+
+                if len(df) > 2:
+                    sentences.append(f"Lowest is {labels[bottom]} ({_fmt(values[bottom])}).")
+
+    return {
+        "narrative": " ".join(sentences),
+        "highlights": highlights,
+        "kind": kind,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    print("🧮 Testing result summarizer\n")
+
+    samples = {
+        "time series": pd.DataFrame({"month": ["2017-01", "2017-02", "2017-03", "2017-04"], "revenue": [1200.5, 1500.0, 1350.25, 1800.0]}),
+        "distribution": pd.DataFrame({"payment_type": ["credit_card", "boleto", "voucher", "debit_card"], "count": [76795, 19784, 5775, 1529]}),
+        "hourly": pd.DataFrame({"order_hour_of_day": [9, 10, 11], "orders": [2500, 2800, 2600]}),
+        "scalar": pd.DataFrame({"total_orders": [99441]}),
+    }
+
+    for name, df in samples.items():
+        summary = summarize_result(df, {"type": "line" if name == "time series" else "bar"})
+        print(f"{name} ({summary['kind']}, {summary['elapsed_ms']:.2f} ms)")
+        print(f"  {summary['narrative']}\n")